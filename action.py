@@ -1,5 +1,6 @@
 from enum import Enum
 from math import sqrt
+import numpy as np
 
 
 class Action2d(Enum):
@@ -19,6 +20,7 @@ class Action2d(Enum):
     Methods:
     - cost(): Return cost of the action
     - name(): Return name of the action
+    - delta(): Return the (dx, dy) displacement of the action
 
     Example:
     >>> action = Action2d.UP
@@ -51,13 +53,7 @@ class Action2d(Enum):
         >>> Action2d.UP.cost()
         1
         """
-        if self == Action2d.UP or \
-                self == Action2d.DOWN or \
-                self == Action2d.LEFT or \
-                self == Action2d.RIGHT:
-            return 1
-        else:
-            return sqrt(2)
+        return _COSTS[self.value]
 
     def name(self):
         """
@@ -70,21 +66,130 @@ class Action2d(Enum):
         >>> Action2d.UP.name()
         "UP"
         """
-        if self == Action2d.LEFT:
-            return "LEFT"
-        elif self == Action2d.RIGHT:
-            return "RIGHT"
-        elif self == Action2d.UP:
-            return "UP"
-        elif self == Action2d.DOWN:
-            return "DOWN"
-        elif self == Action2d.UP_LEFT:
-            return "UP_LEFT"
-        elif self == Action2d.UP_RIGHT:
-            return "UP_RIGHT"
-        elif self == Action2d.DOWN_LEFT:
-            return "DOWN_LEFT"
-        elif self == Action2d.DOWN_RIGHT:
-            return "DOWN_RIGHT"
-        else:
-            return "UNKNOWN"
+        return _NAMES[self.value]
+
+    def delta(self) -> tuple[int, int]:
+        """
+        Return the (dx, dy) displacement of the action
+
+        Returns:
+        - tuple[int, int]: displacement of the action
+
+        Example:
+        >>> Action2d.UP_LEFT.delta()
+        (-1, 1)
+        """
+        return _DELTAS[self.value]
+
+
+# Displacement of each action, indexed by the value of the action
+_DELTAS: tuple[tuple[int, int], ...] = (
+    (-1, 0),  # LEFT
+    (1, 0),   # RIGHT
+    (0, 1),   # UP
+    (0, -1),  # DOWN
+    (-1, 1),  # UP_LEFT
+    (1, 1),   # UP_RIGHT
+    (-1, -1), # DOWN_LEFT
+    (1, -1),  # DOWN_RIGHT
+)
+
+# Cost of each action, indexed by the value of the action: 1 for straight moves, √2 for diagonal ones
+_COSTS: tuple[float, ...] = tuple(1 if dx == 0 or dy == 0 else sqrt(2) for dx, dy in _DELTAS)
+
+# Name of each action, indexed by the value of the action
+_NAMES: tuple[str, ...] = tuple(action._name_ for action in Action2d)
+
+# All actions in the order of their values, so that loops over the actions do not go through the Enum machinery
+ACTIONS2D: tuple[Action2d, ...] = tuple(Action2d)
+
+# The same tables as read-only NumPy arrays, for vectorized neighbor generation
+ACTION2D_DELTAS: np.ndarray = np.array(_DELTAS, dtype=np.int64)
+ACTION2D_DELTAS.flags.writeable = False
+ACTION2D_COSTS: np.ndarray = np.array(_COSTS, dtype=float)
+ACTION2D_COSTS.flags.writeable = False
+
+
+class Action3d(Enum):
+    """
+    Enum class for 3D actions, moving to any of the 26 neighbours of a lattice point
+
+    The first eight actions are the moves of Action2d in the xOy plane, with the same names and values.
+    ASCEND and DESCEND move along z, alone or combined with one of those eight moves.
+
+    Methods:
+    - cost(): Return cost of the action, the length of its displacement (1, √2 or √3)
+    - name(): Return name of the action
+    - delta(): Return the (dx, dy, dz) displacement of the action
+
+    Example:
+    >>> Action3d.ASCEND_UP_LEFT.delta()
+    (-1, 1, 1)
+    >>> Action3d.ASCEND_UP_LEFT.cost()
+    1.7320508075688772
+    """
+
+    LEFT = 0
+    RIGHT = 1
+    UP = 2
+    DOWN = 3
+    UP_LEFT = 4
+    UP_RIGHT = 5
+    DOWN_LEFT = 6
+    DOWN_RIGHT = 7
+    ASCEND = 8
+    ASCEND_LEFT = 9
+    ASCEND_RIGHT = 10
+    ASCEND_UP = 11
+    ASCEND_DOWN = 12
+    ASCEND_UP_LEFT = 13
+    ASCEND_UP_RIGHT = 14
+    ASCEND_DOWN_LEFT = 15
+    ASCEND_DOWN_RIGHT = 16
+    DESCEND = 17
+    DESCEND_LEFT = 18
+    DESCEND_RIGHT = 19
+    DESCEND_UP = 20
+    DESCEND_DOWN = 21
+    DESCEND_UP_LEFT = 22
+    DESCEND_UP_RIGHT = 23
+    DESCEND_DOWN_LEFT = 24
+    DESCEND_DOWN_RIGHT = 25
+
+    def cost(self) -> float:
+        """
+        Return cost of the action
+
+        Returns:
+        - float: cost of the action
+        """
+        return _COSTS_3D[self.value]
+
+    def name(self) -> str:
+        """
+        Return name of the action
+
+        Returns:
+        - str: name of the action
+        """
+        return self._name_
+
+    def delta(self) -> tuple[int, int, int]:
+        """
+        Return the (dx, dy, dz) displacement of the action
+
+        Returns:
+        - tuple[int, int, int]: displacement of the action
+        """
+        return _DELTAS_3D[self.value]
+
+
+# Displacement of each 3D action, indexed by the value of the action: the planar moves, then the same
+# moves one level up and one level down
+_DELTAS_3D: tuple[tuple[int, int, int], ...] = tuple(
+    [(dx, dy, 0) for dx, dy in _DELTAS]
+    + [(dx, dy, dz) for dz in (1, -1) for dx, dy in ((0, 0),) + _DELTAS]
+)
+
+# Cost of each 3D action: the Euclidean length of its displacement
+_COSTS_3D: tuple[float, ...] = tuple(sqrt(dx * dx + dy * dy + dz * dz) for dx, dy, dz in _DELTAS_3D)
@@ -0,0 +1,426 @@
+import inspect
+import logging
+import time
+from typing import Optional, Union
+import numpy as np
+
+from action import Action2d
+from map_and_obstacles import Map2d
+from path_smoother import waypointNodes
+from solution import Solution2d
+from solver import GASolver, Solver
+from solver_registry import getSolver, getSolverClass
+
+_LOGGER = logging.getLogger(__name__)
+
+# The eight lattice neighbors of a polygon vertex, where the visibility graph puts its nodes
+_CORNER_OFFSETS = np.array([action.delta() for action in Action2d])
+
+class VisibilityGraphSolver(Solver):
+    """
+    A class to solve a 2D map problem on the visibility graph of the obstacle corners.
+
+    The nodes of the graph are the start, the end and the free lattice points around every vertex of the obstacles (of the configuration space, see Map2d.getConfigurationSpace()). Two nodes are connected
+    when the straight segment between them does not intersect or touch an obstacle; all candidate segments are
+    tested in one batch with Map2d.segmentsCollide(). The shortest path on the graph is a list of waypoints and
+    its cost is its Euclidean length, as for the solutions of PathSmoother.
+
+    The work grows with the square of the number of vertices and not with the area of the map, which makes this
+    the fastest engine for large maps with a few polygons. It ignores the cost raster of the map. When the graph
+    does not connect the start to the end, for instance through a corridor too narrow for the corner points,
+    the solver falls back to WavefrontSolver.
+
+    Example:
+    >>> reader = MapFileReader("input_basic/long_path.txt")
+    >>> map2d = reader.readMap2d()
+    >>> solution = map2d.solvedBy(VisibilityGraphSolver())
+    """
+
+    def __init__(self):
+        """
+        Initializes the VisibilityGraphSolver object.
+        """
+
+        super().__init__()
+        self.stats: dict = {}
+
+    def solve(self, map2d: Map2d) -> Solution2d:
+        """
+        Solves the 2D map problem on the visibility graph.
+
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+
+        Returns:
+        - Solution2d: The waypoint solution to the 2D map problem.
+        """
+
+        if map2d.getPickUpPoints() != []:
+            raise ValueError("VisibilityGraphSolver is not designed to solve TSP problem. Please use another solver, such as GASolver.")
+
+        start_time = time.perf_counter()
+        self._checkDeadline()
+
+        start, end = tuple(map2d.getStart()), tuple(map2d.getEnd())
+        self._checkConnected(map2d, [start, end])
+        occupancy = map2d.getOccupancyGrid()
+
+        nodes = np.array([start, end] + self.__cornerPoints(map2d, occupancy), dtype=np.int64).reshape(-1, 2)
+        _, first = np.unique(nodes, axis=0, return_index=True)
+        nodes = nodes[np.sort(first)]
+
+        # Test every pair of nodes at once and keep the visible ones as edges
+        self._checkDeadline()
+        i, j = np.triu_indices(len(nodes), k=1)
+        segments = np.stack([nodes[i], nodes[j]], axis=1).astype(float)
+        visible = ~map2d.segmentsCollide(segments) if len(map2d.getObstacles()) > 0 else np.ones(len(i), dtype=bool)
+        weights = np.full((len(nodes), len(nodes)), np.inf)
+        lengths = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+        weights[i[visible], j[visible]] = lengths[visible]
+        weights[j[visible], i[visible]] = lengths[visible]
+        self.stats = {"nodes": len(nodes), "edges": int(visible.sum()), "fallback": False}
+
+        waypoints, cost = self.__shortestPath(weights, nodes)
+        if waypoints is None:
+            # The corner points miss the way: the grid always finds it, if there is one
+            self.stats["fallback"] = True
+            grid_solver = getSolver("wavefront")
+            grid_solver.setDeadline(self._deadline)
+            result = grid_solver.solve(map2d)
+            result.runtime_milisec = (time.perf_counter() - start_time) * 10**3
+            return result
+
+        runtime_milisec = (time.perf_counter() - start_time) * 10**3
+        return Solution2d(waypointNodes(waypoints), cost, runtime_milisec)
+
+    def __cornerPoints(self, map2d: Map2d, occupancy: np.ndarray) -> list[tuple[int, int]]:
+        vertices = []
+        for obstacle in map2d.getConfigurationSpace():
+            if obstacle.geom_type != "Polygon":
+                continue
+            for ring in [obstacle.exterior, *obstacle.interiors]:
+                vertices += list(ring.coords)[:-1]
+        if len(vertices) == 0:
+            return []
+
+        # The lattice points around a vertex, rounded away from it along every one of the eight directions
+        vertices = np.array(vertices, dtype=float)
+        shifted = vertices[:, None, :] + _CORNER_OFFSETS[None, :, :]
+        corners = np.select([_CORNER_OFFSETS[None] > 0, _CORNER_OFFSETS[None] < 0],
+                            [np.ceil(shifted - 1e-9), np.floor(shifted + 1e-9)], np.round(shifted)).reshape(-1, 2).astype(np.int64)
+        inside = (corners[:, 0] >= 0) & (corners[:, 0] < occupancy.shape[0]) & (corners[:, 1] >= 0) & (corners[:, 1] < occupancy.shape[1])
+        corners = corners[inside]
+        corners = corners[~occupancy[corners[:, 0], corners[:, 1]]]
+        return [tuple(corner) for corner in corners.tolist()]
+
+    def __shortestPath(self, weights: np.ndarray, nodes: np.ndarray) -> tuple[Optional[list[tuple[int, int]]], float]:
+        # Dijkstra on the dense weight matrix from node 0 (start) to node 1 (end), relaxing a whole row at a time
+        distance = np.full(len(nodes), np.inf)
+        parent = np.full(len(nodes), -1, dtype=np.int64)
+        done = np.zeros(len(nodes), dtype=bool)
+        distance[0] = 0
+        while True:
+            self._checkDeadline()
+            u = int(np.argmin(np.where(done, np.inf, distance)))
+            if done[u] or np.isinf(distance[u]):
+                return None, np.inf
+            if u == 1:
+                break
+            done[u] = True
+            candidate = distance[u] + weights[u]
+            better = candidate < distance
+            distance[better] = candidate[better]
+            parent[better] = u
+
+        chain = [1]
+        while chain[-1] != 0:
+            chain.append(int(parent[chain[-1]]))
+        return [tuple(nodes[k].tolist()) for k in reversed(chain)], float(distance[1])
+
+class HeldKarpSolver(Solver):
+    """
+    A class to solve a 2D map problem with pick-up points exactly, by dynamic programming over the visiting order.
+
+    The cost between every pair of key points (start, pick-up points, end) is their grid distance, read from the
+    distance fields of the map (see Map2d.getDistanceField()). The Held-Karp recursion then finds the cheapest
+    order: the best cost of a route from the start that visits a set of pick-up points and stops at one of them,
+    for all sets of a size at once with NumPy. This takes O(2^n * n^2) for n pick-up points, so it is limited to
+    a few of them. The legs are then planned with A*, as for GASolver.
+
+    Example:
+    >>> reader = MapFileReader("input_tsp/tsp_static_obstacles_2.txt")
+    >>> map2d = reader.readMap2d()
+    >>> solution = map2d.solvedBy(HeldKarpSolver())
+    """
+
+    def __init__(self, max_pickups: int = 12):
+        """
+        Initializes the HeldKarpSolver object.
+
+        Parameters:
+        - max_pickups (int): Largest number of pick-up points accepted. Time and memory double with every point.
+        """
+
+        super().__init__()
+        self.__max_pickups = max_pickups
+        self.stats: dict = {}
+
+    def solve(self, map2d: Map2d) -> Solution2d:
+        """
+        Solves the 2D map problem with the optimal visiting order of the pick-up points.
+
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+
+        Returns:
+        - Solution2d: The route from start, through the pick-up points, to end.
+        """
+
+        start_time = time.perf_counter()
+
+        order = self.order(map2d)
+        leg_planner = GASolver()
+        leg_planner.setDeadline(self._deadline)
+        result = leg_planner.constructPath(map2d, order)
+
+        result.runtime_milisec = (time.perf_counter() - start_time) * 10**3
+        return result
+
+    def order(self, map2d: Map2d) -> list[tuple[int, int]]:
+        """
+        Return the cheapest visiting order of the pick-up points, without planning the legs.
+
+        Parameters:
+        - map2d (Map2d): The map with its pick-up points.
+
+        Returns:
+        - list[tuple[int, int]]: The pick-up points in visiting order.
+        """
+
+        pickups = [tuple(point) for point in (map2d.getPickUpPoints() or [])]
+        if len(pickups) == 0:
+            raise ValueError("HeldKarpSolver is designed to solve TSP problem. Please use another solver, such as A_asteriskSolver.")
+        if len(pickups) > self.__max_pickups:
+            raise ValueError(f"HeldKarpSolver accepts at most {self.__max_pickups} pick-up points, got {len(pickups)}. "
+                             "Please use another solver, such as GASolver.")
+
+        self._checkDeadline()
+        self._checkConnected(map2d, [map2d.getStart()] + pickups + [map2d.getEnd()])
+        # Key points: 0 is the start, 1..n the pick-up points and n + 1 the end
+        distance = map2d.getDistanceMatrix([tuple(map2d.getStart())] + pickups + [tuple(map2d.getEnd())])
+        n = len(pickups)
+        bits = 1 << np.arange(n)
+        masks = np.arange(1 << n)
+        sizes = ((masks[:, None] & bits[None, :]) != 0).sum(axis=1)
+
+        # best[mask, k]: cheapest route from the start through the pick-up points of mask, ending at k
+        best = np.full((1 << n, n), np.inf)
+        parent = np.full((1 << n, n), -1, dtype=np.int64)
+        best[bits, np.arange(n)] = distance[0, 1:n + 1]
+        between = distance[1:n + 1, 1:n + 1]
+        for size in range(2, n + 1):
+            self._checkDeadline()
+            layer = masks[sizes == size]
+            # Reach k last from every j of the set without k: costs[m, k, j] = best[mask - k, j] + d(j, k)
+            costs = best[layer[:, None] ^ bits[None, :]] + between.T[None, :, :]
+            previous = np.argmin(costs, axis=2)
+            values = np.take_along_axis(costs, previous[:, :, None], axis=2)[:, :, 0]
+            has_k = (layer[:, None] & bits[None, :]) != 0
+            best[layer] = np.where(has_k, values, np.inf)
+            parent[layer] = np.where(has_k, previous, -1)
+
+        totals = best[-1] + distance[1:n + 1, n + 1]
+        last = int(np.argmin(totals))
+        if np.isinf(totals[last]):
+            raise Exception("No solution found.")
+
+        order, mask, k = [], (1 << n) - 1, last
+        while k >= 0:
+            order.append(k)
+            mask, k = mask ^ (1 << k), int(parent[mask, k])
+        order.reverse()
+
+        self.stats = {"estimated_cost": float(totals[last]), "order": order}
+        return [pickups[k] for k in order]
+
+class AutoSolver(Solver):
+    """
+    A solver that inspects the map and hands it to the engine expected to solve it fastest.
+
+    The candidates depend on the query:
+    - Without pick-up points: A* ("a_asterisk"), the bulk wavefront ("wavefront") and, on static maps without a
+      cost raster, the visibility graph ("visibility_graph")
+    - With pick-up points: the exact Held-Karp order ("held_karp") for static maps with at most
+      max_exact_pickups points, and the Genetic Algorithm ("ga")
+
+    On a map with moving obstacles, A* searches the live map, and the GA and Held-Karp plan every leg on a
+    static snapshot of the map taken when the legs are planned (see Map2d.getLegView()). The engines that first
+    derive arrays from the whole map (the distance fields of the wavefront and of the Held-Karp order, the
+    occupancy grid of the visibility graph) are ruled out there: the map drops those arrays whenever the obstacles
+    move, so they would be recomputed over and over, and combined from different positions of the obstacles.
+    Among the candidates left, the engine with the smallest expected runtime is chosen. The runtime models are rough calibrations of the
+    engines of this repository on the features of the map: its free lattice points (the grid engines), the
+    vertices of its obstacles (the visibility graph) and its pick-up points (the route engines).
+
+    Every decision is logged on the "auto_planner" logger at INFO level and kept in `stats`, with the expected
+    runtime of every candidate and the reason for excluding the others. The engine can also be forced by name.
+
+    Attributes:
+    - stats: The decision of the latest solve() and its actual runtime
+
+    Example:
+    >>> reader = MapFileReader("input_tsp/tsp_static_obstacles_2.txt")
+    >>> map2d = reader.readMap2d()
+    >>> solver = AutoSolver(engine_params={"ga": {"num_generations": 100}})
+    >>> solution = map2d.solvedBy(solver)
+    >>> solver.stats["engine"]
+    'held_karp'
+    """
+
+    def __init__(self, engine: Optional[str] = None, engine_params: Optional[dict[str, dict]] = None,
+                 max_exact_pickups: int = 10, max_visibility_nodes: int = 400,
+                 seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None):
+        """
+        Initializes the AutoSolver object.
+
+        Parameters:
+        - engine (Optional[str]): Registered name of the engine to use instead of the automatic choice.
+        - engine_params (Optional[dict[str, dict]]): Constructor parameters of the engines, keyed by engine name.
+        - max_exact_pickups (int): Largest number of pick-up points solved exactly by Held-Karp.
+        - max_visibility_nodes (int): Largest number of corner points for the visibility graph.
+        - seed: Seed passed to the selected engine if it is stochastic, unless its parameters set one.
+        """
+
+        super().__init__()
+        self.__engine = engine
+        self.__engine_params = {name: dict(params) for name, params in (engine_params or {}).items()}
+        self.__max_exact_pickups = max_exact_pickups
+        self.__max_visibility_nodes = max_visibility_nodes
+        self.__seed = seed
+        self.stats: dict = {}
+
+    def select(self, map2d: Map2d) -> dict:
+        """
+        Choose the engine for a map without solving it.
+
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+
+        Returns:
+        - dict: The decision, with the keys "engine", "expected_ms", "reason", "candidates" (expected runtime
+          in milliseconds of every candidate), "excluded" (reason for every engine left out) and "features"
+        """
+
+        features = self.__features(map2d)
+        candidates, excluded = self.__estimate(features)
+
+        if self.__engine is not None:
+            return {"engine": self.__engine, "expected_ms": candidates.get(self.__engine), "reason": "override",
+                    "candidates": candidates, "excluded": excluded, "features": features}
+
+        engine = min(candidates, key=candidates.get)
+        return {"engine": engine, "expected_ms": candidates[engine],
+                "reason": f"fastest expected of {', '.join(sorted(candidates, key=candidates.get))}",
+                "candidates": candidates, "excluded": excluded, "features": features}
+
+    def solve(self, map2d: Map2d) -> Solution2d:
+        """
+        Solves the 2D map problem with the selected engine.
+
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+
+        Returns:
+        - Solution2d: The solution of the selected engine.
+        """
+
+        decision = self.select(map2d)
+        expected = decision["expected_ms"]
+        _LOGGER.info("engine=%s expected_ms=%s reason=%s features=%s", decision["engine"],
+                     "unknown" if expected is None else f"{expected:.1f}", decision["reason"], decision["features"])
+        self.stats = decision
+
+        params = dict(self.__engine_params.get(decision["engine"], {}))
+        if self.__seed is not None and "seed" in inspect.signature(getSolverClass(decision["engine"])).parameters:
+            params.setdefault("seed", self.__seed)
+        engine = getSolver(decision["engine"], **params)
+        engine.setDeadline(self._deadline)
+        solution = engine.solve(map2d)
+        self.stats["actual_ms"] = float(solution.runtime_milisec)
+        return solution
+
+    def __features(self, map2d: Map2d) -> dict:
+        occupancy = map2d.getOccupancyGrid()
+        polygons = [obstacle for obstacle in map2d.getConfigurationSpace() if obstacle.geom_type == "Polygon"]
+        start, end = np.array(map2d.getStart()), np.array(map2d.getEnd())
+        low, high = np.minimum(start, end), np.maximum(start, end) + 1
+        return {
+            "width": map2d.getWidth(),
+            "height": map2d.getHeight(),
+            "free_points": int((~occupancy).sum()),
+            # Grid steps between start and end, free lattice points in the box they span, and whether the straight
+            # line between them is free: together a rough size of the area A* explores
+            "steps": int(np.abs(end - start).max()),
+            "free_points_between": int((~occupancy[low[0]:high[0], low[1]:high[1]]).sum()),
+            "direct": len(map2d.getObstacles()) == 0 or not bool(map2d.segmentsCollide([[tuple(start), tuple(end)]])[0]),
+            "obstacle_density": float(occupancy[1:-1, 1:-1].mean()) if min(occupancy.shape) > 2 else 1.0,
+            "obstacles": len(map2d.getObstacles()),
+            "vertices": sum(len(polygon.exterior.coords) - 1 + sum(len(ring.coords) - 1 for ring in polygon.interiors)
+                            for polygon in polygons),
+            "pickups": len(map2d.getPickUpPoints() or []),
+            "dynamic": map2d.getObstaclesSpeed() > 0,
+            "cost_raster": map2d.getCostRaster() is not None,
+        }
+
+    def __estimate(self, features: dict) -> tuple[dict[str, float], dict[str, str]]:
+        # Expected runtimes in milliseconds, calibrated on the engines of this repository
+        free = features["free_points"]
+        candidates, excluded = {}, {}
+
+        if features["pickups"] == 0:
+            # On a free straight line A* expands a narrow band along it; around obstacles, it explores beyond the box
+            # between start and end
+            expanded = 4 * features["steps"] if features["direct"] else (features["free_points_between"] + free) / 2
+            candidates["a_asterisk"] = _aStarMs(expanded)
+            if features["dynamic"]:
+                # Their distance field and occupancy grid are dropped at every move of the obstacles
+                excluded["wavefront"] = excluded["visibility_graph"] = "moving obstacles: arrays of the whole map go stale"
+            else:
+                candidates["wavefront"] = _wavefrontMs(free)
+                nodes = 2 + 8 * features["vertices"]
+                if features["cost_raster"]:
+                    excluded["visibility_graph"] = "cost raster"
+                elif nodes > self.__max_visibility_nodes:
+                    excluded["visibility_graph"] = f"{nodes} corner points, more than {self.__max_visibility_nodes}"
+                else:
+                    # One batched segment test per pair of nodes, after the occupancy grid
+                    candidates["visibility_graph"] = 0.5 + 0.001 * nodes * (nodes - 1) / 2 + 0.0001 * free
+            for name in ("dijkstra", "gbfs", "ga", "held_karp"):
+                excluded[name] = "dominated by a_asterisk" if name in ("dijkstra", "gbfs") else "no pick-up points"
+            return candidates, excluded
+
+        n = features["pickups"]
+        # Both route engines plan n + 1 legs with A*, each over a part of the free points
+        legs = (n + 1) * _aStarMs(free / np.sqrt(n + 1))
+        params = self.__engine_params.get("ga", {})
+        generations, population = params.get("num_generations", 75), params.get("sol_per_pop", 200)
+        candidates["ga"] = legs + generations * population * (0.015 + 0.001 * n)
+        if features["dynamic"]:
+            # The legs would be planned on a snapshot, but the order needs one distance field per key point, and
+            # the obstacles move between them; the GA orders by straight-line distances
+            excluded["held_karp"] = "moving obstacles: distance fields of the order go stale"
+        elif n > self.__max_exact_pickups:
+            excluded["held_karp"] = f"{n} pick-up points, more than {self.__max_exact_pickups}"
+        else:
+            candidates["held_karp"] = legs + (n + 1) * _wavefrontMs(free) + 1e-4 * 2**n * n**2
+        for name in ("dijkstra", "a_asterisk", "gbfs", "wavefront", "visibility_graph"):
+            excluded[name] = "pick-up points"
+        return candidates, excluded
+
+def _aStarMs(expanded: float) -> float:
+    # A_asteriskSolver pays one batched neighbor lookup and a few heap operations per expanded point
+    return 0.5 + 0.01 * expanded
+
+def _wavefrontMs(free: float) -> float:
+    # One bulk wavefront over the free points
+    return 8 + 0.0008 * free
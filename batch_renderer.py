@@ -0,0 +1,220 @@
+import os
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from map_and_obstacles import Map2d
+from solution import Solution2d
+
+# The NumPy method draws palette indices (one byte per pixel) instead of RGB triples, which also makes
+# the PNG encoding cheaper. These are the indices and their colours.
+_BACKGROUND, _GRID, _OBSTACLE, _PICKUP, _START, _END, _PATH = range(7)
+_PALETTE = [
+    255, 255, 255, # Background
+    224, 224, 224, # Grid
+    0, 0, 0,       # Obstacle
+    0, 128, 0,     # Pick-up point
+    255, 0, 0,     # Start
+    0, 0, 255,     # End
+    0, 0, 255,     # Path
+]
+
+# zlib level of the written PNG files. Encoding dominates the cost of an image, and the flat colours
+# of a route image compress well even at the fastest level.
+_PNG_COMPRESS_LEVEL = 1
+
+# Static layers already rendered by this worker process, keyed by (map key, method, scale). Only the most
+# recently used ones are kept: a long-lived worker that renders many maps would otherwise hold every layer.
+_STATIC_LAYERS_SIZE = 8
+_STATIC_LAYERS: OrderedDict[tuple, object] = OrderedDict()
+
+def _staticLayer(layer_key: tuple, build: Callable[[], object]) -> object:
+    layer = _STATIC_LAYERS.get(layer_key)
+    if layer is not None:
+        _STATIC_LAYERS.move_to_end(layer_key)
+        return layer
+    layer = _STATIC_LAYERS[layer_key] = build()
+    while len(_STATIC_LAYERS) > _STATIC_LAYERS_SIZE:
+        _STATIC_LAYERS.popitem(last=False)
+    return layer
+
+def _rasterizeStaticLayer(spec: tuple, scale: int) -> np.ndarray:
+    start, end, polygons, width, height, pickups, *_ = spec
+    image = np.full((height * scale, width * scale), _BACKGROUND, dtype=np.uint8)
+
+    # Pixel centres in map coordinates; row 0 is the top of the map
+    xs = (np.arange(width * scale) + 0.5) / scale
+    ys = height - (np.arange(height * scale) + 0.5) / scale
+    grid_x, grid_y = np.meshgrid(xs, ys)
+
+    # Grid lines at integer coordinates
+    image[:, np.arange(0, width * scale, scale)] = _GRID
+    image[np.arange(0, height * scale, scale)] = _GRID
+
+    # Every obstacle is rasterized with one vectorized point-in-polygon test over all pixel centres
+    if len(polygons) > 0:
+        import shapely
+        for coords in polygons:
+            polygon = shapely.Polygon(coords)
+            min_x, min_y, max_x, max_y = polygon.bounds
+            box = (grid_x >= min_x) & (grid_x <= max_x) & (grid_y >= min_y) & (grid_y <= max_y)
+            rows, cols = np.nonzero(box)
+            inside = shapely.contains_xy(polygon, grid_x[rows, cols], grid_y[rows, cols])
+            image[rows[inside], cols[inside]] = _OBSTACLE
+
+    radius = 0.3
+    for point, colour in [(pickup, _PICKUP) for pickup in pickups] + [(start, _START), (end, _END)]:
+        disk = (grid_x - point[0]) ** 2 + (grid_y - point[1]) ** 2 <= radius ** 2
+        image[disk] = colour
+
+    return image
+
+def _drawPathNumpy(image: np.ndarray, path: np.ndarray, height: int, scale: int):
+    if len(path) < 2:
+        return
+
+    # Sample every segment at sub-pixel spacing and stamp the samples with a 2-pixel wide pen
+    starts, ends = path[:-1], path[1:]
+    lengths = np.linalg.norm(ends - starts, axis=1)
+    counts = np.maximum(np.ceil(lengths * scale * 2).astype(int), 1) + 1
+    segment_index = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = (offsets / (counts[segment_index] - 1))[:, None]
+    samples = starts[segment_index] + t * (ends[segment_index] - starts[segment_index])
+
+    cols = np.floor(samples[:, 0] * scale).astype(int)
+    rows = np.floor((height - samples[:, 1]) * scale).astype(int)
+    for d_row, d_col in ((0, 0), (0, -1), (-1, 0), (-1, -1)):
+        r = np.clip(rows + d_row, 0, image.shape[0] - 1)
+        c = np.clip(cols + d_col, 0, image.shape[1] - 1)
+        image[r, c] = _PATH
+
+def _renderNumpy(spec: tuple, map_key, path: np.ndarray, filename: str, scale: int):
+    from PIL import Image
+
+    layer = _staticLayer((map_key, "numpy", scale), lambda: _rasterizeStaticLayer(spec, scale))
+    image = layer.copy()
+    _drawPathNumpy(image, path, spec[4], scale)
+    png = Image.fromarray(image, mode="P")
+    png.putpalette(_PALETTE)
+    png.save(filename, compress_level=_PNG_COMPRESS_LEVEL)
+
+def _renderAgg(spec: tuple, map_key, path: np.ndarray, filename: str, scale: int):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.patches as patches
+
+    def build():
+        start, end, polygons, width, height, pickups, *_ = spec
+        fig = Figure(figsize=(width * scale / 100, height * scale / 100), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.set_xlim(0, width)
+        ax.set_ylim(0, height)
+        ax.set_axis_off()
+        for coords in polygons:
+            ax.add_patch(patches.Polygon(coords, closed=True, color='black'))
+        for pickup in pickups:
+            ax.add_patch(patches.Circle(pickup, 0.3, color='green'))
+        ax.add_patch(patches.Circle(start, 0.3, color='red'))
+        ax.add_patch(patches.Circle(end, 0.3, color='blue'))
+        line, = ax.plot([], [], color='blue', animated=True)
+        canvas.draw()
+        return fig, canvas, ax, line, canvas.copy_from_bbox(fig.bbox)
+
+    # Restore the cached obstacle layer and only draw the path on top of it
+    fig, canvas, ax, line, background = _staticLayer((map_key, "agg", scale), build)
+    canvas.restore_region(background)
+    line.set_data(path[:, 0], path[:, 1])
+    ax.draw_artist(line)
+
+    from PIL import Image
+    Image.fromarray(np.asarray(canvas.buffer_rgba())[:, :, :3]).save(filename, compress_level=_PNG_COMPRESS_LEVEL)
+
+def _renderBatch(spec: tuple, map_key, jobs: list[tuple[np.ndarray, str]], method: str, scale: int) -> list[str]:
+    render = _renderNumpy if method == "numpy" else _renderAgg
+    for path, filename in jobs:
+        render(spec, map_key, path, filename, scale)
+    return [filename for _, filename in jobs]
+
+class BatchRenderer:
+    """
+    A headless renderer that writes solved routes to PNG files across a pool of worker processes.
+
+    The static layer of a map (grid, obstacles, pick-up points, start and end) is rendered once per worker
+    and reused for every route on that map; each worker keeps the layers of the few maps it used last. Two methods are available:
+    - "numpy": rasterize straight into a NumPy image buffer, without matplotlib (fastest)
+    - "agg": draw with matplotlib patches on the Agg backend and blit the route over the cached background
+
+    Methods:
+    - render(pairs: list[tuple[Map2d, Solution2d]], out_dir: str, names: list[str] = None) -> list[str]:
+      Render every pair and return the written file names
+
+    Example:
+    >>> renderer = BatchRenderer(max_workers=8, scale=20)
+    >>> files = renderer.render([(map2d, solution), (map2d, other_solution)], "renders")
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, scale: int = 20, method: str = "numpy", chunk_size: int = 64):
+        """
+        Initializes the BatchRenderer object.
+
+        Args:
+        - max_workers: Number of worker processes. Defaults to the number of CPUs
+        - scale: Pixels per map unit
+        - method: "numpy" or "agg"
+        - chunk_size: Number of routes sent to a worker at once
+        """
+
+        if method not in ("numpy", "agg"):
+            raise ValueError("The rendering method must be 'numpy' or 'agg'.")
+
+        self.__max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.__scale = scale
+        self.__method = method
+        self.__chunk_size = chunk_size
+
+    def render(self, pairs: list[tuple[Map2d, Solution2d]], out_dir: str, names: Optional[list[str]] = None) -> list[str]:
+        """
+        Render every (map, solution) pair to a PNG file.
+
+        Args:
+        - pairs: Maps and their solutions
+        - out_dir: Directory the images are written to. It is created if needed
+        - names: Optional file names (without directory) for the images. Defaults to route_<index>.png
+
+        Returns:
+        - list[str]: Paths of the written images, in the order of the pairs
+        """
+
+        os.makedirs(out_dir, exist_ok=True)
+        names = names if names is not None else [f"route_{i}.png" for i in range(len(pairs))]
+        filenames = [os.path.join(out_dir, name) for name in names]
+
+        # Group the routes by map so each worker task carries one map snapshot and many routes
+        specs: dict[int, tuple] = {}
+        jobs: dict[int, list[tuple[np.ndarray, str]]] = {}
+        for (map2d, solution), filename in zip(pairs, filenames):
+            map_key = id(map2d)
+            if map_key not in specs:
+                specs[map_key] = map2d.toSpec()
+                jobs[map_key] = []
+            path = np.array(solution.getTuplePath(), dtype=float).reshape(-1, 2)
+            jobs[map_key].append((path, filename))
+
+        tasks = []
+        for map_key, map_jobs in jobs.items():
+            # The spec itself identifies the map inside the workers, since ids are only unique in this process
+            worker_key = hash(repr(specs[map_key]))
+            for i in range(0, len(map_jobs), self.__chunk_size):
+                tasks.append((specs[map_key], worker_key, map_jobs[i:i + self.__chunk_size], self.__method, self.__scale))
+
+        if self.__max_workers <= 1 or len(tasks) == 1:
+            for task in tasks:
+                _renderBatch(*task)
+        else:
+            with ProcessPoolExecutor(max_workers=self.__max_workers) as pool:
+                list(pool.map(_renderBatch, *zip(*tasks)))
+
+        return filenames
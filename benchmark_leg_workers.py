@@ -0,0 +1,79 @@
+# Measure the wall-clock time of planning the legs of a route serially and in a process pool (GASolver's
+# leg_workers). A large serpentine map shows the gain of the pool, a bundled map checks that small routes are
+# still planned serially. Exits with status 1 if the pool makes a route slower, or if it gives no gain on the
+# large map while several CPUs are free.
+
+import os
+import sys
+import time
+import numpy as np
+
+REPEATS = 3
+
+# A large map must be at least this much faster with the pool, if there are free CPUs to run it
+MIN_SPEEDUP = 1.3
+
+# A pool must never make a route more than this much slower than serial planning
+MAX_SLOWDOWN = 1.25
+
+def serpentineMap(size: int = 300, walls: int = 6, pickups: int = 5):
+    # Walls from alternate sides force every leg through the whole serpentine. The pick-up points sit in the
+    # first and last corridors, so every leg crosses the map.
+    from shapely.geometry import Polygon
+    from map_and_obstacles import Map2d
+
+    gap = size // (walls + 1)
+    obstacles = []
+    for i in range(1, walls + 1):
+        x = i * gap
+        low, high = (1, size - gap // 2) if i % 2 == 1 else (gap // 2, size - 1)
+        obstacles.append(Polygon([(x - 1, low), (x + 1, low), (x + 1, high), (x - 1, high)]))
+    stops = [(gap // 2, size // 2 + 10 * k) if k % 2 == 0 else (size - gap // 2, size // 2 + 10 * k)
+             for k in range(-(pickups // 2), pickups - pickups // 2)]
+    return Map2d((2, 2), (size - 2, size - 2), obstacles, 0, size, size, stops)
+
+def timeLegs(map2d, order: list, leg_workers: int) -> tuple[float, float]:
+    from solver import GASolver
+
+    timings, cost = [], None
+    for _ in range(REPEATS):
+        solver = GASolver(leg_workers=leg_workers)
+        start = time.perf_counter()
+        legs = list(solver.iterLegs(map2d, order))
+        timings.append((time.perf_counter() - start) * 10**3)
+        cost = sum(leg.cost for leg in legs)
+    return float(np.median(timings)), cost
+
+def main() -> int:
+    from map_file_reader import MapFileReader
+    from solver import _legWorkers
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    workers = max(2, min(cpus, 4))
+    print(f"CPUs available: {cpus}, leg_workers: {workers}")
+
+    failed = False
+    cases = [("large serpentine", serpentineMap(), True),
+             ("tsp_static_obstacles_2", MapFileReader("input_tsp/tsp_static_obstacles_2.txt").readMap2d(), False)]
+    for name, map2d, large in cases:
+        order = list(map2d.getPickUpPoints())
+        pooled_workers = _legWorkers(map2d, len(order) + 1, workers)
+        serial_ms, serial_cost = timeLegs(map2d, order, 1)
+        pooled_ms, pooled_cost = timeLegs(map2d, order, workers)
+        speedup = serial_ms / pooled_ms
+
+        ok = abs(serial_cost - pooled_cost) < 1e-9 and speedup >= 1 / MAX_SLOWDOWN
+        if large and cpus > 1:
+            ok &= speedup >= MIN_SPEEDUP
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} serial={serial_ms:8.1f} ms  pooled={pooled_ms:8.1f} ms  "
+              f"speedup={speedup:4.2f}  processes used={pooled_workers}")
+    if cpus == 1:
+        print("A single CPU is free, so every route is planned serially and the gain of the pool cannot be shown.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# Measure the import time of the entry points in fresh interpreters and check them against a startup budget.
+# Every case also lists modules it must not load: matplotlib is only for drawing, Shapely only for building
+# or querying polygons, and the registry must not import any solver. Exits with status 1 if a check fails.
+
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+REPEATS = 7
+
+# (name, statement run in a fresh interpreter, budget of the median in milliseconds, modules it must not load)
+CASES = [
+    ("registry", "import solver_registry", 20, ["numpy", "shapely", "matplotlib", "solver"]),
+    ("command line", "import plan", 50, ["numpy", "shapely", "matplotlib", "solver"]),
+    ("solver", "import solver", 250, ["shapely", "matplotlib"]),
+    ("visualizer", "import visualizer", 250, ["shapely", "matplotlib"]),
+    ("planning service", "import planning_service", 400, ["shapely", "matplotlib", "solver"]),
+    ("solve without obstacles",
+     "from solver_registry import getSolver\n"
+     "from map_and_obstacles import Map2d\n"
+     "getSolver('a_asterisk').solve(Map2d((1, 1), (18, 18), [], 0, 20, 20, []))",
+     300, ["shapely", "matplotlib"]),
+    ("read and solve",
+     "from solver_registry import getSolver\n"
+     "from map_file_reader import MapFileReader\n"
+     "getSolver('a_asterisk').solve(MapFileReader('input_basic/ordinary_path.txt').readMap2d())",
+     400, ["matplotlib"]),
+]
+
+# Runs the statement and reports its duration and the watched modules that were loaded
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<case>", "exec"))
+elapsed = (time.perf_counter() - start) * 10**3
+print(json.dumps({"elapsed_ms": elapsed, "loaded": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+def measure(statement: str, forbidden: list[str]) -> tuple[list[float], set[str]]:
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    timings, loaded = [], set()
+    for _ in range(REPEATS):
+        output = subprocess.run([sys.executable, "-c", CHILD, statement, *forbidden], cwd=root, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["elapsed_ms"])
+        loaded.update(result["loaded"])
+    return timings, loaded
+
+def main() -> int:
+    failed = False
+    for name, statement, budget_ms, forbidden in CASES:
+        timings, loaded = measure(statement, forbidden)
+        median = float(np.median(timings))
+        ok = median <= budget_ms and not loaded
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} median={median:7.1f} ms  min={min(timings):7.1f} ms  "
+              f"budget={budget_ms} ms" + (f"  unexpected imports: {sorted(loaded)}" if loaded else ""))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,6 @@
-# NOTICE: Uncomment the last line in the file solver.py before running this code.
-
-import threading
-import numpy as np
-
 if __name__ == "__main__":
     from map_file_reader import MapFileReader
     from solver import GASolver
-    import numpy as np
     import matplotlib.pyplot as plt
 
     # Read the map file
@@ -18,11 +12,13 @@ if __name__ == "__main__":
     # Initialize the genetic algorithm solver
     ga_solver = GASolver(num_generations=300, num_of_parents=200, sol_per_pop=2000, mutation_probability=(0.8,0.2))
     
-    # Solve the TSP problem
-    solution, generations_averages, generations_bests = map.solvedBy(ga_solver)
+    # Solve the TSP problem. The per-generation telemetry of the run comes with the solution.
+    solution = map.solvedBy(ga_solver)
+    telemetry = solution.telemetry
+    print(f"Cost: {solution.cost}, runtime: {solution.runtime_milisec} miliseconds, {telemetry}")
     
-    # Plot the generations_averages on a plot
-    plt.plot(generations_averages)
+    # Plot the average fitness of the generations on a plot
+    plt.plot(telemetry.mean_fitness)
     plt.xlabel('Generation')
     plt.ylabel('Average Fitness')
     plt.title('Average Fitness of Generations')
@@ -31,9 +27,19 @@ if __name__ == "__main__":
     # Clear the plot
     plt.clf()
     
-    # Plot the generations_bests on a plot
-    plt.plot(generations_bests)
+    # Plot the best fitness of the generations on a plot
+    plt.plot(telemetry.best_fitness)
     plt.xlabel('Generation')
     plt.ylabel('Best Fitness')
     plt.title('Best Fitness of Generations')
-    plt.savefig('best_fitness.png')
\ No newline at end of file
+    plt.savefig('best_fitness.png')
+    
+    # Clear the plot
+    plt.clf()
+    
+    # Plot the time of the generations on a plot
+    plt.plot(telemetry.generation_milisec)
+    plt.xlabel('Generation')
+    plt.ylabel('Time (miliseconds)')
+    plt.title('Time per Generation')
+    plt.savefig('generation_time.png')
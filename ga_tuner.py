@@ -0,0 +1,238 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+
+# Values tried for each parameter of GASolver. num_generations is not part of the space: it is the budget
+# that successive halving raises from rung to rung.
+DEFAULT_SPACE: dict[str, list] = {
+    "sol_per_pop": [50, 100, 200, 500, 1000, 2000],
+    "num_of_parents": [10, 20, 50, 100, 200],
+    "mutation_probability": [(0.8, 0.2), (0.5, 0.1), (0.3, 0.05), (1.0, 0.5)],
+    "stall_generations": [5, 10, 25, None],
+    "crossover": ["ox1", "pmx", "erx"],
+    "mutation": ["swap", "inversion", "two_opt"],
+    "elitism": [0, 2],
+}
+
+# Maps read by this worker process, keyed by file name
+_MAPS: dict = {}
+
+def _runTrial(filename: str, config: dict, seed: np.random.SeedSequence) -> tuple[float, float]:
+    # Runs in a worker process: solve the map once with the configuration and return (cost, runtime in ms)
+    from map_file_reader import MapFileReader
+    from solver import GASolver
+
+    if filename not in _MAPS:
+        _MAPS[filename] = MapFileReader(filename).readMap2d()
+    solution = _MAPS[filename].solvedBy(GASolver(telemetry=False, seed=seed, **config))
+    return float(solution.cost), float(solution.runtime_milisec)
+
+def paretoFront(trials: list[dict]) -> list[dict]:
+    """
+    Return the trials that no other trial beats on both runtime and gap, sorted by runtime.
+
+    Args:
+    - trials: Trials as returned by GATuner.tune()
+
+    Returns:
+    - list[dict]: The non-dominated trials
+    """
+
+    front = []
+    best_gap = np.inf
+    for trial in sorted(trials, key=lambda t: (t["runtime_ms"], t["gap"])):
+        if trial["gap"] < best_gap:
+            front.append(trial)
+            best_gap = trial["gap"]
+    return front
+
+class GATuner:
+    """
+    A harness that searches the parameters of GASolver for the cheapest settings that reach a target quality.
+
+    Configurations are drawn at random from a search space and evaluated with successive halving: every
+    configuration first runs with a small number of generations, then only the best 1/eta of them run again
+    with eta times more generations, until the largest budget is reached. Bad configurations are cut off after
+    their cheap runs. With min_generations equal to max_generations this is a plain random search.
+
+    Every configuration runs on every map with the same seeds, so configurations are compared on identical
+    workloads. The runs are spread over a process pool. The quality of a trial is its gap: the mean, over the
+    maps, of its mean tour cost relative to the best mean cost found on that map by any trial.
+
+    Methods:
+    - tune() -> list[dict]: Run the search and return every trial
+    - paretoFront() -> list[dict]: Return the trials with the best trade-off between runtime and gap
+    - cheapest(target_gap: float) -> Optional[dict]: Return the fastest trial within the target gap
+
+    Example:
+    >>> tuner = GATuner(["input_tsp/tsp_static_obstacles_1.txt", "input_tsp/tsp_static_obstacles_2.txt"], num_configs=27)
+    >>> trials = tuner.tune()
+    >>> tuner.cheapest(target_gap=0.02)["config"]
+    {'sol_per_pop': 200, 'num_of_parents': 20, 'mutation_probability': (0.8, 0.2), 'stall_generations': 25, 'crossover': 'erx', 'mutation': 'two_opt', 'elitism': 2, 'num_generations': 90}
+    """
+
+    def __init__(self, maps: list[str], space: Optional[dict[str, list]] = None, num_configs: int = 27,
+                 min_generations: int = 10, max_generations: int = 270, eta: int = 3, repeats: int = 3,
+                 max_workers: Optional[int] = None, seed: int = 0):
+        """
+        Initializes the GATuner object.
+
+        Args:
+        - maps: Map files with pick-up points the configurations are evaluated on
+        - space: Values tried for each constructor parameter of GASolver. Defaults to DEFAULT_SPACE
+        - num_configs: Number of configurations drawn from the space
+        - min_generations: Number of generations of the first rung
+        - max_generations: Number of generations of the last rung
+        - eta: Reduction factor: a rung keeps 1/eta of the configurations and gives them eta times more generations
+        - repeats: Number of seeded runs of every configuration on every map
+        - max_workers: Number of worker processes. 1 runs the trials in this process, which gives the least noisy runtimes
+        - seed: Seed of the configuration sampling and of the runs
+        """
+
+        if len(maps) == 0:
+            raise ValueError("At least one map is needed.")
+        if eta < 2:
+            raise ValueError("The reduction factor eta must be at least 2.")
+        if not 0 < min_generations <= max_generations:
+            raise ValueError("The number of generations must satisfy 0 < min_generations <= max_generations.")
+
+        self.__maps = list(maps)
+        self.__space = dict(space if space is not None else DEFAULT_SPACE)
+        self.__num_configs = num_configs
+        self.__min_generations = min_generations
+        self.__max_generations = max_generations
+        self.__eta = eta
+        self.__repeats = repeats
+        self.__max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.__seed = seed
+        self.__trials: list[dict] = []
+
+    def tune(self) -> list[dict]:
+        """
+        Run the successive halving search.
+
+        Returns:
+        - list[dict]: Every trial, with the keys "config" (constructor parameters of GASolver), "rung",
+          "runtime_ms" (mean runtime of a run), "cost" (mean tour cost per map) and "gap"
+        """
+
+        # Independent streams: one for sampling the configurations, one per repeat for the runs
+        sampling, *seeds = np.random.SeedSequence(self.__seed).spawn(self.__repeats + 1)
+        configs = self.__sampleConfigs(np.random.default_rng(sampling))
+
+        self.__trials = []
+        pool = ProcessPoolExecutor(max_workers=self.__max_workers) if self.__max_workers > 1 else None
+        try:
+            generations, rung = self.__min_generations, 0
+            while True:
+                trials = self.__evaluate(pool, configs, generations, seeds, rung)
+                self.__trials += trials
+                if generations >= self.__max_generations or len(configs) <= 1:
+                    break
+
+                # Keep the best configurations of the rung for the next, larger budget
+                gaps = self.__gaps(trials)
+                order = sorted(range(len(trials)), key=lambda i: (gaps[i], trials[i]["runtime_ms"]))
+                configs = [{k: v for k, v in trials[i]["config"].items() if k != "num_generations"}
+                           for i in order[:max(1, len(trials) // self.__eta)]]
+                generations, rung = min(generations * self.__eta, self.__max_generations), rung + 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # The gaps of the report are relative to the best cost of every map over the whole search
+        for trial, gap in zip(self.__trials, self.__gaps(self.__trials)):
+            trial["gap"] = gap
+        return self.__trials
+
+    def paretoFront(self) -> list[dict]:
+        """
+        Return the trials of the latest search that no other trial beats on both runtime and gap.
+        """
+
+        return paretoFront(self.__trials)
+
+    def cheapest(self, target_gap: float) -> Optional[dict]:
+        """
+        Return the fastest trial of the latest search whose gap is at most target_gap, or None.
+        """
+
+        eligible = [trial for trial in self.__trials if trial["gap"] <= target_gap]
+        return min(eligible, key=lambda t: t["runtime_ms"]) if eligible else None
+
+    def __sampleConfigs(self, rng: np.random.Generator) -> list[dict]:
+        configs, seen = [], set()
+        attempts = 0
+        while len(configs) < self.__num_configs and attempts < 100 * self.__num_configs:
+            attempts += 1
+            config = {name: values[rng.integers(len(values))] for name, values in self.__space.items()}
+            if config.get("num_of_parents", 0) > config.get("sol_per_pop", np.inf):
+                continue
+            key = repr(sorted(config.items()))
+            if key not in seen:
+                seen.add(key)
+                configs.append(config)
+        return configs
+
+    def __evaluate(self, pool: Optional[ProcessPoolExecutor], configs: list[dict], generations: int,
+                   seeds: list[np.random.SeedSequence], rung: int) -> list[dict]:
+        configs = [dict(config, num_generations=generations) for config in configs]
+        tasks = [(filename, config, seed) for config in configs for filename in self.__maps for seed in seeds]
+        if pool is None:
+            results = [_runTrial(*task) for task in tasks]
+        else:
+            results = list(pool.map(_runTrial, *zip(*tasks)))
+
+        trials = []
+        runs_per_config = len(self.__maps) * len(seeds)
+        for i, config in enumerate(configs):
+            runs = results[i * runs_per_config:(i + 1) * runs_per_config]
+            costs = np.array([cost for cost, _ in runs]).reshape(len(self.__maps), len(seeds))
+            trials.append({"config": config, "rung": rung, "runtime_ms": float(np.mean([t for _, t in runs])),
+                           "cost": dict(zip(self.__maps, costs.mean(axis=1).tolist()))})
+        return trials
+
+    def __gaps(self, trials: list[dict]) -> list[float]:
+        # Mean over the maps of the cost of every trial relative to the best cost of the map among the trials
+        costs = np.array([[trial["cost"][f] for f in self.__maps] for trial in trials])
+        return (costs / costs.min(axis=0) - 1).mean(axis=1).tolist()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tune the parameters of GASolver with successive halving.")
+    parser.add_argument("maps", nargs="*", default=["input_tsp/tsp_static_obstacles_1.txt", "input_tsp/tsp_static_obstacles_2.txt"])
+    parser.add_argument("--configs", type=int, default=27, help="Number of sampled configurations")
+    parser.add_argument("--min-generations", type=int, default=10)
+    parser.add_argument("--max-generations", type=int, default=270)
+    parser.add_argument("--eta", type=int, default=3, help="Reduction factor between rungs")
+    parser.add_argument("--repeats", type=int, default=3, help="Seeded runs per configuration and map")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target-gap", type=float, default=0.02, help="Quality target for the recommended configuration")
+    parser.add_argument("--output", default=None, help="Write every trial to this JSON file")
+    args = parser.parse_args()
+
+    tuner = GATuner(args.maps, num_configs=args.configs, min_generations=args.min_generations,
+                    max_generations=args.max_generations, eta=args.eta, repeats=args.repeats,
+                    max_workers=args.workers, seed=args.seed)
+    start = time.perf_counter()
+    trials = tuner.tune()
+    print(f"Trials: {len(trials)}, elapsed: {time.perf_counter() - start:.1f} s")
+
+    print("Pareto front of runtime against tour cost:")
+    for trial in tuner.paretoFront():
+        print(f"  runtime={trial['runtime_ms']:8.1f} ms  gap={trial['gap'] * 100:6.2f} %  {trial['config']}")
+
+    cheapest = tuner.cheapest(args.target_gap)
+    if cheapest is None:
+        print(f"No configuration is within {args.target_gap * 100:.1f} % of the best cost.")
+    else:
+        print(f"Cheapest configuration within {args.target_gap * 100:.1f} % of the best cost: {cheapest['config']}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(trials, f, indent=2)
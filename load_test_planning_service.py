@@ -0,0 +1,75 @@
+# Fire many concurrent route requests at a local planning service and report latency and throughput.
+
+import asyncio
+import time
+import numpy as np
+
+NUM_REQUESTS = 200
+CONCURRENCY = 32
+DEADLINE_MS = 2000
+
+# Seed of the request mix, so that two runs send the same sequence of requests
+SEED = 0
+RNG = np.random.default_rng(SEED)
+
+MAPS = {
+    "ordinary": "input_basic/ordinary_path.txt",
+    "long": "input_basic/long_path.txt",
+    "no_path": "input_basic/no_path.txt",
+    "tsp_1": "input_tsp/tsp_static_obstacles_1.txt",
+    "tsp_2": "input_tsp/tsp_static_obstacles_2.txt",
+}
+
+# Requests are drawn from a small set so that identical queries are in flight together and get deduplicated
+REQUESTS = [
+    ("ordinary", dict(solver="a_asterisk")),
+    ("ordinary", dict(solver="dijkstra")),
+    ("ordinary", dict(start=(19, 16), end=(2, 2), solver="a_asterisk")),
+    ("long", dict(solver="a_asterisk")),
+    ("long", dict(start=(12, 10), end=(2, 2), solver="a_asterisk")),
+    ("no_path", dict(solver="a_asterisk")),
+    ("tsp_1", dict(solver="ga")),
+    ("tsp_2", dict(solver="ga", time_budget_ms=200)),
+]
+
+async def run(client, latencies: list, outcomes: dict):
+    map_id, params = REQUESTS[RNG.integers(len(REQUESTS))]
+    start = time.perf_counter()
+    try:
+        await client.solve(map_id, deadline_ms=DEADLINE_MS, **params)
+        outcomes["solved"] += 1
+    except TimeoutError:
+        outcomes["timeout"] += 1
+    except Exception:
+        outcomes["failed"] += 1
+    latencies.append((time.perf_counter() - start) * 10**3)
+
+async def main():
+    from planning_service import LocalPlanningClient
+    
+    latencies: list[float] = []
+    outcomes = {"solved": 0, "timeout": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    
+    async def limited(client):
+        async with semaphore:
+            await run(client, latencies, outcomes)
+    
+    async with LocalPlanningClient(MAPS) as client:
+        # Warm up the worker pool before measuring
+        await client.solve("ordinary")
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(client) for _ in range(NUM_REQUESTS)))
+        elapsed = time.perf_counter() - start
+        stats = client.getStats()
+    
+    print(f"Requests: {NUM_REQUESTS}, concurrency: {CONCURRENCY}, elapsed: {elapsed:.2f} s, "
+          f"throughput: {NUM_REQUESTS / elapsed:.1f} req/s")
+    print(f"Outcomes: {outcomes}")
+    print(f"Latency (ms): p50={np.percentile(latencies, 50):.1f}, p95={np.percentile(latencies, 95):.1f}, "
+          f"max={max(latencies):.1f}")
+    print(f"Service stats: {stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
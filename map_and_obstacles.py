@@ -1,12 +1,71 @@
+from __future__ import annotations
 import time
-from shapely.affinity import translate
-from shapely.geometry import Polygon, Point, LineString
+import numpy as np
 import threading
 
-from action import Action2d
-from typing import Optional
+from action import Action2d, Action3d, ACTIONS2D, ACTION2D_DELTAS
+from typing import TYPE_CHECKING, Optional, Sequence
+
+# Shapely is only imported where geometries are built or queried, so that maps without obstacles, 3D maps
+# and processes that only read precomputed grids do not pay for it at startup
+if TYPE_CHECKING:
+    from shapely import STRtree
+    from shapely.geometry import Polygon
 # from solver import Solver  # Moved inside the function where it's used to avoid circular import
 
+def _wavefrontDistances(blocked: np.ndarray, move_costs: np.ndarray, source: tuple[int, int]) -> np.ndarray:
+    """
+    Bulk Dijkstra over the lattice: the cost of the shortest path from the source to every lattice point.
+    
+    Rather than settling one point at a time from a heap, the frontier is expanded a whole cost bucket at a
+    time. With a bucket as wide as the cheapest move, no point of the bucket can improve another one, so all
+    of them are final together. Their neighbors under the eight actions are then computed and relaxed with
+    array operations, one action at a time. The result is exactly the Dijkstra distance field.
+    
+    Args:
+    - blocked: Boolean occupancy grid indexed by [x, y]
+    - move_costs: Cost of every action from every lattice point, of shape (8,) + blocked.shape
+    - source: Lattice point the distances are measured from
+    
+    Returns:
+    - np.ndarray: Float array of the shape of the grid. Blocked and unreachable points are infinite.
+    """
+    
+    width, height = blocked.shape
+    x, y = source
+    if not (0 <= x < width and 0 <= y < height) or blocked[x, y]:
+        return np.full(blocked.shape, np.inf)
+    
+    finite = move_costs[np.isfinite(move_costs)]
+    bucket_width = float(finite.min()) if finite.size > 0 else 1.0
+    
+    # Work on flat indices of the grid padded with a blocked border, so neighbors need no bounds check
+    stride = height + 2
+    settled = np.pad(blocked, 1, constant_values=True).ravel()
+    distance = np.full(settled.shape, np.inf)
+    costs = np.pad(move_costs, ((0, 0), (1, 1), (1, 1)), constant_values=np.inf).reshape(len(move_costs), -1)
+    offsets = [(action.value, action.delta()[0] * stride + action.delta()[1]) for action in ACTIONS2D]
+    
+    frontier = np.array([(x + 1) * stride + y + 1])
+    distance[frontier] = 0.0
+    while len(frontier) > 0:
+        # Settle every frontier point of the lowest bucket at once
+        tentative = distance[frontier]
+        in_bucket = tentative < tentative.min() + bucket_width
+        bucket = frontier[in_bucket]
+        settled[bucket] = True
+        
+        reached = [frontier[~in_bucket]]
+        for value, offset in offsets:
+            neighbors = bucket + offset
+            open_ = ~settled[neighbors]
+            sources, neighbors = bucket[open_], neighbors[open_]
+            np.minimum.at(distance, neighbors, distance[sources] + costs[value, sources])
+            reached.append(neighbors)
+        frontier = np.unique(np.concatenate(reached))
+    
+    return distance.reshape(width + 2, height + 2)[1:-1, 1:-1].copy()
+
 class Node2d:
     """A class representing a data structure that searching algorithms use to traverse the map and store information about the path.
     
@@ -110,6 +169,125 @@ class Node2d:
         
         return hash(self.getState())
     
+def _componentLabels(blocked: np.ndarray) -> np.ndarray:
+    """
+    Label the connected components of the free lattice points under the eight actions.
+    
+    The free points are first grouped into runs along y, which are connected by construction. Two runs of
+    consecutive columns are connected when one of their points are adjacent, straight or diagonally; every
+    such pair of runs is listed once. The runs are then merged in rounds: each round hooks, for all pairs at
+    once, the root of the larger run under the root of the smaller one, then flattens the trees by pointer
+    jumping, until the two runs of every pair have the same root. Parents always have a smaller index, so the
+    trees stay acyclic whichever hook wins when several pairs hook the same root.
+    
+    The label of a point is the flat index of the first point of its root run, a point of the component, so
+    the labels of different components never collide, also with labels computed on another part of the grid.
+    
+    Args:
+    - blocked: Boolean occupancy grid indexed by [x, y]
+    
+    Returns:
+    - np.ndarray: Integer array of the shape of the grid. Blocked points are -1, two free points have the
+      same label if and only if one can be reached from the other.
+    """
+    
+    width, height = blocked.shape
+    # Work on flat indices of the grid padded with a blocked border, so that runs end at the border
+    stride = height + 2
+    free = ~np.pad(blocked, 1, constant_values=True).ravel()
+    starts = np.flatnonzero(free[1:] & ~free[:-1]) + 1
+    run = np.zeros(free.size, dtype=np.int64)
+    run[starts] = 1
+    run = np.cumsum(run) * free
+    
+    # Pairs of runs in consecutive columns with adjacent points, one entry per pair and direction
+    firsts, seconds = [], []
+    for offset in (stride - 1, stride, stride + 1):
+        first, second = run[:-offset], run[offset:]
+        keep = (first > 0) & (second > 0)
+        keep[1:] &= (first[1:] != first[:-1]) | (second[1:] != second[:-1])
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    
+    parent = np.arange(len(starts) + 1)
+    while True:
+        root_first, root_second = parent[first], parent[second]
+        differ = root_first != root_second
+        if not differ.any():
+            break
+        # Pairs already in one tree stay so, only the others are looked at again
+        first, second = first[differ], second[differ]
+        root_first, root_second = root_first[differ], root_second[differ]
+        parent[np.maximum(root_first, root_second)] = np.minimum(root_first, root_second)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    
+    # First point of the root run of every point, back to unpadded flat indices
+    first_points = np.concatenate([[-1], starts])[parent[run]]
+    labels = (first_points // stride - 1) * height + first_points % stride - 1
+    labels = labels.reshape(width + 2, height + 2)[1:-1, 1:-1].copy()
+    labels[blocked] = -1
+    return labels
+
+def _updateComponentLabels(previous_blocked: np.ndarray, previous_labels: np.ndarray, blocked: np.ndarray) -> np.ndarray:
+    """
+    Update component labels (see _componentLabels()) after some lattice points changed between blocked and free.
+    
+    Only the components that contain or touch a changed point can split or merge. When points were only
+    blocked and their free neighbors are still connected within a small window around them, no component can
+    split, since every path through the blocked points has a detour through the window, and only the blocked
+    points change. Otherwise the affected components are labelled again together with the points freed in
+    between, and every other component keeps its label. When they make up most of the map, the whole grid is
+    labelled again.
+    
+    Args:
+    - previous_blocked: Occupancy grid the labels were computed for
+    - previous_labels: Labels of the previous grid
+    - blocked: New occupancy grid
+    
+    Returns:
+    - np.ndarray: Labels of the new grid, with the guarantees of _componentLabels()
+    """
+    
+    changed = previous_blocked != blocked
+    rows, columns = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+    if len(rows) == 0:
+        return previous_labels
+    
+    # Points within one move of a change, computed in a window around the changes
+    width, height = blocked.shape
+    x0, x1 = max(int(rows[0]) - 2, 0), min(int(rows[-1]) + 3, width)
+    y0, y1 = max(int(columns[0]) - 2, 0), min(int(columns[-1]) + 3, height)
+    xs, ys = np.nonzero(changed[x0:x1, y0:y1])
+    xs, ys = xs + x0, ys + y0
+    padded = np.pad(changed[x0:x1, y0:y1], 1)
+    touched = np.zeros_like(changed)
+    for dx, dy in [(0, 0)] + ACTION2D_DELTAS.tolist():
+        touched[x0:x1, y0:y1] |= padded[1 + dx:1 + dx + x1 - x0, 1 + dy:1 + dy + y1 - y0]
+    labels = previous_labels.copy()
+    labels[blocked] = -1
+    
+    # A label is the index of a point of its component: a blocked point must not keep naming it
+    names_component = previous_labels[xs, ys] == xs * height + ys
+    if not (previous_blocked & ~blocked).any() and not names_component.any():
+        window = blocked[x0:x1, y0:y1]
+        neighbors = _componentLabels(window)[touched[x0:x1, y0:y1] & ~window]
+        if len(np.unique(neighbors)) <= 1:
+            return labels
+    
+    affected = np.unique(previous_labels[touched & ~previous_blocked])
+    region = (np.isin(previous_labels, affected) | changed) & ~blocked
+    if 2 * np.count_nonzero(region) > np.count_nonzero(~blocked):
+        return _componentLabels(blocked)
+    
+    # The new labels are points of the region, so they cannot collide with the labels kept outside it
+    labels[region] = _componentLabels(~region)[region]
+    return labels
+
 class Map2d:
     """
     A class representing a 2D map with obstacles.
@@ -121,6 +299,8 @@ class Map2d:
     - width: Width of the map
     - height: Height of the map
     - pickUpPoints: List of pick-up points
+    - robotRadius: Radius of the robot footprint. 0 treats the robot as a point
+    - costRaster: Optional traversal cost of every lattice point. None means every point costs 1
     
     Methods:
     - solvedBy(solver: Optional[Solver]) -> Optional[Solution2d]: Solve the map by a solver
@@ -132,10 +312,30 @@ class Map2d:
     - getPickUpPoints() -> list[tuple[int, int]]: Return the list of pick-up points
     - result(node: Node2d, action: Action2d) -> Node2d: Return the new state based on the action
     - getNeighbors(node: Node2d) -> list[Node2d]: Return the neighbors of the node
+    - getNeighborStates(state: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]: Return the eight candidate states and which are free
+    - getRobotRadius() -> float: Return the radius of the robot footprint
+    - setRobotRadius(radius: float): Set the radius of the robot footprint
+    - getCostRaster() -> Optional[np.ndarray]: Return the traversal cost of every lattice point
+    - setCostRaster(raster: Optional[np.ndarray]): Set the traversal cost of every lattice point
+    - getMoveCosts() -> np.ndarray: Return the cost of every action from every lattice point
+    - getMinimumCellCost() -> float: Return the smallest traversal cost, to scale heuristics
+    - getConfigurationSpace(radius: float = None) -> list[Polygon]: Return the obstacles inflated by a robot radius
+    - getOccupancyGrid(radius: float = None) -> np.ndarray: Return which lattice points are blocked
+    - getDistanceField(source: tuple[int, int]) -> np.ndarray: Return the grid distances from a lattice point
+    - getDistanceMatrix(points: Sequence[tuple[int, int]]) -> np.ndarray: Return the grid distances between points
+    - getComponentLabels(radius: float = None) -> np.ndarray: Return the connected component of every lattice point
+    - areConnected(points: Sequence[tuple[int, int]]) -> bool: Return True if a path can join all the points
+    - segmentsCollide(segments: np.ndarray) -> np.ndarray: Return which segments intersect or touch an obstacle
+    - validatePickupSequence(sequence: list[tuple[int, int]]) -> bool: Return True if the straight route is obstacle-free
+    - getLegView(start: tuple[int, int], end: tuple[int, int], blocked_points: Sequence = ()) -> Map2d: Return a static map for one leg
+    - preloadDerivedArrays(occupancy: np.ndarray, distance_fields: dict = None, component_labels: np.ndarray = None): Use precomputed arrays
+    - toSpec() -> tuple: Return a picklable snapshot of the map
+    - fromSpec(spec: tuple) -> Map2d: Build a static map from a snapshot
     """
     
     def __init__(self, start: tuple[int, int], end: tuple[int, int], obstacles: 
-                    list[Polygon], obstacles_speed: int, width: int, height: int, pickUpPoints: list[tuple[int, int]]):
+                    list[Polygon], obstacles_speed: int, width: int, height: int, pickUpPoints: list[tuple[int, int]],
+                    robot_radius: float = 0.0, cost_raster: Optional[np.ndarray] = None):
         """
         Initialize a 2D map with obstacles.
         
@@ -147,6 +347,9 @@ class Map2d:
         - width (int): Width of the map
         - height (int): Height of the map
         - pickUpPoints (list[tuple[int, int]]): List of pick-up points
+        - robot_radius (float): Radius of the robot footprint. 0 treats the robot as a point
+        - cost_raster (Optional[np.ndarray]): Traversal cost of every lattice point, of shape (width + 1, height + 1)
+          indexed by [x, y]. None means every point costs 1
         """
         
         self.__start = start
@@ -156,6 +359,14 @@ class Map2d:
         self.__width = width
         self.__height = height
         self.__pickUpPoints = pickUpPoints
+        self.setRobotRadius(robot_radius)
+        self.setCostRaster(cost_raster)
+        # Structures derived from the current obstacles (spatial index, occupancy grid), built lazily.
+        # They are dropped as soon as the obstacles change.
+        self.__obstacles_cache: dict = {}
+        self.__obstacles_cache_key = None
+        # Occupancy grids and component labels of the previous obstacles, to update the labels incrementally
+        self.__previous_obstacles_cache: dict = {}
         
         if obstacles_speed > 0:
             # Attributes for managing obstacles thread
@@ -374,35 +585,30 @@ class Map2d:
         Node2d(state=(0, 1), parent=(0, 0), action=Action2d.UP)
         """
         
-        new_state = None
-        
-        # Calculate the new state based on the action
-        if action == Action2d.LEFT:
-            new_state = (node.getState()[0] - 1, node.getState()[1])
-        elif action == Action2d.RIGHT:
-            new_state = (node.getState()[0] + 1, node.getState()[1])
-        elif action == Action2d.UP:
-            new_state = (node.getState()[0], node.getState()[1] + 1)
-        elif action == Action2d.DOWN:
-            new_state = (node.getState()[0], node.getState()[1] - 1)
-        elif action == Action2d.UP_LEFT:
-            new_state = (node.getState()[0] - 1, node.getState()[1] + 1)
-        elif action == Action2d.UP_RIGHT:
-            new_state = (node.getState()[0] + 1, node.getState()[1] + 1)
-        elif action == Action2d.DOWN_LEFT:
-            new_state = (node.getState()[0] - 1, node.getState()[1] - 1)
-        elif action == Action2d.DOWN_RIGHT:
-            new_state = (node.getState()[0] + 1, node.getState()[1] - 1)
-        
-        # If the new state intersect with any obstacle, then return None
-        for obstacle in self.__obstacles:
-            if obstacle.contains(Point(new_state)) or obstacle.touches(Point(new_state)):
+        # Calculate the new state based on the displacement table of the action
+        x, y = node.getState()
+        dx, dy = action.delta()
+        new_state = (x + dx, y + dy)
+        
+        # Static maps and robots with a footprint are checked against the cached occupancy grid
+        if self.__obstacles_speed == 0 or self.__robot_radius > 0:
+            blocked = self.getOccupancyGrid()
+            if not (0 <= new_state[0] < blocked.shape[0] and 0 <= new_state[1] < blocked.shape[1]) \
+                    or blocked[new_state[0], new_state[1]]:
                 return None
-            
+            return Node2d(new_state, node, action)
+        
         # If the new state is out-of-bound, then return None
         if not(0 < new_state[0] < self.__width
                and 0 < new_state[1] < self.__height):
             return None
+        
+        # Moving obstacles change every milisecond, so the point is tested against their current position.
+        # A point intersects an obstacle when it lies inside it or touches it.
+        import shapely
+        for obstacle in self.__obstacles:
+            if shapely.intersects_xy(obstacle, new_state[0], new_state[1]):
+                return None
             
         return Node2d(new_state, node, action)
     
@@ -429,33 +635,502 @@ class Map2d:
         [Node2d(state=(0, 1), parent=(0, 0), action=Action2d.UP), ...]
         """
         
-        # List to store the neighbors
-        neighbors: list[Node2d] = []
+        # All eight candidate states are generated and checked at once, then only the free ones become nodes
+        states, valid = self.getNeighborStates(node.getState())
+        return [Node2d(state, node, action)
+                for state, action, free in zip(map(tuple, states.tolist()), ACTIONS2D, valid.tolist()) if free]
+    
+    def getNeighborStates(self, state: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the states reached by the eight actions from a state, and which of them are free.
         
-        # For each action, calculate the new state and create a new node
-        for action in Action2d:
-            new_node: Node2d = self.result(node, action)
-            if new_node is not None:
-                neighbors.append(new_node)
+        This is the batched form of result(): the candidate states come from one addition of the action
+        displacement table, and their validity from one lookup in the occupancy grid (or, for moving obstacles,
+        one vectorized predicate per obstacle).
         
-        return neighbors
+        Args:
+        - state: Current lattice point
+        
+        Returns:
+        - tuple[np.ndarray, np.ndarray]: States of shape (8, 2), in the order of the action values,
+          and a boolean mask of shape (8,), True where the state is free
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [], 0, 4, 4, [])
+        >>> states, valid = map2d.getNeighborStates((1, 1))
+        >>> valid.tolist()
+        [False, True, True, False, False, True, False, False]
+        """
+        
+        states = ACTION2D_DELTAS + np.asarray(state, dtype=np.int64)
+        xs, ys = states[:, 0], states[:, 1]
+        
+        if self.__obstacles_speed == 0 or self.__robot_radius > 0:
+            blocked = self.getOccupancyGrid()
+            valid = (xs >= 0) & (xs < blocked.shape[0]) & (ys >= 0) & (ys < blocked.shape[1])
+            valid[valid] = ~blocked[xs[valid], ys[valid]]
+            return states, valid
+        
+        valid = (xs > 0) & (xs < self.__width) & (ys > 0) & (ys < self.__height)
+        import shapely
+        for obstacle in self.__obstacles:
+            valid &= ~shapely.intersects_xy(obstacle, xs, ys)
+        return states, valid
+    
+    def segmentsCollide(self, segments: np.ndarray) -> np.ndarray:
+        """
+        Test many straight segments against all obstacles at once.
+        
+        The segments are built as one array of Shapely geometries and queried in a single call against an
+        STRtree of the current obstacles (inflated by the robot radius, see getConfigurationSpace()), so the cost grows with the number of candidate pairs rather than
+        with the number of Python-level geometry tests.
+        
+        Args:
+        - segments: Array-like of shape (N, 2, 2) holding the two end points of each segment
+        
+        Returns:
+        - np.ndarray: Boolean mask of shape (N,), True where the segment intersects or touches an obstacle
+        
+        Example:
+        >>> start = (0, 0)
+        >>> end = (10, 10)
+        >>> obstacles = [Polygon([(1, 1), (1, 2), (2, 2), (2, 1)])]
+        >>> width = 20
+        >>> height = 20
+        >>> pickUpPoints = [(5, 5), (7, 7)]
+        >>> map2d = Map2d(start, end, obstacles, 0, width, height, pickUpPoints)
+        >>> map2d.segmentsCollide([[(0, 0), (3, 3)], [(0, 0), (0, 5)]])
+        array([ True, False])
+        """
+        
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        collide = np.zeros(len(segments), dtype=bool)
+        
+        tree = self.__getObstaclesTree()
+        if tree is None or len(segments) == 0:
+            return collide
+        
+        import shapely
+        lines = shapely.linestrings(segments)
+        collide[tree.query(lines, predicate="intersects")[0]] = True
+        return collide
     
     def validatePickupSequence(self, sequence: list[tuple[int, int]]) -> bool:
+        """
+        Return True if the straight route from start, through the pick-up points in order, to end does not
+        intersect or touch any obstacle.
         
-        first_line = LineString([self.__start, sequence[0]])
-        if first_line.intersects(self.__obstacles).any() or first_line.touches(self.__obstacles).any():
-            return False
+        Args:
+        - sequence: Order in which the pick-up points are visited
         
-        for i in range(len(sequence) - 1):
-            curr_line = LineString([sequence[i], sequence[i + 1]])
-            if curr_line.intersects(self.__obstacle).any() or curr_line.touches(self.__obstacle).any():
-                    return False
-
-        last_line = LineString([sequence[-1], self.__end])
-        if last_line.intersects(self.__obstacles).any() or last_line.touches(self.__obstacles).any():
+        Returns:
+        - bool: True if every leg of the straight route is obstacle-free
+        """
+        
+        route = np.array([self.__start] + list(sequence) + [self.__end], dtype=float)
+        legs = np.stack([route[:-1], route[1:]], axis=1)
+        return not self.segmentsCollide(legs).any()
+    
+    def getRobotRadius(self) -> float:
+        """
+        Return the radius of the robot footprint. 0 means the robot is a point.
+        """
+        
+        return self.__robot_radius
+    
+    def setRobotRadius(self, radius: float):
+        """
+        Set the radius of the robot footprint used by result(), getOccupancyGrid(), getDistanceField() and
+        segmentsCollide(). The configuration space of every radius used so far stays cached, so switching
+        between robot sizes does not rebuild it.
+        
+        Args:
+        - radius: Radius of the robot footprint, 0 for a point robot
+        """
+        
+        if radius < 0:
+            raise ValueError("The robot radius must not be negative.")
+        self.__robot_radius = float(radius)
+    
+    def getCostRaster(self) -> Optional[np.ndarray]:
+        """
+        Return the traversal cost of every lattice point, indexed by [x, y], or None if every point costs 1.
+        """
+        
+        return self.__cost_raster
+    
+    def setCostRaster(self, raster: Optional[np.ndarray]):
+        """
+        Set the traversal cost of every lattice point.
+        
+        Moving between two adjacent lattice points costs the length of the move times the mean cost of the
+        two points, so slow zones cost more than 1 per unit of length and preferred lanes less. The cost of
+        every action from every point is precomputed here, once, rather than on every expansion.
+        
+        Args:
+        - raster: Positive costs of shape (width + 1, height + 1) indexed by [x, y], or None for uniform costs
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [], 0, 4, 4, [])
+        >>> raster = np.ones((5, 5))
+        >>> raster[2, 1] = 3.0
+        >>> map2d.setCostRaster(raster)
+        >>> float(map2d.getMoveCosts()[Action2d.RIGHT.value, 1, 1])
+        2.0
+        """
+        
+        if raster is not None:
+            # A read-only raster (e.g. a view of shared memory) is used as is, anything else is copied first
+            raster = np.asarray(raster, dtype=float)
+            if raster.flags.writeable:
+                raster = raster.copy()
+            if raster.shape != (self.__width + 1, self.__height + 1):
+                raise ValueError(f"The cost raster must have shape {(self.__width + 1, self.__height + 1)}, got {raster.shape}.")
+            if not (raster > 0).all():
+                raise ValueError("The costs of the cost raster must be positive.")
+            raster.flags.writeable = False
+        
+        self.__cost_raster = raster
+        
+        # Cost of every action from every lattice point: its length times the mean cost of both end points.
+        # Moves that leave the lattice cost infinity.
+        cells = raster if raster is not None else np.ones((self.__width + 1, self.__height + 1))
+        padded = np.pad(cells, 1, constant_values=np.inf)
+        move_costs = np.empty((len(Action2d),) + cells.shape)
+        for action in Action2d:
+            dx, dy = action.delta()
+            target = padded[1 + dx:1 + dx + cells.shape[0], 1 + dy:1 + dy + cells.shape[1]]
+            move_costs[action.value] = action.cost() * (cells + target) / 2
+        move_costs.flags.writeable = False
+        self.__move_costs = move_costs
+        self.__minimum_cell_cost = float(cells.min()) if cells.size > 0 else 1.0
+        
+        # Distance fields depend on the costs
+        self.__obstacles_cache_key = None
+    
+    def getMoveCosts(self) -> np.ndarray:
+        """
+        Return the cost of every action from every lattice point.
+        
+        Returns:
+        - np.ndarray: Read-only array of shape (8, width + 1, height + 1) indexed by [action value, x, y].
+          Without a cost raster, every entry inside the lattice equals Action2d.cost().
+        """
+        
+        return self.__move_costs
+    
+    def getMinimumCellCost(self) -> float:
+        """
+        Return the smallest traversal cost of a lattice point, 1 without a cost raster.
+        
+        No move costs less than its length times this value, so a straight-line heuristic scaled by it
+        never overestimates and stays admissible.
+        """
+        
+        return self.__minimum_cell_cost
+    
+    def getConfigurationSpace(self, radius: Optional[float] = None) -> list:
+        """
+        Return the obstacles as seen by the centre of a robot of the given radius.
+        
+        Each polygon obstacle is grown by the radius (its Minkowski sum with the footprint), all obstacles in
+        one vectorized buffer call. The buffer polygon circumscribes the round footprint, so the inflated
+        obstacles never under-approximate it. Other geometries, such as a Point that marks a single lattice
+        point as blocked, are not physical obstacles and are kept as they are. The result is cached per
+        radius until the obstacles change.
+        
+        Args:
+        - radius: Robot radius. Defaults to the robot radius of the map
+        
+        Returns:
+        - list: Obstacles of the configuration space
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (9, 9), [Polygon([(4, 4), (6, 4), (6, 6), (4, 6)])], 0, 10, 10, [])
+        >>> map2d.getConfigurationSpace(0.5)[0].bounds
+        (3.5, 3.5, 6.5, 6.5)
+        """
+        
+        radius = self.__robot_radius if radius is None else float(radius)
+        cache = self.__getObstaclesCache()
+        if radius <= 0:
+            return cache["obstacles"]
+        
+        key = ("cspace", radius)
+        if key not in cache:
+            obstacles = np.array(cache["obstacles"], dtype=object)
+            inflated = obstacles.copy()
+            if len(obstacles) > 0:
+                import shapely
+                from shapely.geometry import Polygon
+                polygons = np.array([isinstance(obstacle, Polygon) for obstacle in cache["obstacles"]])
+                # With quad_segs segments per quarter circle, the corners of the buffer are at the radius
+                # divided by cos(pi / (4 * quad_segs)) from the obstacle
+                quad_segs = 8
+                inflated[polygons] = shapely.buffer(obstacles[polygons], radius / np.cos(np.pi / (4 * quad_segs)),
+                                                    quad_segs=quad_segs)
+            cache[key] = list(inflated)
+        return cache[key]
+    
+    def getOccupancyGrid(self, radius: Optional[float] = None) -> np.ndarray:
+        """
+        Return the occupancy grid of the lattice points of the map.
+        
+        A lattice point is blocked under the same rule as result(): it lies inside or on the boundary of an
+        obstacle, or it is not strictly inside the map frame. For a robot with a radius, the obstacles of the
+        configuration space are used and the footprint must not reach the frame either. The grid is computed
+        with one vectorized Shapely predicate per obstacle and cached per radius until the obstacles change.
+        
+        Args:
+        - radius: Robot radius. Defaults to the robot radius of the map
+        
+        Returns:
+        - np.ndarray: Read-only boolean array of shape (width + 1, height + 1) indexed by [x, y], True where blocked
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [Polygon([(1, 2), (2, 2), (2, 3)])], 0, 5, 5, [])
+        >>> map2d.getOccupancyGrid()[2, 2]
+        True
+        """
+        
+        radius = self.__robot_radius if radius is None else float(radius)
+        cache = self.__getObstaclesCache()
+        key = ("occupancy", radius)
+        if key not in cache:
+            xs, ys = np.meshgrid(np.arange(self.__width + 1), np.arange(self.__height + 1), indexing="ij")
+            blocked = ~((xs > radius) & (xs < self.__width - radius) & (ys > radius) & (ys < self.__height - radius))
+            obstacles = self.getConfigurationSpace(radius)
+            if len(obstacles) > 0:
+                import shapely
+                for obstacle in obstacles:
+                    blocked |= shapely.intersects_xy(obstacle, xs, ys)
+            blocked.flags.writeable = False
+            cache[key] = blocked
+        return cache[key]
+    
+    def getDistanceField(self, source: tuple[int, int]) -> np.ndarray:
+        """
+        Return the cost of the shortest grid path between the source and every lattice point of the map.
+        
+        Moves are the eight Action2d moves with their costs (see getMoveCosts()), on the lattice points left free by
+        getOccupancyGrid() for the robot radius of the map. Since moves are symmetric, this is also the cost from every point to the source.
+        The field is computed by a bulk wavefront (see _wavefrontDistances()) and cached per source until the obstacles change.
+        
+        Args:
+        - source: Lattice point the distances are measured from
+        
+        Returns:
+        - np.ndarray: Read-only float array of shape (width + 1, height + 1) indexed by [x, y].
+          Blocked and unreachable points are infinite.
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [], 0, 5, 5, [])
+        >>> float(map2d.getDistanceField((1, 1))[3, 1])
+        2.0
+        """
+        
+        cache = self.__getObstaclesCache()
+        key = ("distance", tuple(source), self.__robot_radius)
+        if key not in cache:
+            distance = _wavefrontDistances(self.getOccupancyGrid(), self.__move_costs, source)
+            distance.flags.writeable = False
+            cache[key] = distance
+        return cache[key]
+    
+    def getDistanceMatrix(self, points: Sequence[tuple[int, int]]) -> np.ndarray:
+        """
+        Return the cost of the shortest grid path between every pair of points.
+        
+        Every row is read at once from the distance field of its point (see getDistanceField()). Since the
+        distances are symmetric, the last row is the last column and its field is not computed.
+        
+        Args:
+        - points: Lattice points of the map
+        
+        Returns:
+        - np.ndarray: Float array of shape (len(points), len(points)). Pairs that cannot be joined are infinite.
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [], 0, 5, 5, [])
+        >>> map2d.getDistanceMatrix([(1, 1), (3, 1)]).tolist()
+        [[0.0, 2.0], [2.0, 0.0]]
+        """
+        
+        points = [tuple(point) for point in points]
+        xs = np.array([point[0] for point in points], dtype=np.int64)
+        ys = np.array([point[1] for point in points], dtype=np.int64)
+        distance = np.empty((len(points), len(points)))
+        for i, point in enumerate(points[:-1]):
+            distance[i] = self.getDistanceField(point)[xs, ys]
+        if len(points) > 0:
+            distance[-1] = distance[:, -1]
+            distance[-1, -1] = 0.0
+        return distance
+    
+    def getComponentLabels(self, radius: Optional[float] = None) -> np.ndarray:
+        """
+        Return the connected component of every lattice point of the map.
+        
+        Two free lattice points (see getOccupancyGrid()) have the same label if and only if a sequence of the
+        eight moves joins them. The labels are computed once for the whole grid with array operations (see
+        _componentLabels()) and cached per radius until the obstacles change. When they change, only the
+        components around the points that changed between blocked and free are labelled again.
+        
+        Args:
+        - radius: Robot radius. Defaults to the robot radius of the map
+        
+        Returns:
+        - np.ndarray: Read-only integer array of shape (width + 1, height + 1) indexed by [x, y], -1 where blocked
+        
+        Example:
+        >>> map2d = Map2d((1, 1), (3, 3), [Polygon([(2, 0), (2.5, 0), (2.5, 5), (2, 5)])], 0, 5, 5, [])
+        >>> labels = map2d.getComponentLabels()
+        >>> bool(labels[1, 1] == labels[3, 3])
+        False
+        """
+        
+        radius = self.__robot_radius if radius is None else float(radius)
+        cache = self.__getObstaclesCache()
+        key = ("components", radius)
+        if key not in cache:
+            blocked = self.getOccupancyGrid(radius)
+            previous = self.__previous_obstacles_cache
+            if key in previous and ("occupancy", radius) in previous:
+                labels = _updateComponentLabels(previous[("occupancy", radius)], previous[key], blocked)
+            else:
+                labels = _componentLabels(blocked)
+            labels.flags.writeable = False
+            cache[key] = labels
+        return cache[key]
+    
+    def areConnected(self, points: Sequence[tuple[int, int]]) -> bool:
+        """
+        Return True if the points are free lattice points of one connected component, so that a route can
+        visit all of them.
+        
+        Once the component labels are known (see getComponentLabels()), this costs one lookup per point, so
+        searches can reject an unreachable end or pick-up point before expanding anything. Moving obstacles
+        can open a way later, so the points of a map with moving obstacles are always considered connected.
+        
+        Args:
+        - points: Lattice points, such as the start, the pick-up points and the end
+        
+        Returns:
+        - bool: False if a point is blocked, outside the map or cut off from the others
+        
+        Example:
+        >>> map2d = MapFileReader("input_basic/no_path.txt").readMap2d()
+        >>> map2d.areConnected([map2d.getStart(), map2d.getEnd()])
+        False
+        """
+        
+        if self.__obstacles_speed > 0:
+            return True
+        
+        labels = self.getComponentLabels()
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        if len(points) == 0:
+            return True
+        xs, ys = points[:, 0], points[:, 1]
+        if not ((xs >= 0) & (xs < labels.shape[0]) & (ys >= 0) & (ys < labels.shape[1])).all():
             return False
+        values = labels[xs, ys]
+        return bool(values[0] >= 0 and (values == values[0]).all())
+    
+    def getLegView(self, start: tuple[int, int], end: tuple[int, int], blocked_points: Sequence[tuple[int, int]] = ()) -> 'Map2d':
+        """
+        Return a static map for planning one leg from start to end, without changing this map.
+        
+        The view holds a copy of the obstacle list, frozen at the current position of moving obstacles, so it
+        starts no thread and later changes of this map do not reach it. Its occupancy grid and component labels
+        are those of this map, shared rather than copied, except that the blocked points are added to the grid
+        (for instance the end point of the whole route, which intermediate legs must not cross). Views of the
+        same view share its arrays too, so a template view can be made once per route and a cheap view per leg.
         
-        return True
+        Args:
+        - start: Start point of the leg
+        - end: End point of the leg
+        - blocked_points: Lattice points that are blocked in the view only
+        
+        Returns:
+        - Map2d: A static map without pick-up points
+        
+        Example:
+        >>> through = map2d.getLegView(map2d.getStart(), map2d.getEnd(), blocked_points=[map2d.getEnd()])
+        >>> leg = A_asteriskSolver().solve(through.getLegView((2, 2), (5, 5)))
+        """
+        
+        view = Map2d(start, end, list(self.__obstacles), 0, self.__width, self.__height, [], self.__robot_radius,
+                     self.__cost_raster)
+        # The arrays of a map with moving obstacles belong to another instant, the view computes its own
+        source = self if self.__obstacles_speed == 0 else view
+        occupancy, labels = source.getOccupancyGrid(), source.getComponentLabels()
+        
+        blocked_points = np.asarray(blocked_points, dtype=np.int64).reshape(-1, 2)
+        if len(blocked_points) > 0:
+            xs, ys = blocked_points[:, 0], blocked_points[:, 1]
+            inside = (xs >= 0) & (xs < occupancy.shape[0]) & (ys >= 0) & (ys < occupancy.shape[1])
+            blocked = occupancy.copy()
+            blocked[xs[inside], ys[inside]] = True
+            blocked.flags.writeable = False
+            labels = _updateComponentLabels(occupancy, labels, blocked)
+            labels.flags.writeable = False
+            occupancy = blocked
+        view.preloadDerivedArrays(occupancy, component_labels=labels)
+        return view
+    
+    def preloadDerivedArrays(self, occupancy: np.ndarray, distance_fields: Optional[dict] = None,
+                             component_labels: Optional[np.ndarray] = None):
+        """
+        Use precomputed arrays, such as views of shared memory, instead of computing them on this map.
+        
+        The arrays must have been computed for the current obstacles and robot radius of the map. They are
+        kept like the arrays the map computes itself, and dropped as soon as the obstacles change.
+        
+        Args:
+        - occupancy: Occupancy grid, as returned by getOccupancyGrid()
+        - distance_fields: Distance fields keyed by their source point, as returned by getDistanceField()
+        - component_labels: Component labels, as returned by getComponentLabels()
+        """
+        
+        expected = (self.__width + 1, self.__height + 1)
+        if occupancy.shape != expected:
+            raise ValueError(f"The occupancy grid must have shape {expected}, got {occupancy.shape}.")
+        
+        cache = self.__getObstaclesCache()
+        cache[("occupancy", self.__robot_radius)] = occupancy
+        for source, distance in (distance_fields or {}).items():
+            cache[("distance", tuple(source), self.__robot_radius)] = distance
+        if component_labels is not None:
+            if component_labels.shape != expected:
+                raise ValueError(f"The component labels must have shape {expected}, got {component_labels.shape}.")
+            cache[("components", self.__robot_radius)] = component_labels
+    
+    def __getObstaclesCache(self) -> dict:
+        # The moving thread replaces the obstacle list and addObstacle()/removeLastObstacle() change its length,
+        # so the list object and its length identify the obstacles configuration
+        obstacles = self.__obstacles
+        key = (obstacles, len(obstacles))
+        if self.__obstacles_cache_key is None or self.__obstacles_cache_key[0] is not obstacles \
+                or self.__obstacles_cache_key[1] != len(obstacles):
+            self.__previous_obstacles_cache = {key: value for key, value in self.__obstacles_cache.items()
+                                               if key[0] in ("occupancy", "components")}
+            self.__obstacles_cache = {"obstacles": list(obstacles)}
+            self.__obstacles_cache_key = key
+        return self.__obstacles_cache
+    
+    def __getObstaclesTree(self) -> Optional[STRtree]:
+        # Rebuild the index only after the obstacles have changed, one index per robot radius
+        cache = self.__getObstaclesCache()
+        key = ("tree", self.__robot_radius)
+        if key not in cache:
+            obstacles = self.getConfigurationSpace()
+            if len(obstacles) > 0:
+                from shapely import STRtree
+                cache[key] = STRtree(obstacles)
+            else:
+                cache[key] = None
+        return cache[key]
     
     def __perform_obstacles_movement(self):
         """
@@ -466,6 +1141,8 @@ class Map2d:
         The speed of the obstacles is determined by the __obstacles_speed attribute.
         """
         
+        from shapely.affinity import translate
+        
         count = 0
         while not self.__stop_event.is_set():
             self.obstacles_lock.acquire()
@@ -489,10 +1166,14 @@ class Map2d:
             
             
             
-    def getRandomPickUpSequence(self) -> list[tuple[int, int]]:
+    def getRandomPickUpSequence(self, rng: Optional[np.random.Generator] = None) -> list[tuple[int, int]]:
         """
         Generate a random sequence of pick-up points.
 
+        Args:
+        - rng: Random generator the order is drawn from, so that the sequence can be reproduced. Defaults to a
+          new generator seeded from the operating system
+
         Returns:
         - list[tuple[int, int]]: Random sequence of pick-up points
 
@@ -504,15 +1185,13 @@ class Map2d:
         >>> height = 20
         >>> pickUpPoints = [(5, 5), (7, 7), (3, 3), (8, 8)]
         >>> map2d = Map2d(start, end, obstacles, width, height, pickUpPoints)
-        >>> map2d.getRandomPickUpSequence()
-        [(3, 3), (8, 8), (7, 7), (5, 5)]
+        >>> map2d.getRandomPickUpSequence(np.random.default_rng(0))
+        [(3, 3), (5, 5), (7, 7), (8, 8)]
         """
         
         # From the self.__pickUpPoints, generate a radom sequence of pick-up points
-        import random
-        random_pickup_points = self.__pickUpPoints.copy()
-        random.shuffle(random_pickup_points)
-        return random_pickup_points
+        rng = rng if rng is not None else np.random.default_rng()
+        return [self.__pickUpPoints[i] for i in rng.permutation(len(self.__pickUpPoints))]
     
     def setStart(self, start: tuple[int, int]):
         """
@@ -611,8 +1290,266 @@ class Map2d:
         self.__obstacles_thread = threading.Thread(target=self.__perform_obstacles_movement, daemon=True)
         self.__obstacles_thread.start()
         
+    def toSpec(self) -> tuple:
+        """
+        Return a picklable snapshot of the map made of plain tuples and lists.
+        
+        A live map with moving obstacles carries a thread and a lock that cannot be sent to another process,
+        so the obstacles are frozen at their current position. Only polygon obstacles are kept.
+        
+        Returns:
+        - tuple: (start, end, obstacles as lists of vertices, width, height, pick-up points, robot radius,
+          cost raster as nested lists or None)
+        
+        Example:
+        >>> spec = map2d.toSpec()
+        >>> copy = Map2d.fromSpec(spec)
+        """
+        
+        polygons = [list(obstacle.exterior.coords) for obstacle in self.__obstacles if obstacle.geom_type == "Polygon"]
+        raster = self.__cost_raster.tolist() if self.__cost_raster is not None else None
+        return (self.__start, self.__end, polygons, self.__width, self.__height, list(self.__pickUpPoints or []),
+                self.__robot_radius, raster)
+    
+    @staticmethod
+    def fromSpec(spec: tuple) -> 'Map2d':
+        """
+        Build a static map from a snapshot returned by toSpec().
+        
+        Args:
+        - spec: Snapshot of a map
+        
+        Returns:
+        - Map2d: A map without moving obstacles
+        """
+        
+        start, end, polygons, width, height, pickUpPoints, robot_radius, raster = spec
+        obstacles = []
+        if len(polygons) > 0:
+            from shapely.geometry import Polygon
+            obstacles = [Polygon(coords) for coords in polygons]
+        return Map2d(start, end, obstacles, 0, width, height, list(pickUpPoints),
+                     robot_radius, raster)
+    
     def addObstacle(self, obstacle: Polygon):
         self.__obstacles.append(obstacle)
+        self.__obstacles_cache_key = None
         
     def removeLastObstacle(self, obstacle: Polygon):
-        self.__obstacles.remove(obstacle)
\ No newline at end of file
+        self.__obstacles.remove(obstacle)
+        self.__obstacles_cache_key = None
+class Node3d(Node2d):
+    """A node of the 3D search, holding a state (x, y, z), its parent node and the Action3d that led to it.
+    
+    Example:
+    >>> node = Node3d((1, 1, 1), None, Action3d.ASCEND)
+    >>> node.getState()
+    (1, 1, 1)
+    """
+    
+    def __str__(self) -> str:
+        return f"Node3d(state={self.getState()}, parent={self.getParent()}, action={self.getAction()})"
+
+class Map3d:
+    """
+    A class representing a 3D map with static convex polyhedral obstacles.
+    
+    The map is the box [0, width] x [0, height] x [0, depth]. As in Map2d, the faces of the box are a frame
+    that cannot be entered, and a lattice point is blocked when it lies inside or on the boundary of an obstacle.
+    The blocked lattice points are voxelized once, when the map is built, and kept bit-packed (one bit per
+    lattice point), which keeps large maps cheap to hold and to send to other processes.
+    
+    Attributes:
+    - start: Start point of the map
+    - end: End point of the map
+    - obstacles: List of obstacles, each given by the vertices of a convex polyhedron
+    - width: Size of the map along x
+    - height: Size of the map along y
+    - depth: Size of the map along z
+    
+    Methods:
+    - solvedBy(solver: Optional[Solver]) -> Optional[Solution2d]: Solve the map by a solver
+    - getStart() -> tuple[int, int, int]: Return the start point of the map
+    - getEnd() -> tuple[int, int, int]: Return the end point of the map
+    - getObstacles() -> list[np.ndarray]: Return the vertices of the obstacles
+    - getWidth(), getHeight(), getDepth() -> int: Return the size of the map
+    - getShape() -> tuple[int, int, int]: Return the number of lattice points along x, y and z
+    - isBlocked(state: tuple[int, int, int]) -> bool: Return True if the lattice point is blocked
+    - getPackedOccupancy() -> bytes: Return the bit-packed occupancy of the lattice points
+    - getOccupancyGrid() -> np.ndarray: Return the unpacked occupancy of the lattice points
+    - result(node: Node3d, action: Action3d) -> Node3d: Return the new node based on the action
+    - getNeighbors(node: Node3d) -> list[Node3d]: Return the neighbors of the node
+    
+    Example:
+    >>> cube = [(2, 2, 2), (4, 2, 2), (2, 4, 2), (4, 4, 2), (2, 2, 4), (4, 2, 4), (2, 4, 4), (4, 4, 4)]
+    >>> map3d = Map3d((1, 1, 1), (8, 8, 8), [cube], 10, 10, 10)
+    >>> map3d.isBlocked((3, 3, 3))
+    True
+    """
+    
+    def __init__(self, start: tuple[int, int, int], end: tuple[int, int, int],
+                 obstacles: list[Sequence[tuple[float, float, float]]], width: int, height: int, depth: int):
+        """
+        Initialize a 3D map with obstacles.
+        
+        Args:
+        - start (tuple[int, int, int]): Start point of the map
+        - end (tuple[int, int, int]): End point of the map
+        - obstacles (list): Vertices of each convex polyhedron obstacle
+        - width (int): Size of the map along x
+        - height (int): Size of the map along y
+        - depth (int): Size of the map along z
+        """
+        
+        self.__start = tuple(start)
+        self.__end = tuple(end)
+        self.__obstacles = [np.asarray(vertices, dtype=float).reshape(-1, 3) for vertices in obstacles]
+        self.__width = width
+        self.__height = height
+        self.__depth = depth
+        self.__shape = (width + 1, height + 1, depth + 1)
+        self.__packed = np.packbits(self.__voxelize(), axis=None).tobytes()
+        
+    def solvedBy(self, solver: 'Optional[Solver]') -> 'Optional[Solution2d]':
+        """
+        Solve the map by a solver.
+        
+        Args:
+        - solver: Solver for 3D maps, such as A_asteriskSolver3d
+        
+        Returns:
+        - Optional[Solution2d]: Solution of the map
+        """
+        
+        return solver.solve(self) if solver is not None else None
+    
+    def getStart(self) -> tuple[int, int, int]:
+        return self.__start
+    
+    def getEnd(self) -> tuple[int, int, int]:
+        return self.__end
+    
+    def getObstacles(self) -> list[np.ndarray]:
+        return self.__obstacles
+    
+    def getWidth(self) -> int:
+        return self.__width
+    
+    def getHeight(self) -> int:
+        return self.__height
+    
+    def getDepth(self) -> int:
+        return self.__depth
+    
+    def getShape(self) -> tuple[int, int, int]:
+        """
+        Return the number of lattice points along x, y and z, that is (width + 1, height + 1, depth + 1).
+        Lattice point (x, y, z) has the flat index (x * (height + 1) + y) * (depth + 1) + z.
+        """
+        
+        return self.__shape
+    
+    def getPackedOccupancy(self) -> bytes:
+        """
+        Return the occupancy of the lattice points packed eight to a byte, most significant bit first,
+        in the order of their flat index (see getShape()). A set bit means the point is blocked.
+        """
+        
+        return self.__packed
+    
+    def getOccupancyGrid(self) -> np.ndarray:
+        """
+        Return the occupancy of the lattice points unpacked to a boolean array of shape getShape(),
+        indexed by [x, y, z]. The array is built on every call and takes one byte per lattice point.
+        """
+        
+        count = self.__shape[0] * self.__shape[1] * self.__shape[2]
+        bits = np.unpackbits(np.frombuffer(self.__packed, dtype=np.uint8), count=count)
+        return bits.reshape(self.__shape).astype(bool)
+    
+    def isBlocked(self, state: tuple[int, int, int]) -> bool:
+        """
+        Return True if the lattice point is outside the map, on its frame, or inside or on an obstacle.
+        """
+        
+        x, y, z = state
+        if not (0 <= x < self.__shape[0] and 0 <= y < self.__shape[1] and 0 <= z < self.__shape[2]):
+            return True
+        index = (x * self.__shape[1] + y) * self.__shape[2] + z
+        return (self.__packed[index >> 3] >> (7 - (index & 7))) & 1 == 1
+    
+    def result(self, node: Node3d, action: Action3d) -> Optional[Node3d]:
+        """
+        Calculate the new node based on the action.
+        
+        Args:
+        - node: Current node
+        - action: Action to be performed
+        
+        Returns:
+        - Node3d: New node after performing the action, or None if the new state is blocked
+        """
+        
+        x, y, z = node.getState()
+        dx, dy, dz = action.delta()
+        new_state = (x + dx, y + dy, z + dz)
+        if self.isBlocked(new_state):
+            return None
+        return Node3d(new_state, node, action)
+    
+    def getNeighbors(self, node: Node3d) -> list[Node3d]:
+        """
+        Return the neighbors of the node among its 26 adjacent lattice points.
+        """
+        
+        neighbors: list[Node3d] = []
+        for action in Action3d:
+            new_node = self.result(node, action)
+            if new_node is not None:
+                neighbors.append(new_node)
+        return neighbors
+    
+    def __str__(self) -> str:
+        return f"Map3d(start={self.__start}, end={self.__end}, obstacles={len(self.__obstacles)}, " \
+               f"width={self.__width}, height={self.__height}, depth={self.__depth})"
+    
+    def __voxelize(self) -> np.ndarray:
+        blocked = np.ones(self.__shape, dtype=bool)
+        blocked[1:self.__width, 1:self.__height, 1:self.__depth] = False
+        
+        for vertices in self.__obstacles:
+            normals, offsets = Map3d.__halfspaces(vertices)
+            
+            # Only the lattice points of the bounding box of the obstacle are tested, all at once
+            low = np.clip(np.ceil(vertices.min(axis=0) - 1e-9).astype(int), 0, np.array(self.__shape) - 1)
+            high = np.clip(np.floor(vertices.max(axis=0) + 1e-9).astype(int), 0, np.array(self.__shape) - 1)
+            if (high < low).any():
+                continue
+            axes = [np.arange(low[i], high[i] + 1) for i in range(3)]
+            points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+            inside = (points @ normals.T <= offsets + 1e-9).all(axis=-1)
+            blocked[low[0]:high[0] + 1, low[1]:high[1] + 1, low[2]:high[2] + 1] |= inside
+        
+        return blocked
+    
+    @staticmethod
+    def __halfspaces(vertices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Planes of the faces of the convex hull of the vertices, as outward normals n and offsets d, so that
+        # the hull is {p : n . p <= d}. A plane through three vertices bounds a face when every vertex lies on
+        # one side of it. Obstacles have few vertices, so all the triples are tested at once.
+        centered = vertices - vertices.mean(axis=0)
+        if len(vertices) < 4 or np.linalg.matrix_rank(centered, tol=1e-9) < 3:
+            raise ValueError("An obstacle of a 3D map must be a polyhedron with a non-zero volume.")
+        
+        i, j, k = np.array([(i, j, k) for i in range(len(vertices)) for j in range(i + 1, len(vertices))
+                            for k in range(j + 1, len(vertices))]).T
+        normals = np.cross(vertices[j] - vertices[i], vertices[k] - vertices[i])
+        lengths = np.linalg.norm(normals, axis=1)
+        normals, i = normals[lengths > 1e-9] / lengths[lengths > 1e-9, None], i[lengths > 1e-9]
+        
+        side = (vertices @ normals.T) - np.einsum("ij,ij->i", normals, vertices[i])
+        below = (side <= 1e-9).all(axis=0)
+        above = (side >= -1e-9).all(axis=0)
+        normals = np.concatenate([normals[below], -normals[above]])
+        offsets = normals @ vertices.T
+        return normals, offsets.max(axis=1)
@@ -1,15 +1,23 @@
-from map_and_obstacles import Map2d
-from shapely.geometry import Polygon
+import os
+import numpy as np
+from map_and_obstacles import Map2d, Map3d
 
 class MapFileReader:
     """
     A class to read a map from a file.
     
+    A 2D map file may come with a cost raster in a sidecar file next to it, named after the map file with
+    the extension ".cost.txt" (e.g. "weighted_path.cost.txt" for "weighted_path.txt"). It holds height + 1
+    lines of width + 1 comma-separated positive costs, one per lattice point. The first line is the top row
+    of the map (y = height), as the map is drawn.
+    
     Attributes:
     - filename: Name of the file to read the map from.
     
     Methods:
-    - readMap2d(): Reads the map from the file and returns a Map2d object.
+    - readMap2d(robot_radius: float = 0.0): Reads the map from the file and returns a Map2d object.
+    - readCostRaster(): Reads the sidecar cost raster of the map file, or returns None if there is none.
+    - readMap3d(): Reads a 3D map from the file and returns a Map3d object.
     
     Example:
     >>> reader = MapFileReader("map.txt")
@@ -19,7 +27,8 @@ class MapFileReader:
     def __init__(self, filename: str):
         self.__filename = filename
     
-    def readMap2d(self) -> Map2d:
+    def readMap2d(self, robot_radius: float = 0.0) -> Map2d:
+        # The robot radius is not part of the file, so one map file serves robots of every size
         # Open file and read map
         with open(self.__filename, "r") as f:
             # Read map width and height on a line
@@ -59,6 +68,36 @@ class MapFileReader:
                 # Group list coordinates into tuples of 2
                 tuple_coordinates = [(int(list_coordinates[i]), int(list_coordinates[i + 1]))
                                      for i in range(0, len(list_coordinates), 2)]
+                from shapely.geometry import Polygon
                 obstacles.append(Polygon(tuple_coordinates))
             
-            return Map2d(start, end, obstacles, obstacles_speed, width, height, pick_up_points)
\ No newline at end of file
+            return Map2d(start, end, obstacles, obstacles_speed, width, height, pick_up_points, robot_radius,
+                         self.readCostRaster())
+    
+    def readCostRaster(self) -> 'np.ndarray | None':
+        # Read the sidecar cost raster of the map file, if there is one, and index it by [x, y]
+        filename = os.path.splitext(self.__filename)[0] + ".cost.txt"
+        if not os.path.exists(filename):
+            return None
+        rows = np.loadtxt(filename, delimiter=',', ndmin=2)
+        return rows[::-1].T
+    
+    def readMap3d(self) -> Map3d:
+        # The 3D format follows the 2D one with a third coordinate:
+        # width,height,depth / start and end points / number of obstacles / one line of vertices per obstacle
+        with open(self.__filename, "r") as f:
+            width, height, depth = [int(value) for value in f.readline().split(',')]
+            
+            list_coordinates = [int(value) for value in f.readline().split(',')]
+            start = tuple(list_coordinates[0:3])
+            end = tuple(list_coordinates[3:6])
+            
+            number_of_obstacles = int(f.readline())
+            
+            # Each obstacle is the list of vertices of a convex polyhedron
+            obstacles = []
+            for i in range(number_of_obstacles):
+                list_coordinates = [float(value) for value in f.readline().split(',')]
+                obstacles.append([tuple(list_coordinates[i:i + 3]) for i in range(0, len(list_coordinates), 3)])
+            
+            return Map3d(start, end, obstacles, width, height, depth)
@@ -0,0 +1,392 @@
+from abc import ABC, abstractmethod
+import heapq
+import itertools
+import time
+from typing import Optional
+import numpy as np
+
+from action import Action2d, ACTIONS2D
+from map_and_obstacles import Map2d, Node2d
+from solution import Solution2d
+
+class Constraints:
+    """
+    Space-time constraints of one agent for the low-level search.
+
+    Attributes:
+    - vertices: Set of (x, y, t): the agent must not be at (x, y) at time t
+    - edges: Set of (x1, y1, x2, y2, t): the agent must not move from (x1, y1) to (x2, y2) between t and t + 1
+    - blocked_from: Dictionary (x, y) -> t: the agent must not be at (x, y) at time t or later
+    """
+
+    def __init__(self, vertices: frozenset = frozenset(), edges: frozenset = frozenset(), blocked_from: Optional[dict] = None):
+        self.vertices = vertices
+        self.edges = edges
+        self.blocked_from = blocked_from if blocked_from is not None else {}
+
+    def key(self) -> tuple:
+        """
+        Return a hashable key of the constraints, used to cache low-level searches.
+        """
+
+        return (self.vertices, self.edges, frozenset(self.blocked_from.items()))
+
+    def isBlocked(self, x: int, y: int, t: int) -> bool:
+        return (x, y, t) in self.vertices or self.blocked_from.get((x, y), t + 1) <= t
+
+    def lastBlockedTime(self, x: int, y: int) -> float:
+        # Latest time at which (x, y) is forbidden; an agent may only stop there for good after it
+        if (x, y) in self.blocked_from:
+            return float("inf")
+        times = [t for (vx, vy, t) in self.vertices if vx == x and vy == y]
+        return max(times) if times else -1
+
+class SpaceTimeAStar:
+    """
+    Low-level search of the multi-agent solvers: A* over (x, y, t) states on the occupancy grid of a map.
+
+    In each time step the agent performs one of the eight Action2d moves or waits in place.
+    Moves cost their entry in Map2d.getMoveCosts(), waiting costs wait_cost. The heuristic is the exact single-agent distance
+    to the goal on the grid (Map2d.getDistanceField), which ignores the other agents and is admissible.
+
+    Results are cached by (start, goal, constraints), so CBS nodes that share the constraints of an agent
+    reuse its path instead of searching again.
+    """
+
+    def __init__(self, map2d: Map2d, wait_cost: float = 1.0):
+        self.__map = map2d
+        self.__blocked = map2d.getOccupancyGrid()
+        self.__wait_cost = wait_cost
+        self.__move_costs = map2d.getMoveCosts().tolist()
+        self.__cache: dict[tuple, Optional[list[tuple[int, int]]]] = {}
+        self.searches = 0
+        self.cache_hits = 0
+
+    def distanceTo(self, goal: tuple[int, int]) -> np.ndarray:
+        """
+        Return the exact move cost from every lattice point to the goal, ignoring the other agents.
+        Unreachable and blocked points are set to infinity.
+        """
+
+        return self.__map.getDistanceField(goal)
+
+    def pathCost(self, positions: list[tuple[int, int]]) -> float:
+        """
+        Return the cost of a list of positions, one per time step: the move costs plus the waiting costs.
+        """
+
+        deltas = {action.delta(): action.value for action in Action2d}
+        cost = 0.0
+        for (x, y), (nx, ny) in zip(positions, positions[1:]):
+            if (x, y) == (nx, ny):
+                cost += self.__wait_cost
+            else:
+                cost += self.__move_costs[deltas[(nx - x, ny - y)]][x][y]
+        return cost
+
+    def search(self, start: tuple[int, int], goal: tuple[int, int], constraints: Constraints) -> Optional[list[tuple[int, int]]]:
+        """
+        Return the cheapest list of positions, one per time step, from start to goal that satisfies the constraints,
+        or None if there is none. The agent stays at the goal after the last position.
+        """
+
+        key = (start, goal, constraints.key())
+        if key in self.__cache:
+            self.cache_hits += 1
+            return self.__cache[key]
+
+        self.searches += 1
+        path = self.__search(start, goal, constraints)
+        self.__cache[key] = path
+        return path
+
+    def __search(self, start: tuple[int, int], goal: tuple[int, int], constraints: Constraints) -> Optional[list[tuple[int, int]]]:
+        h = self.distanceTo(goal)
+        if np.isinf(h[start]) or constraints.isBlocked(start[0], start[1], 0):
+            return None
+
+        width, height = self.__blocked.shape
+        earliest_stop = constraints.lastBlockedTime(*goal) + 1
+        if earliest_stop == float("inf"):
+            return None
+
+        # No constraint reaches beyond this time, so waiting longer can never help
+        last_constraint = max([t for (_, _, t) in constraints.vertices] + [t for (*_, t) in constraints.edges] +
+                              list(constraints.blocked_from.values()) + [0])
+        horizon = last_constraint + int(np.count_nonzero(~self.__blocked)) + 1
+
+        counter = itertools.count()
+        open_list = [(h[start], next(counter), 0.0, 0, start)]
+        parents: dict[tuple[int, int, int], Optional[tuple[int, int, int]]] = {(start[0], start[1], 0): None}
+        best_g = {(start[0], start[1], 0): 0.0}
+
+        while open_list:
+            _, _, g, t, (x, y) = heapq.heappop(open_list)
+            if g > best_g[(x, y, t)]:
+                continue
+
+            if (x, y) == goal and t >= earliest_stop:
+                # Rebuild the positions by following the parent pointers
+                positions = []
+                state = (x, y, t)
+                while state is not None:
+                    positions.append((state[0], state[1]))
+                    state = parents[state]
+                positions.reverse()
+                return positions
+
+            if t >= horizon:
+                continue
+
+            successors = [((x, y), self.__wait_cost)]
+            for action in ACTIONS2D:
+                dx, dy = action.delta()
+                successors.append(((x + dx, y + dy), self.__move_costs[action.value][x][y]))
+
+            for (nx, ny), cost in successors:
+                if not (0 <= nx < width and 0 <= ny < height) or self.__blocked[nx, ny] or np.isinf(h[nx, ny]):
+                    continue
+                if constraints.isBlocked(nx, ny, t + 1) or (x, y, nx, ny, t) in constraints.edges:
+                    continue
+                state = (nx, ny, t + 1)
+                ng = g + cost
+                if ng < best_g.get(state, float("inf")):
+                    best_g[state] = ng
+                    parents[state] = (x, y, t)
+                    heapq.heappush(open_list, (ng + h[nx, ny], next(counter), ng, t + 1, (nx, ny)))
+
+        return None
+
+class MultiAgentSolver(ABC):
+    """
+    Base class of the solvers that plan collision-free paths for several agents on one map.
+
+    Two agents collide when they occupy the same lattice point at the same time step, or when their moves
+    during the same time step cross at the same midpoint (swapping places, or crossing diagonals).
+    An agent stays at its goal once it has arrived.
+
+    Methods:
+    - solve(map2d: Map2d, agents: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[Solution2d]:
+      Return one path per (start, end) pair. Waiting steps appear as nodes without action.
+    """
+
+    def __init__(self, wait_cost: float = 1.0):
+        self._wait_cost = wait_cost
+
+    @abstractmethod
+    def solve(self, map2d: Map2d, agents: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[Solution2d]:
+        """
+        Plans collision-free paths for the agents and returns one Solution2d object per agent.
+
+        Parameters:
+        - map2d (Map2d): The 2D map shared by the agents. Its own start, end and pick-up points are ignored.
+        - agents (list[tuple[tuple[int, int], tuple[int, int]]]): The (start, end) pair of every agent.
+
+        Returns:
+        - list[Solution2d]: The path of every agent, in the order of the agents, one node per time step.
+        """
+        pass
+
+    def _toSolutions(self, paths: list[list[tuple[int, int]]], runtime_milisec: float,
+                     low_level: SpaceTimeAStar) -> list[Solution2d]:
+        deltas = {action.delta(): action for action in Action2d}
+        solutions = []
+        for positions in paths:
+            path: list[Node2d] = []
+            parent = None
+            for position in positions:
+                action = None
+                if parent is not None:
+                    delta = (position[0] - parent.getState()[0], position[1] - parent.getState()[1])
+                    action = deltas.get(delta)
+                node = Node2d(position, parent, action)
+                path.append(node)
+                parent = node
+            solutions.append(Solution2d(path, low_level.pathCost(positions), runtime_milisec))
+        return solutions
+
+    @staticmethod
+    def _findConflict(paths: list[list[tuple[int, int]]]) -> Optional[tuple]:
+        """
+        Return the earliest conflict as (agent_i, agent_j, kind, data, t), or None.
+        kind is "vertex" with data (x, y), or "edge" with data ((x1, y1, x2, y2) of agent i, (x1, y1, x2, y2) of agent j).
+        """
+
+        if len(paths) < 2:
+            return None
+
+        # Positions of all agents at all time steps; agents wait at their goal after arriving
+        horizon = max(len(path) for path in paths)
+        positions = np.array([path + [path[-1]] * (horizon - len(path)) for path in paths], dtype=np.int64)
+
+        # Compare every pair of agents at once. Midpoints are doubled to stay integer.
+        same_vertex = np.all(positions[:, None] == positions[None, :], axis=3)
+        midpoints = positions[:, 1:] + positions[:, :-1]
+        moving = np.any(positions[:, 1:] != positions[:, :-1], axis=2)
+        same_edge = np.all(midpoints[:, None] == midpoints[None, :], axis=3) & moving[:, None] & moving[None, :]
+
+        upper = np.triu(np.ones((len(paths), len(paths)), dtype=bool), k=1)
+        vertex = same_vertex & upper[:, :, None]
+        edge = same_edge & upper[:, :, None]
+
+        vertex_times = np.flatnonzero(vertex.any(axis=(0, 1)))
+        edge_times = np.flatnonzero(edge.any(axis=(0, 1)))
+        t_vertex = vertex_times[0] if len(vertex_times) > 0 else horizon
+        t_edge = edge_times[0] if len(edge_times) > 0 else horizon
+        if t_vertex == horizon and t_edge == horizon:
+            return None
+
+        if t_vertex <= t_edge:
+            i, j = np.argwhere(vertex[:, :, t_vertex])[0]
+            return int(i), int(j), "vertex", tuple(int(v) for v in positions[i, t_vertex]), int(t_vertex)
+
+        i, j = np.argwhere(edge[:, :, t_edge])[0]
+        move_i = tuple(int(v) for v in np.concatenate([positions[i, t_edge], positions[i, t_edge + 1]]))
+        move_j = tuple(int(v) for v in np.concatenate([positions[j, t_edge], positions[j, t_edge + 1]]))
+        return int(i), int(j), "edge", (move_i, move_j), int(t_edge)
+
+class CBSSolver(MultiAgentSolver):
+    """
+    A class to solve the multi-agent pathfinding problem optimally (sum of costs) with Conflict-Based Search.
+
+    The high level searches a tree of constraint sets. Each node plans every agent with SpaceTimeAStar under
+    its own constraints; the first conflict between two agents splits the node into two children that forbid
+    the conflicting position or move to one agent each. Low-level searches are cached across the tree.
+
+    Example:
+    >>> solver = CBSSolver()
+    >>> solutions = solver.solve(map2d, [((2, 2), (10, 10)), ((10, 10), (2, 2))])
+    """
+
+    def __init__(self, wait_cost: float = 1.0, max_nodes: int = 10000):
+        """
+        Initializes the CBSSolver object.
+
+        Parameters:
+        - wait_cost (float): Cost of waiting one time step.
+        - max_nodes (int): Maximum number of high-level nodes expanded before giving up.
+        """
+
+        super().__init__(wait_cost)
+        self.__max_nodes = max_nodes
+        self.stats: dict = {}
+
+    def solve(self, map2d: Map2d, agents: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[Solution2d]:
+        """
+        Solves the multi-agent problem with Conflict-Based Search.
+
+        Parameters:
+        - map2d (Map2d): The 2D map shared by the agents. Its own start, end and pick-up points are ignored.
+        - agents (list): One (start, end) pair per agent.
+
+        Returns:
+        - list[Solution2d]: Collision-free solutions, in the order of the agents.
+        """
+
+        start = time.perf_counter()
+        low_level = SpaceTimeAStar(map2d, self._wait_cost)
+
+        pathCost = low_level.pathCost
+
+        # The root node plans every agent without constraints
+        root_constraints = [Constraints() for _ in agents]
+        root_paths = []
+        for (agent_start, agent_end), constraints in zip(agents, root_constraints):
+            path = low_level.search(tuple(agent_start), tuple(agent_end), constraints)
+            if path is None:
+                raise Exception("No solution found.")
+            root_paths.append(path)
+
+        counter = itertools.count()
+        open_list = [(sum(pathCost(path) for path in root_paths), next(counter), root_constraints, root_paths)]
+        expanded = 0
+
+        while open_list and expanded < self.__max_nodes:
+            cost, _, node_constraints, paths = heapq.heappop(open_list)
+            expanded += 1
+
+            conflict = self._findConflict(paths)
+            if conflict is None:
+                self.stats = {"expanded_nodes": expanded, "low_level_searches": low_level.searches,
+                              "low_level_cache_hits": low_level.cache_hits}
+                runtime_milisec = (time.perf_counter() - start) * 10**3
+                return self._toSolutions(paths, runtime_milisec, low_level)
+
+            i, j, kind, data, t = conflict
+            for agent, own in ((i, 0), (j, 1)):
+                constraints = node_constraints[agent]
+                if kind == "vertex":
+                    x, y = data
+                    child = Constraints(constraints.vertices | {(x, y, t)}, constraints.edges)
+                else:
+                    child = Constraints(constraints.vertices, constraints.edges | {data[own] + (t,)})
+
+                agent_start, agent_end = agents[agent]
+                path = low_level.search(tuple(agent_start), tuple(agent_end), child)
+                if path is None:
+                    continue
+
+                child_constraints = list(node_constraints)
+                child_constraints[agent] = child
+                child_paths = list(paths)
+                child_paths[agent] = path
+                child_cost = cost - pathCost(paths[agent]) + pathCost(path)
+                heapq.heappush(open_list, (child_cost, next(counter), child_constraints, child_paths))
+
+        raise Exception("No solution found.")
+
+class PrioritizedPlanningSolver(MultiAgentSolver):
+    """
+    A class to solve the multi-agent pathfinding problem with prioritized planning.
+
+    Agents are planned one after another in the given order; each agent avoids the reserved positions and
+    moves of the agents planned before it, including their goals once they have arrived. This is much
+    cheaper than CBS but neither optimal nor complete.
+
+    Example:
+    >>> solver = PrioritizedPlanningSolver()
+    >>> solutions = solver.solve(map2d, [((2, 2), (10, 10)), ((10, 10), (2, 2))])
+    """
+
+    def solve(self, map2d: Map2d, agents: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[Solution2d]:
+        """
+        Solves the multi-agent problem with prioritized planning.
+
+        Parameters:
+        - map2d (Map2d): The 2D map shared by the agents. Its own start, end and pick-up points are ignored.
+        - agents (list): One (start, end) pair per agent, from highest to lowest priority.
+
+        Returns:
+        - list[Solution2d]: Collision-free solutions, in the order of the agents.
+        """
+
+        start = time.perf_counter()
+        low_level = SpaceTimeAStar(map2d, self._wait_cost)
+
+        vertices: set = set()
+        edges: set = set()
+        blocked_from: dict = {}
+        paths = []
+        for agent_start, agent_end in agents:
+            path = low_level.search(tuple(agent_start), tuple(agent_end),
+                                    Constraints(frozenset(vertices), frozenset(edges), dict(blocked_from)))
+            if path is None:
+                raise Exception("No solution found.")
+            paths.append(path)
+
+            # Reserve the path for the agents planned later: positions, both directions of every move
+            # (which forbids swaps and crossings through the same midpoint) and the goal after arrival
+            for t, (x, y) in enumerate(path):
+                vertices.add((x, y, t))
+            for t, (a, b) in enumerate(zip(path, path[1:])):
+                if a != b:
+                    edges.add((b[0], b[1], a[0], a[1], t))
+                    # A crossing diagonal move shares the midpoint without swapping places
+                    if a[0] != b[0] and a[1] != b[1]:
+                        edges.add((a[0], b[1], b[0], a[1], t))
+                        edges.add((b[0], a[1], a[0], b[1], t))
+            goal = path[-1]
+            blocked_from[goal] = min(blocked_from.get(goal, len(path) - 1), len(path) - 1)
+
+        runtime_milisec = (time.perf_counter() - start) * 10**3
+        return self._toSolutions(paths, runtime_milisec, low_level)
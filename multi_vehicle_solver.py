@@ -0,0 +1,242 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+import numpy as np
+
+from map_and_obstacles import Map2d
+from solution import Solution2d
+from solver import A_asteriskSolver, GASolver
+
+def _planRobotRoute(spec: tuple, start: tuple[int, int], end: tuple[int, int], order: list[tuple[int, int]]) -> Solution2d:
+    # Runs in a worker process: plan the legs of one robot with the existing A* leg construction
+    base = Map2d.fromSpec(spec)
+    map2d = Map2d(start, end, list(base.getObstacles()), 0, base.getWidth(), base.getHeight(), list(order),
+                  base.getRobotRadius(), base.getCostRaster())
+    if len(order) == 0:
+        return A_asteriskSolver().solve(map2d)
+    return GASolver().constructPath(map2d, list(order))
+
+class MultiVehicleSolver:
+    """
+    A class to split the pick-up points of a map among K robots, each with its own start and end point.
+
+    The pick-up points are allocated and ordered on an obstacle-aware distance matrix: the grid distance
+    between every pair of key points (robot starts, robot ends, pick-up points), read from the distance
+    fields of the map. A local search improves a greedy insertion solution with relocate moves between
+    robots and 2-opt moves inside a route, evaluating all candidate moves of a kind with NumPy at once,
+    and restarts from perturbed solutions. The legs of every robot are then planned with A*, one robot per
+    worker process.
+
+    Attributes:
+    - objective: "makespan" to minimize the longest route, or "total" to minimize the sum of the routes
+    - restarts: Number of perturbation restarts of the local search
+    - max_workers: Number of worker processes used to plan the routes. 1 plans them in this process
+    - seed: Seed of the random perturbations: an int, a numpy SeedSequence or a Generator
+
+    Example:
+    >>> reader = MapFileReader("input_tsp/tsp_static_obstacles_2.txt")
+    >>> map2d = reader.readMap2d()
+    >>> solver = MultiVehicleSolver(objective="makespan")
+    >>> solutions = solver.solve(map2d, [((2, 2), (2, 18)), ((26, 2), (26, 18))])
+    """
+
+    def __init__(self, objective: str = "makespan", restarts: int = 20, max_workers: Optional[int] = None,
+                 seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None):
+        if objective not in ("makespan", "total"):
+            raise ValueError("The objective must be 'makespan' or 'total'.")
+
+        self.__objective = objective
+        self.__restarts = restarts
+        self.__max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.__seed = seed
+        self.stats: dict = {}
+
+        # Key points of the latest allocation: indices of the starts, the ends and the first pick-up point in the
+        # distance matrix between them. Set by allocate().
+        self.__starts = np.empty(0, dtype=int)
+        self.__ends = np.empty(0, dtype=int)
+        self.__pickup_offset = 0
+        self.__distance = np.empty((0, 0))
+
+    def solve(self, map2d: Map2d, robots: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[Solution2d]:
+        """
+        Allocate the pick-up points of the map among the robots and plan the route of every robot.
+
+        Parameters:
+        - map2d (Map2d): The map with its pick-up points. Its own start and end points are ignored.
+        - robots (list): One (start, end) pair per robot.
+
+        Returns:
+        - list[Solution2d]: One route per robot, in the order of the robots.
+        """
+
+        start_time = time.perf_counter()
+
+        assignment = self.allocate(map2d, robots)
+        pickups = list(map2d.getPickUpPoints() or [])
+        orders = [[pickups[i] for i in route] for route in assignment]
+
+        # Every robot is planned independently from a snapshot of the map
+        spec = map2d.toSpec()
+        args = [(spec, tuple(robot_start), tuple(robot_end), order) for (robot_start, robot_end), order in zip(robots, orders)]
+        if self.__max_workers <= 1 or len(robots) == 1:
+            solutions = [_planRobotRoute(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.__max_workers, len(robots))) as pool:
+                solutions = list(pool.map(_planRobotRoute, *zip(*args)))
+
+        runtime_milisec = (time.perf_counter() - start_time) * 10**3
+        for solution in solutions:
+            solution.runtime_milisec = runtime_milisec
+        self.stats["runtime_milisec"] = runtime_milisec
+        return solutions
+
+    def allocate(self, map2d: Map2d, robots: list[tuple[tuple[int, int], tuple[int, int]]]) -> list[list[int]]:
+        """
+        Allocate and order the pick-up points without planning the legs.
+
+        Parameters:
+        - map2d (Map2d): The map with its pick-up points.
+        - robots (list): One (start, end) pair per robot.
+
+        Returns:
+        - list[list[int]]: For each robot, the indices of its pick-up points in visiting order.
+        """
+
+        if len(robots) == 0:
+            raise ValueError("At least one robot is needed.")
+
+        pickups = list(map2d.getPickUpPoints() or [])
+        distance = self.__distanceMatrix(map2d, robots, pickups)
+        num_robots = len(robots)
+
+        # Indices of the key points in the distance matrix
+        self.__starts = np.arange(num_robots)
+        self.__ends = np.arange(num_robots, 2 * num_robots)
+        self.__pickup_offset = 2 * num_robots
+        self.__distance = distance
+
+        rng = np.random.default_rng(self.__seed)
+        routes = self.__greedyInsertion(list(range(len(pickups))), [[] for _ in range(num_robots)])
+        routes = self.__localSearch(routes)
+        best_routes, best_score = routes, self.__score(self.__routeCosts(routes))
+
+        for _ in range(self.__restarts):
+            # Perturb: remove a random part of the pick-up points and insert them again greedily
+            if len(pickups) < 2:
+                break
+            removed = set(rng.choice(len(pickups), size=max(1, len(pickups) // 4), replace=False).tolist())
+            kept = [[p for p in route if p not in removed] for route in best_routes]
+            candidate = self.__localSearch(self.__greedyInsertion(rng.permutation(list(removed)).tolist(), kept))
+            score = self.__score(self.__routeCosts(candidate))
+            if score < best_score - 1e-9:
+                best_routes, best_score = candidate, score
+
+        costs = self.__routeCosts(best_routes)
+        self.stats = {"objective": self.__objective, "estimated_makespan": float(costs.max()),
+                      "estimated_total": float(costs.sum()), "assignment": best_routes}
+        return best_routes
+
+    def __distanceMatrix(self, map2d: Map2d, robots: list, pickups: list) -> np.ndarray:
+        points = [tuple(start) for start, _ in robots] + [tuple(end) for _, end in robots] + [tuple(p) for p in pickups]
+        distance = map2d.getDistanceMatrix(points)
+
+        if np.isinf(distance[:2 * len(robots), 2 * len(robots):]).all(axis=0).any() or \
+                np.isinf(distance[np.arange(len(robots)), len(robots) + np.arange(len(robots))]).any():
+            raise Exception("No solution found.")
+        return distance
+
+    def __nodes(self, route: list[int], robot: int) -> np.ndarray:
+        # Key point indices of a route: start, pick-up points, end
+        return np.concatenate([[self.__starts[robot]], np.asarray(route, dtype=int) + self.__pickup_offset, [self.__ends[robot]]]).astype(int)
+
+    def __routeCosts(self, routes: list[list[int]]) -> np.ndarray:
+        costs = np.empty(len(routes))
+        for robot, route in enumerate(routes):
+            nodes = self.__nodes(route, robot)
+            costs[robot] = self.__distance[nodes[:-1], nodes[1:]].sum()
+        return costs
+
+    def __score(self, costs: np.ndarray) -> float:
+        # The total breaks ties between solutions with the same makespan
+        if self.__objective == "makespan":
+            return float(costs.max(axis=-1) + 1e-6 * costs.sum(axis=-1))
+        return float(costs.sum(axis=-1))
+
+    def __scores(self, costs: np.ndarray) -> np.ndarray:
+        if self.__objective == "makespan":
+            return costs.max(axis=-1) + 1e-6 * costs.sum(axis=-1)
+        return costs.sum(axis=-1)
+
+    def __insertionDeltas(self, pickup: int, routes: list[list[int]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Cost increase of inserting the pick-up point at every position of every route
+        node = pickup + self.__pickup_offset
+        robots, positions, deltas = [], [], []
+        for robot, route in enumerate(routes):
+            nodes = self.__nodes(route, robot)
+            delta = self.__distance[nodes[:-1], node] + self.__distance[node, nodes[1:]] - self.__distance[nodes[:-1], nodes[1:]]
+            robots.append(np.full(len(delta), robot))
+            positions.append(np.arange(len(delta)))
+            deltas.append(delta)
+        return np.concatenate(robots), np.concatenate(positions), np.concatenate(deltas)
+
+    def __greedyInsertion(self, pickups: list[int], routes: list[list[int]]) -> list[list[int]]:
+        routes = [list(route) for route in routes]
+        for pickup in pickups:
+            costs = self.__routeCosts(routes)
+            robots, positions, deltas = self.__insertionDeltas(pickup, routes)
+
+            # Score every insertion at once: only the cost of the receiving route changes
+            candidate_costs = np.repeat(costs[None, :], len(deltas), axis=0)
+            candidate_costs[np.arange(len(deltas)), robots] += deltas
+            best = int(np.argmin(self.__scores(candidate_costs)))
+            routes[robots[best]].insert(int(positions[best]), pickup)
+        return routes
+
+    def __localSearch(self, routes: list[list[int]]) -> list[list[int]]:
+        routes = [list(route) for route in routes]
+        improved = True
+        while improved:
+            improved = self.__relocate(routes) or self.__twoOpt(routes)
+        return routes
+
+    def __relocate(self, routes: list[list[int]]) -> bool:
+        # Move one pick-up point to its best position in any route, if that improves the objective
+        costs = self.__routeCosts(routes)
+        current = self.__score(costs)
+        for robot, route in enumerate(routes):
+            for index, pickup in enumerate(route):
+                reduced = [list(r) for r in routes]
+                del reduced[robot][index]
+                reduced_costs = costs.copy()
+                nodes = self.__nodes(reduced[robot], robot)
+                reduced_costs[robot] = self.__distance[nodes[:-1], nodes[1:]].sum()
+                robots, positions, deltas = self.__insertionDeltas(pickup, reduced)
+                candidate_costs = np.repeat(reduced_costs[None, :], len(deltas), axis=0)
+                candidate_costs[np.arange(len(deltas)), robots] += deltas
+                scores = self.__scores(candidate_costs)
+                best = int(np.argmin(scores))
+                if scores[best] < current - 1e-9:
+                    reduced[robots[best]].insert(int(positions[best]), pickup)
+                    routes[:] = reduced
+                    return True
+        return False
+
+    def __twoOpt(self, routes: list[list[int]]) -> bool:
+        # Reverse the segment of a route between two positions, if that shortens it; all pairs at once
+        for robot, route in enumerate(routes):
+            if len(route) < 2:
+                continue
+            nodes = self.__nodes(route, robot)
+            i, j = np.triu_indices(len(nodes) - 1, k=1)
+            keep = i >= 1
+            i, j = i[keep], j[keep]
+            d = self.__distance
+            delta = d[nodes[i - 1], nodes[j]] + d[nodes[i], nodes[j + 1]] - d[nodes[i - 1], nodes[i]] - d[nodes[j], nodes[j + 1]]
+            if len(delta) > 0 and delta.min() < -1e-9:
+                best = int(np.argmin(delta))
+                a, b = int(i[best]) - 1, int(j[best]) - 1
+                route[a:b + 1] = route[a:b + 1][::-1]
+                return True
+        return False
@@ -0,0 +1,235 @@
+import time
+import numpy as np
+
+from action import Action2d
+from map_and_obstacles import Map2d, Node2d
+from solution import Solution2d
+from solver import Solver
+
+# Unit direction of each action, used to label waypoint segments that follow a grid direction
+_DIRECTIONS: dict[tuple[int, int], Action2d] = {action.delta(): action for action in Action2d}
+
+def waypointNodes(waypoints: list[tuple[int, int]]) -> list[Node2d]:
+    """
+    Chain a list of waypoints into a path of nodes.
+
+    A segment along one of the eight grid directions keeps the action of that direction, any other segment has
+    no action.
+
+    Args:
+    - waypoints: Lattice points of the path, in order
+
+    Returns:
+    - list[Node2d]: One node per waypoint, each the parent of the next
+
+    Example:
+    >>> [node.getAction() for node in waypointNodes([(0, 0), (3, 0), (4, 2)])]
+    [None, <Action2d.RIGHT: 1>, None]
+    """
+
+    path: list[Node2d] = []
+    parent = None
+    for state in waypoints:
+        action = None
+        if parent is not None:
+            dx = state[0] - parent.getState()[0]
+            dy = state[1] - parent.getState()[1]
+            step = max(abs(dx), abs(dy))
+            if step > 0 and dx % step == 0 and dy % step == 0:
+                action = _DIRECTIONS.get((dx // step, dy // step))
+        node = Node2d((state[0], state[1]), parent, action)
+        path.append(node)
+        parent = node
+    return path
+
+def _segmentCosts(raster: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    # Cost of straight segments of shape (n, 2, 2) through the cost raster: the segment is sampled once per lattice
+    # line it crosses along its major axis, interpolating the raster along the minor axis, and the samples are
+    # integrated with the trapezoidal rule. Along a grid direction this is exactly the cost of the unit moves
+    # (length times the mean cost of both end points, see Map2d.setCostRaster()).
+    starts, deltas = segments[:, 0], segments[:, 1] - segments[:, 0]
+    steps = np.abs(deltas).max(axis=1).astype(np.int64)
+    lengths = np.linalg.norm(deltas, axis=1)
+    costs = np.zeros(len(segments))
+    moving = steps > 0
+    if not moving.any():
+        return costs
+
+    starts, deltas, steps = starts[moving], deltas[moving], steps[moving]
+    t = np.arange(steps.max() + 1)[None, :] / steps[:, None]
+    valid = t <= 1
+    t = np.minimum(t, 1)
+    points = starts[:, None, :] + t[..., None] * deltas[:, None, :]
+    low = np.floor(points).astype(np.int64)
+    high = np.minimum(low + 1, np.array(raster.shape) - 1)
+    frac = points - low
+    # The major axis coordinate is always on the lattice, so bilinear interpolation reduces to the minor axis
+    samples = (raster[low[..., 0], low[..., 1]] * (1 - frac[..., 0]) * (1 - frac[..., 1])
+               + raster[high[..., 0], low[..., 1]] * frac[..., 0] * (1 - frac[..., 1])
+               + raster[low[..., 0], high[..., 1]] * (1 - frac[..., 0]) * frac[..., 1]
+               + raster[high[..., 0], high[..., 1]] * frac[..., 0] * frac[..., 1])
+    weights = valid.astype(float)
+    weights[:, 0] = 0.5
+    weights[np.arange(len(steps)), steps] = 0.5
+    costs[moving] = lengths[moving] * (samples * weights).sum(axis=1) / steps
+    return costs
+
+class PathSmoother:
+    """
+    A post-processing stage that turns the dense unit-step path of a solution into a compact list of waypoints.
+
+    The path is first compressed by dropping the interior nodes of collinear runs, then string-pulled:
+    from each waypoint, the path jumps straight to the farthest later waypoint whose connecting segment
+    does not intersect or touch any obstacle. Pick-up points are always kept as waypoints. On a map with
+    a cost raster, a segment costs its length weighted by the raster along it, and a jump is only taken
+    if it costs no more than the part of the path it replaces, so smoothing never makes a route dearer.
+
+    Attributes:
+    - string_pulling: Whether to string-pull the compressed path through free space
+
+    Methods:
+    - smooth(map2d: Map2d, solution: Solution2d) -> Solution2d: Return the waypoint solution
+
+    Example:
+    >>> reader = MapFileReader("input_basic/long_path.txt")
+    >>> map2d = reader.readMap2d()
+    >>> solution = map2d.solvedBy(A_asteriskSolver())
+    >>> smoothed = PathSmoother().smooth(map2d, solution)
+    >>> len(smoothed.getPath()) < len(solution.getPath())
+    True
+    """
+
+    def __init__(self, string_pulling: bool = True):
+        self.__string_pulling = string_pulling
+
+    def smooth(self, map2d: Map2d, solution: Solution2d) -> Solution2d:
+        """
+        Return a waypoint solution equivalent to the given one.
+
+        Args:
+        - map2d: Map the solution was computed on
+        - solution: Solution with a dense unit-step path
+
+        Returns:
+        - Solution2d: Solution whose path only holds waypoints, with the cost recomputed as the sum of
+          segment lengths, weighted by the cost raster of the map if it has one. The original path stays
+          available through `getDensePath()`.
+        """
+
+        start = time.perf_counter()
+
+        dense_path = solution.getDensePath()
+        states = np.array([node.getState() for node in dense_path], dtype=np.int64)
+        actions = np.array([node.getAction().value if node.getAction() is not None else -1
+                            for node in dense_path], dtype=np.int8)
+
+        # Pick-up points must stay on the route, so they split the path into independent sections
+        pickups = set(map2d.getPickUpPoints() or [])
+        is_anchor = np.array([tuple(state) in pickups for state in states.tolist()], dtype=bool)
+
+        keep = self.__compressCollinear(states, is_anchor)
+        if self.__string_pulling and len(keep) > 2:
+            try:
+                # Pull the path through the obstacles configuration at this instant moment
+                map2d.obstacles_lock.acquire()
+            except AttributeError:
+                pass
+            try:
+                keep = self.__pullStrings(states, keep, is_anchor, map2d)
+            finally:
+                try:
+                    map2d.obstacles_lock.release()
+                except AttributeError:
+                    pass
+
+        waypoints = states[keep]
+        path = waypointNodes(waypoints.tolist())
+        segments = np.stack([waypoints[:-1], waypoints[1:]], axis=1).astype(float)
+        if map2d.getCostRaster() is not None:
+            cost = float(np.sum(_segmentCosts(map2d.getCostRaster(), segments)))
+        else:
+            cost = float(np.sum(np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)))
+
+        end = time.perf_counter()
+        runtime_milisec = solution.runtime_milisec + (end - start) * 10**3
+
+        return Solution2d(path, cost, runtime_milisec, dense_states=states, dense_actions=actions)
+
+    def __compressCollinear(self, states: np.ndarray, is_anchor: np.ndarray) -> np.ndarray:
+        # A node is kept if the direction changes there, or if it is an endpoint or an anchor
+        if len(states) <= 2:
+            return np.arange(len(states))
+
+        steps = np.diff(states, axis=0)
+        turns = np.any(steps[1:] != steps[:-1], axis=1)
+        keep = np.zeros(len(states), dtype=bool)
+        keep[0] = keep[-1] = True
+        keep[1:-1] = turns
+        keep |= is_anchor
+        return np.flatnonzero(keep)
+
+    def __pullStrings(self, states: np.ndarray, keep: np.ndarray, is_anchor: np.ndarray, map2d: Map2d) -> np.ndarray:
+        raster = map2d.getCostRaster()
+        if len(map2d.getObstacles()) == 0 and raster is None:
+            # Nothing to go around: only the anchors need to be visited
+            return np.flatnonzero(is_anchor | (np.arange(len(states)) == 0) | (np.arange(len(states)) == len(states) - 1))
+
+        candidates = states[keep]
+        anchors = is_anchor[keep]
+        pulled = [0]
+        if raster is not None:
+            # Weighted cost of the path up to every candidate, to compare each jump with the part it replaces
+            moves = np.stack([states[:-1], states[1:]], axis=1).astype(float)
+            path_cost = np.concatenate([[0.0], np.cumsum(_segmentCosts(raster, moves))])[keep]
+
+        i = 0
+        last = len(candidates) - 1
+        while i < last:
+            # Never jump over an anchor: the farthest reachable waypoint is the next anchor at most
+            later_anchors = np.flatnonzero(anchors[i + 1:])
+            limit = i + 1 + later_anchors[0] if len(later_anchors) > 0 else last
+
+            # Test all segments from the current waypoint to each later candidate in one batch
+            targets = candidates[i + 1:limit + 1]
+            segments = np.empty((len(targets), 2, 2), dtype=float)
+            segments[:, 0, :] = candidates[i]
+            segments[:, 1, :] = targets
+            blocked = map2d.segmentsCollide(segments) if len(map2d.getObstacles()) > 0 else np.zeros(len(targets), dtype=bool)
+            if raster is not None:
+                # A jump through expensive cells is no shortcut
+                replaced = path_cost[i + 1:limit + 1] - path_cost[i]
+                blocked |= _segmentCosts(raster, segments) > replaced + 1e-9
+
+            # The next waypoint of the original path is always accepted
+            blocked[0] = False
+            i = i + 1 + int(np.flatnonzero(~blocked)[-1])
+            pulled.append(i)
+
+        return keep[pulled]
+
+class SmoothedSolver(Solver):
+    """
+    A solver that runs another solver and post-processes its solution with a PathSmoother.
+
+    Example:
+    >>> solver = SmoothedSolver(A_asteriskSolver())
+    >>> solution = map2d.solvedBy(solver)
+    """
+
+    def __init__(self, solver: Solver, smoother: PathSmoother = None):
+        super().__init__()
+        self.__solver = solver
+        self.__smoother = smoother if smoother is not None else PathSmoother()
+
+    def solve(self, map2d: Map2d) -> Solution2d:
+        """
+        Solves the 2D map problem with the wrapped solver and returns the smoothed solution.
+
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+
+        Returns:
+        - Solution2d: The waypoint solution to the 2D map problem.
+        """
+
+        return self.__smoother.smooth(map2d, self.__solver.solve(map2d))
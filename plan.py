@@ -0,0 +1,219 @@
+# Command-line planner: solve one or many maps with solvers from the registry and print one JSON line per run.
+#
+# Examples:
+#   python plan.py input_basic/long_path.txt
+#   python plan.py input_basic --solver dijkstra --solver a_asterisk --solver gbfs --workers 4
+#   python plan.py input_tsp/tsp_static_obstacles_2.txt --solver ga -p num_generations=250 -p sol_per_pop=1500
+#   python plan.py input_basic/ordinary_path.txt --render renders --render-format gif
+
+import argparse
+import glob
+import inspect
+import json
+import os
+import sys
+import time
+from typing import Iterator, Optional
+
+from solver_registry import SOLVERS, getSolverClass
+
+# Static maps read by this process, keyed by (file name, robot radius). Every run gets its own copy of the
+# obstacle list and shares the occupancy grid and the component labels of the resident map.
+_MAPS: dict[tuple[str, float], object] = {}
+
+def _loadMap(filename: str, robot_radius: float):
+    from map_and_obstacles import Map2d
+    from map_file_reader import MapFileReader
+
+    key = (filename, robot_radius)
+    base = _MAPS.get(key)
+    if base is None:
+        base = MapFileReader(filename).readMap2d(robot_radius)
+        if base.getObstaclesSpeed() > 0:
+            # Moving obstacles are not shared between runs, each run starts from the file
+            return base
+        _MAPS[key] = base
+
+    map2d = Map2d(base.getStart(), base.getEnd(), list(base.getObstacles()), 0, base.getWidth(), base.getHeight(),
+                  list(base.getPickUpPoints() or []), base.getRobotRadius(), base.getCostRaster())
+    map2d.preloadDerivedArrays(base.getOccupancyGrid(), component_labels=base.getComponentLabels())
+    return map2d
+
+def _render(map2d, solution, filename: str, fmt: str):
+    if fmt == "gif":
+        from visualizer import Visualizer2d
+        Visualizer2d(solution, map2d, speed=100).export(filename)
+    else:
+        from batch_renderer import BatchRenderer
+        BatchRenderer(max_workers=1).render([(map2d, solution)], os.path.dirname(filename), [os.path.basename(filename)])
+
+def _toJson(value):
+    # NumPy scalars and arrays, tuples and nested containers become plain JSON values
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {str(k): _toJson(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_toJson(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def runJob(job: dict) -> dict:
+    """
+    Solve one map with one solver and return the record printed for it.
+
+    Args:
+    - job: Dictionary with the keys "id", "map", "solver", "params", "repeat", "seed", "robot_radius", "deadline_ms",
+      "render" and "telemetry", where "render" is None or a (file name, format) pair
+
+    Returns:
+    - dict: The record of the run. "status" is "solved", "no_solution", "timeout" or "error"
+    """
+
+    record = {"id": job["id"], "map": job["map"], "solver": job["solver"], "params": job["params"],
+              "repeat": job["repeat"], "seed": job["seed"]}
+    start = time.perf_counter()
+    try:
+        map2d = _loadMap(job["map"], job["robot_radius"])
+        solver_class = getSolverClass(job["solver"])
+        params = dict(job["params"])
+        if job["seed"] is not None and "seed" in inspect.signature(solver_class).parameters:
+            # Repeat r of every map and solver draws from the same stream, so they see identical workloads
+            from numpy.random import SeedSequence
+            params["seed"] = SeedSequence(job["seed"], spawn_key=(job["repeat"],))
+        solver = solver_class(**params)
+        if job["deadline_ms"] is not None:
+            solver.setDeadline(time.time() + job["deadline_ms"] / 10**3)
+        solution = map2d.solvedBy(solver)
+
+        record.update(status="solved", cost=float(solution.cost), runtime_ms=float(solution.runtime_milisec),
+                      path=[[int(x), int(y)] for x, y in solution.iterWaypoints()])
+        if getattr(solver, "stats", None):
+            record["stats"] = _toJson(solver.stats)
+        if job["telemetry"] and getattr(solution, "telemetry", None) is not None:
+            record["telemetry"] = solution.telemetry.toDict()
+        if job["render"] is not None:
+            _render(map2d, solution, *job["render"])
+            record["image"] = job["render"][0]
+    except TimeoutError:
+        record["status"] = "timeout"
+    except Exception as ex:
+        record["status"] = "no_solution" if str(ex) == "No solution found." else "error"
+        if record["status"] == "error":
+            record["error"] = f"{type(ex).__name__}: {ex}"
+    record["wall_ms"] = (time.perf_counter() - start) * 10**3
+    return record
+
+def _expandMaps(patterns: list[str]) -> list[str]:
+    # Directories stand for the map files inside them; cost raster sidecars are not maps
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.txt")
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        files += [f for f in matches if not f.endswith(".cost.txt")]
+    return files
+
+def _parseParams(values: list[str], solvers: list[str]) -> dict[str, dict]:
+    # "name=value" applies to every selected solver that accepts the parameter, "solver.name=value" to one solver.
+    # Values are read as JSON when possible (numbers, lists, ...) and as strings otherwise.
+    params: dict[str, dict] = {name: {} for name in solvers}
+    for item in values:
+        key, sep, text = item.partition("=")
+        if not sep:
+            raise ValueError(f"Parameters must be written as name=value, got '{item}'.")
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = text
+        if isinstance(value, list):
+            value = tuple(value)
+
+        solver_name, _, name = key.rpartition(".")
+        targets = [solver_name] if solver_name else solvers
+        accepted = False
+        for target in targets:
+            if target not in params:
+                raise ValueError(f"Parameter '{item}' names solver '{target}', which is not selected.")
+            if name in inspect.signature(getSolverClass(target)).parameters:
+                params[target][name] = value
+                accepted = True
+        if not accepted:
+            raise ValueError(f"No selected solver accepts the parameter '{name}'.")
+    return params
+
+def buildJobs(args: argparse.Namespace) -> list[dict]:
+    maps = _expandMaps(args.maps)
+    solvers = args.solver or ["a_asterisk"]
+    params = _parseParams(args.param, solvers)
+
+    jobs = []
+    for filename in maps:
+        for solver_name in solvers:
+            for repeat in range(args.repeat):
+                render = None
+                if args.render is not None:
+                    stem = os.path.splitext(os.path.basename(filename))[0]
+                    suffix = f"_{repeat}" if args.repeat > 1 else ""
+                    render = (os.path.join(args.render, f"{stem}_{solver_name}{suffix}.{args.render_format}"),
+                              args.render_format)
+                jobs.append({"id": len(jobs), "map": filename, "solver": solver_name, "params": params[solver_name],
+                             "repeat": repeat, "seed": args.seed, "robot_radius": args.robot_radius, "deadline_ms": args.deadline_ms,
+                             "render": render, "telemetry": args.telemetry})
+    return jobs
+
+def runJobs(jobs: list[dict], workers: int) -> Iterator[dict]:
+    """
+    Run the jobs and yield their records: in order when sequential, as they finish when parallel.
+    """
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield runJob(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(runJob, job) for job in jobs]):
+            yield future.result()
+
+def parseArgs(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Solve maps with the registered solvers and print one JSON line per run.")
+    parser.add_argument("maps", nargs="+", help="Map files, directories of map files or glob patterns")
+    parser.add_argument("-s", "--solver", action="append", choices=list(SOLVERS),
+                        help="Solver to run, can be repeated (default: a_asterisk)")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="[SOLVER.]NAME=VALUE",
+                        help="Solver constructor parameter, can be repeated. Values are parsed as JSON when possible")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="Number of runs of every map and solver pair")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the stochastic solvers. Repeat r of every map and solver uses the same stream")
+    parser.add_argument("--robot-radius", type=float, default=0.0, help="Radius of the robot footprint")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Time allowed for every run")
+    parser.add_argument("--render", metavar="DIR", default=None, help="Write an image of every solved route to DIR")
+    parser.add_argument("--render-format", choices=["png", "gif"], default="png",
+                        help="png for a still image, gif for the animation (default: png)")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="Add the per-generation telemetry of the Genetic Algorithm to the records")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parseArgs(argv)
+    try:
+        jobs = buildJobs(args)
+    except ValueError as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 2
+    if args.render is not None:
+        os.makedirs(args.render, exist_ok=True)
+
+    failed = False
+    for record in runJobs(jobs, args.workers):
+        failed |= record["status"] == "error"
+        print(json.dumps(record), flush=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
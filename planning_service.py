@@ -0,0 +1,309 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+from typing import Optional, Union
+
+from map_and_obstacles import Map2d
+from map_file_reader import MapFileReader
+from shared_map import SharedMap, SharedMapHandle, attachMap
+from solution import Solution2d
+from solver_registry import getSolver
+
+# Maps resident in a worker process, keyed by map ID. Filled once by the pool initializer.
+_WORKER_MAPS: dict[str, Map2d] = {}
+
+# Deadline slots shared by the service and its workers, one per in-flight computation. Set by the pool initializer.
+_WORKER_DEADLINES = None
+
+# Number of computations that can be in flight with a deadline that identical requests may extend
+_DEADLINE_SLOTS = 1024
+
+class _SharedDeadline:
+    """
+    The deadline of an in-flight computation, read from a slot of shared memory at every check, so that identical
+    requests joining the computation later can push it back. It compares like the time.time() value in the slot
+    and is sent to other processes as that value.
+    """
+
+    def __init__(self, slot: int):
+        self.__slot = slot
+
+    def __float__(self) -> float:
+        return _WORKER_DEADLINES[self.__slot]
+
+    def __lt__(self, other: float) -> bool:
+        return float(self) < other
+
+    def __gt__(self, other: float) -> bool:
+        return float(self) > other
+
+    def __reduce__(self):
+        return (float, (float(self),))
+
+def _initWorker(specs: dict[str, Union[tuple, SharedMapHandle]], deadlines):
+    global _WORKER_DEADLINES
+    _WORKER_DEADLINES = deadlines
+    for map_id, spec in specs.items():
+        _WORKER_MAPS[map_id] = attachMap(spec) if isinstance(spec, SharedMapHandle) else Map2d.fromSpec(spec)
+
+def _solveInWorker(map_id: str, query: 'PlanningQuery', deadline: Union[None, float, int]) -> Solution2d:
+    # An integer deadline is the slot of a deadline that may still be pushed back (see _SharedDeadline)
+    if isinstance(deadline, int):
+        deadline = _SharedDeadline(deadline)
+    base = _WORKER_MAPS[map_id]
+
+    # Every query works on its own map, so solvers that mutate the obstacle list cannot leak into the next query
+    start = query.start if query.start is not None else base.getStart()
+    end = query.end if query.end is not None else base.getEnd()
+    pickups = list(query.pickUpPoints) if query.pickUpPoints is not None else list(base.getPickUpPoints())
+    map2d = Map2d(start, end, list(base.getObstacles()), 0, base.getWidth(), base.getHeight(), pickups,
+                  base.getRobotRadius(), base.getCostRaster())
+    if base.getObstaclesSpeed() == 0:
+        # The obstacles are the same, so the query map can share the grid of the resident map
+        map2d.preloadDerivedArrays(base.getOccupancyGrid())
+
+    solver = getSolver(query.solver, **dict(query.solver_params))
+    solver.setDeadline(deadline)
+    return map2d.solvedBy(solver)
+
+class PlanningQuery:
+    """
+    A route request against a map held by the PlanningService.
+
+    Attributes:
+    - start: Start point, or None to use the start of the map
+    - end: End point, or None to use the end of the map
+    - pickUpPoints: Pick-up points, or None to use the pick-up points of the map
+    - solver: Registered name of the solver (see solver_registry.SOLVERS)
+    - solver_params: Keyword arguments of the solver constructor
+    - deadline_ms: Time allowed for the request in miliseconds, or None for no deadline
+
+    Example:
+    >>> query = PlanningQuery(start=(2, 2), end=(19, 16), solver="a_asterisk", deadline_ms=500)
+    """
+
+    def __init__(self, start: Optional[tuple[int, int]] = None, end: Optional[tuple[int, int]] = None,
+                 pickUpPoints: Optional[list[tuple[int, int]]] = None, solver: str = "a_asterisk",
+                 solver_params: Optional[dict] = None, deadline_ms: Optional[float] = None):
+        self.start = tuple(start) if start is not None else None
+        self.end = tuple(end) if end is not None else None
+        self.pickUpPoints = tuple(tuple(point) for point in pickUpPoints) if pickUpPoints is not None else None
+        self.solver = solver
+        # Lists are turned into tuples so the parameters stay hashable
+        self.solver_params = tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                                          for name, value in (solver_params or {}).items()))
+        self.deadline_ms = deadline_ms
+
+    def key(self) -> tuple:
+        """
+        Return a hashable key identifying the work of the query. The deadline is not part of the key,
+        so identical queries may share one computation (see PlanningService.solve()).
+        """
+
+        return (self.start, self.end, self.pickUpPoints, self.solver, self.solver_params)
+
+    def __str__(self) -> str:
+        return f"PlanningQuery(start={self.start}, end={self.end}, pickUpPoints={self.pickUpPoints}, " \
+               f"solver={self.solver}, solver_params={dict(self.solver_params)}, deadline_ms={self.deadline_ms})"
+
+class PlanningService:
+    """
+    An asyncio-facing planning API that runs the CPU-bound solvers in a process pool.
+
+    Maps are registered by ID before the service starts and stay resident in every worker, so a request
+    only ships the query. With shared_memory=True, the maps are published once in shared memory (see
+    shared_map.SharedMap) and the workers attach to them instead of each holding a copy. Identical in-flight
+    requests are computed once. A request with a deadline gets a TimeoutError once the deadline has passed,
+    and the computation is cancelled inside the solver loops of the worker once the latest deadline of the
+    requests waiting on it has passed.
+
+    Methods:
+    - registerMap(map_id: str, map2d: Union[Map2d, str]): Register a map object or map file by ID
+    - start(): Start the worker pool
+    - solve(map_id: str, query: PlanningQuery) -> Solution2d: Solve a query (coroutine)
+    - close(): Shut down the worker pool (coroutine)
+    - getStats() -> dict: Return request counters
+
+    Example:
+    >>> service = PlanningService(max_workers=4)
+    >>> service.registerMap("long", "input_basic/long_path.txt")
+    >>> async with service:
+    ...     solution = await service.solve("long", PlanningQuery(deadline_ms=1000))
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, shared_memory: bool = False):
+        self.__max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.__specs: dict[str, tuple] = {}
+        self.__shared_memory = shared_memory
+        self.__shared_maps: list[SharedMap] = []
+        self.__pool: Optional[ProcessPoolExecutor] = None
+        # In-flight computations and the slot of their deadline, keyed by map and query
+        self.__inflight: dict[tuple, tuple[asyncio.Future, Optional[int]]] = {}
+        self.__deadlines = RawArray("d", _DEADLINE_SLOTS)
+        self.__free_slots = list(range(_DEADLINE_SLOTS))
+        self.__stats = {"requests": 0, "computations": 0, "deduplicated": 0, "timeouts": 0, "failures": 0}
+
+    def registerMap(self, map_id: str, map2d: Union[Map2d, str]):
+        """
+        Register a map by ID. Registering after start() restarts the worker pool so every worker holds the map.
+
+        Args:
+        - map_id: ID used by solve()
+        - map2d: A Map2d object, or the name of a map file readable by MapFileReader
+        """
+
+        if isinstance(map2d, str):
+            map2d = MapFileReader(map2d).readMap2d()
+        # Moving obstacles are frozen at their current position, see Map2d.toSpec()
+        self.__specs[map_id] = map2d.toSpec()
+
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True)
+            self.__pool = None
+            self.__releaseSharedMaps()
+            self.start()
+
+    def start(self):
+        """
+        Start the worker pool and load the registered maps into every worker.
+        """
+
+        if self.__pool is None:
+            specs: dict[str, Union[tuple, SharedMapHandle]] = dict(self.__specs)
+            if self.__shared_memory:
+                for map_id, spec in self.__specs.items():
+                    shared = SharedMap(Map2d.fromSpec(spec))
+                    self.__shared_maps.append(shared)
+                    specs[map_id] = shared.getHandle()
+            self.__pool = ProcessPoolExecutor(max_workers=self.__max_workers,
+                                              initializer=_initWorker, initargs=(specs, self.__deadlines))
+
+    async def close(self):
+        """
+        Shut down the worker pool.
+        """
+
+        if self.__pool is not None:
+            pool, self.__pool = self.__pool, None
+            await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+        self.__releaseSharedMaps()
+    
+    def __releaseSharedMaps(self):
+        # Only called once the workers using the shared maps have exited
+        for shared in self.__shared_maps:
+            shared.close()
+        self.__shared_maps = []
+
+    async def __aenter__(self) -> 'PlanningService':
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def solve(self, map_id: str, query: PlanningQuery) -> Solution2d:
+        """
+        Solve a query on a registered map without blocking the event loop.
+
+        Args:
+        - map_id: ID of a registered map
+        - query: The route request
+
+        Returns:
+        - Solution2d: Solution of the query
+
+        Raises:
+        - KeyError: If the map is not registered
+        - TimeoutError: If the deadline of the query passed before a solution was found
+        """
+
+        if map_id not in self.__specs:
+            raise KeyError(f"Unknown map '{map_id}'.")
+        self.start()
+        self.__stats["requests"] += 1
+
+        deadline = time.time() + query.deadline_ms / 10**3 if query.deadline_ms is not None else None
+
+        key = (map_id,) + query.key()
+        future, slot = self.__inflight.get(key, (None, None))
+        if future is not None and slot is not None:
+            # The computation runs until the latest deadline of its callers
+            self.__deadlines[slot] = max(self.__deadlines[slot], deadline if deadline is not None else math.inf)
+            self.__stats["deduplicated"] += 1
+        else:
+            # Without a free slot, the deadline of the computation is fixed and later callers start their own
+            slot = self.__free_slots.pop() if len(self.__free_slots) > 0 else None
+            if slot is not None:
+                self.__deadlines[slot] = deadline if deadline is not None else math.inf
+            future = asyncio.get_running_loop().run_in_executor(self.__pool, _solveInWorker, map_id, query,
+                                                                 slot if slot is not None else deadline)
+            self.__inflight[key] = (future, slot)
+            future.add_done_callback(lambda done: self.__finish(key, done))
+            self.__stats["computations"] += 1
+
+        try:
+            # Shield the shared computation, so that one caller giving up does not cancel it for the others
+            timeout = max(deadline - time.time(), 0) if deadline is not None else None
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except TimeoutError:
+            self.__stats["timeouts"] += 1
+            raise
+        except Exception:
+            self.__stats["failures"] += 1
+            raise
+
+    def __finish(self, key: tuple, future: asyncio.Future):
+        # A computation without a deadline slot may have been replaced by a later identical one
+        current, slot = self.__inflight.get(key, (None, None))
+        if current is future:
+            del self.__inflight[key]
+            if slot is not None:
+                self.__free_slots.append(slot)
+        # Mark the exception as retrieved, in case every caller has already given up on this computation
+        if not future.cancelled():
+            future.exception()
+
+    def getStats(self) -> dict:
+        """
+        Return the number of requests, computations started, deduplicated requests, timeouts and failures so far.
+        """
+
+        return dict(self.__stats, inflight=len(self.__inflight))
+
+class LocalPlanningClient:
+    """
+    A local stand-in for a remote planning client. It exposes the call signature a network client would
+    have, but forwards the requests to an in-process PlanningService.
+
+    Example:
+    >>> async with LocalPlanningClient({"tsp": "input_tsp/tsp_static_obstacles_1.txt"}) as client:
+    ...     solution = await client.solve("tsp", solver="ga", deadline_ms=2000)
+    """
+
+    def __init__(self, maps: dict[str, Union[Map2d, str]], max_workers: Optional[int] = None, shared_memory: bool = False):
+        self.__service = PlanningService(max_workers=max_workers, shared_memory=shared_memory)
+        for map_id, map2d in maps.items():
+            self.__service.registerMap(map_id, map2d)
+
+    async def __aenter__(self) -> 'LocalPlanningClient':
+        self.__service.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.__service.close()
+
+    async def solve(self, map_id: str, start: Optional[tuple[int, int]] = None, end: Optional[tuple[int, int]] = None,
+                    pickUpPoints: Optional[list[tuple[int, int]]] = None, solver: str = "a_asterisk",
+                    deadline_ms: Optional[float] = None, **solver_params) -> Solution2d:
+        """
+        Solve a route request on a map of the service. See PlanningQuery for the arguments.
+        """
+
+        query = PlanningQuery(start, end, pickUpPoints, solver, solver_params, deadline_ms)
+        return await self.__service.solve(map_id, query)
+
+    def getStats(self) -> dict:
+        return self.__service.getStats()
@@ -0,0 +1,170 @@
+from multiprocessing import shared_memory
+from typing import Optional
+import numpy as np
+
+from map_and_obstacles import Map2d
+
+# Blocks and maps attached by this process, keyed by block name and by map name. The blocks must stay open
+# for as long as the arrays viewing them are in use, so they are kept for the lifetime of the process.
+_ATTACHED_BLOCKS: dict[str, shared_memory.SharedMemory] = {}
+_ATTACHED_MAPS: dict[str, Map2d] = {}
+
+class SharedMapHandle:
+    """
+    A small picklable description of a map published by SharedMap: the scalar data of the map and, for every
+    array, the name of its shared memory block, its shape and its dtype. This is what is sent to the workers.
+    """
+
+    def __init__(self, name: str, start: tuple[int, int], end: tuple[int, int], width: int, height: int,
+                 pickUpPoints: list[tuple[int, int]], robot_radius: float, arrays: dict[str, tuple[str, tuple, str]],
+                 distance_sources: list[tuple[int, int]]):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.width = width
+        self.height = height
+        self.pickUpPoints = pickUpPoints
+        self.robot_radius = robot_radius
+        self.arrays = arrays
+        self.distance_sources = distance_sources
+
+    def __str__(self) -> str:
+        return f"SharedMapHandle(name={self.name}, arrays={list(self.arrays)}, distance_sources={self.distance_sources})"
+
+class SharedMap:
+    """
+    The immutable data of a map, published once in shared memory blocks for worker processes.
+
+    Pickling a Map2d for every worker copies its Shapely polygons N times, and a live map with moving obstacles
+    cannot be pickled at all. A SharedMap instead copies the rasterized occupancy grid and its component labels,
+    the polygon vertices, the cost raster and, optionally, the distance fields of chosen points into shared
+    memory. Workers call attachMap() with the picklable handle and get a static Map2d whose grid, labels and
+    distance fields are views of the shared blocks, so a pool of N workers holds one copy of the arrays. Moving obstacles are frozen at their
+    current position, as in Map2d.toSpec().
+
+    The publishing process owns the blocks: close() releases and unlinks them, after the workers are done.
+
+    Methods:
+    - getHandle() -> SharedMapHandle: Return the picklable handle of the map
+    - close(): Release and unlink the shared memory blocks
+
+    Example:
+    >>> with SharedMap(map2d, distance_sources=[map2d.getEnd()]) as shared:
+    ...     with ProcessPoolExecutor(initializer=attachMap, initargs=(shared.getHandle(),)) as pool:
+    ...         ...
+    """
+
+    def __init__(self, map2d: Map2d, distance_sources: Optional[list[tuple[int, int]]] = None):
+        """
+        Publish a map.
+
+        Args:
+        - map2d: The map to publish
+        - distance_sources: Points whose distance fields are computed and published with the map
+        """
+
+        self.__blocks: list[shared_memory.SharedMemory] = []
+        start, end, polygons, width, height, pickUpPoints, robot_radius, raster = map2d.toSpec()
+        distance_sources = [tuple(source) for source in (distance_sources or [])]
+
+        # The snapshot is rebuilt as a static map, so that the arrays match the frozen obstacles
+        snapshot = Map2d.fromSpec(map2d.toSpec())
+
+        arrays: dict[str, np.ndarray] = {
+            "occupancy": snapshot.getOccupancyGrid(),
+            "components": snapshot.getComponentLabels(),
+            "vertices": np.array([vertex for coords in polygons for vertex in coords], dtype=float).reshape(-1, 2),
+            "vertex_offsets": np.cumsum([0] + [len(coords) for coords in polygons], dtype=np.int64),
+        }
+        if raster is not None:
+            arrays["cost_raster"] = snapshot.getCostRaster()
+        if len(distance_sources) > 0:
+            arrays["distances"] = np.stack([snapshot.getDistanceField(source) for source in distance_sources])
+
+        descriptions = {}
+        try:
+            for key, array in arrays.items():
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.__blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                descriptions[key] = (block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+        # The name of the occupancy block is unique across processes, so it also names the map
+        self.__handle = SharedMapHandle(descriptions["occupancy"][0], tuple(start), tuple(end), width, height,
+                                        [tuple(point) for point in pickUpPoints], robot_radius, descriptions,
+                                        distance_sources)
+
+    def getHandle(self) -> SharedMapHandle:
+        """
+        Return the picklable handle that workers pass to attachMap().
+        """
+
+        return self.__handle
+
+    def close(self):
+        """
+        Release and unlink the shared memory blocks. Maps attached in other processes must not be used afterwards.
+        """
+
+        for block in self.__blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self.__blocks = []
+
+    def __enter__(self) -> 'SharedMap':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _attachArray(description: tuple[str, tuple, str]) -> np.ndarray:
+    name, shape, dtype = description
+    if name not in _ATTACHED_BLOCKS:
+        _ATTACHED_BLOCKS[name] = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_ATTACHED_BLOCKS[name].buf)
+    array.flags.writeable = False
+    return array
+
+def attachMap(handle: SharedMapHandle) -> Map2d:
+    """
+    Return the static Map2d of a published map, attaching to its shared memory blocks by name.
+
+    The occupancy grid, the component labels, the cost raster and the published distance fields of the map are
+    read-only views of the shared blocks; only the Shapely polygons are rebuilt from the shared vertices. The map
+    is built once per process, and later calls return the same object. Can be used directly as a pool initializer.
+
+    Args:
+    - handle: Handle returned by SharedMap.getHandle()
+
+    Returns:
+    - Map2d: The attached map
+    """
+
+    if handle.name in _ATTACHED_MAPS:
+        return _ATTACHED_MAPS[handle.name]
+
+    vertices = _attachArray(handle.arrays["vertices"])
+    offsets = _attachArray(handle.arrays["vertex_offsets"])
+    obstacles = []
+    if len(offsets) > 1:
+        import shapely
+        rings = shapely.linearrings(vertices, indices=np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)))
+        obstacles = list(shapely.polygons(rings))
+    raster = _attachArray(handle.arrays["cost_raster"]) if "cost_raster" in handle.arrays else None
+
+    map2d = Map2d(handle.start, handle.end, obstacles, 0, handle.width, handle.height, list(handle.pickUpPoints),
+                  handle.robot_radius, raster)
+
+    distances = _attachArray(handle.arrays["distances"]) if "distances" in handle.arrays else []
+    map2d.preloadDerivedArrays(_attachArray(handle.arrays["occupancy"]),
+                               dict(zip(handle.distance_sources, distances)),
+                               _attachArray(handle.arrays["components"]))
+
+    _ATTACHED_MAPS[handle.name] = map2d
+    return map2d
@@ -1,7 +1,85 @@
-from map_and_obstacles import Node2d
+from array import array
+from typing import Iterator, Optional, Sequence
+from map_and_obstacles import Node2d, Node3d
+from action import Action2d, Action3d
+
+class GATelemetry:
+    """
+    Per-generation telemetry of a run of the Genetic Algorithm.
+    
+    A record is appended after every generation while the evolution runs, so the object can be read during
+    the run (see GASolver.getTelemetry()) as well as from the finished Solution2d. The columns are kept in
+    flat arrays of numbers, so recording costs a few appends per generation.
+    
+    Columns, one value per generation (generation 0 is the initial population):
+    - best_fitness: Best fitness among the parents of the generation. The cost of a route is 1 / fitness.
+    - mean_fitness: Mean fitness of the parents
+    - fitness_std: Standard deviation of the fitness of the parents, a measure of the diversity of the population
+    - generation_milisec: Time spent on the generation in miliseconds
+    - cache_hits: Fitness cache hits during the generation
+    - cache_misses: Fitness cache misses during the generation
+    
+    Example:
+    >>> solution = map2d.solvedBy(GASolver())
+    >>> solution.telemetry.best_fitness[-1]
+    0.0287
+    >>> for record in solution.telemetry:
+    ...     print(record["generation"], record["mean_fitness"])
+    """
+    
+    COLUMNS = ("best_fitness", "mean_fitness", "fitness_std", "generation_milisec", "cache_hits", "cache_misses")
+    
+    def __init__(self):
+        self.best_fitness = array('d')
+        self.mean_fitness = array('d')
+        self.fitness_std = array('d')
+        self.generation_milisec = array('d')
+        self.cache_hits = array('q')
+        self.cache_misses = array('q')
+    
+    def record(self, best_fitness: float, mean_fitness: float, fitness_std: float, generation_milisec: float,
+               cache_hits: int, cache_misses: int):
+        """
+        Append the record of one generation.
+        """
+        
+        self.best_fitness.append(best_fitness)
+        self.mean_fitness.append(mean_fitness)
+        self.fitness_std.append(fitness_std)
+        self.generation_milisec.append(generation_milisec)
+        self.cache_hits.append(cache_hits)
+        self.cache_misses.append(cache_misses)
+    
+    def __len__(self) -> int:
+        return len(self.best_fitness)
+    
+    def __iter__(self) -> Iterator[dict]:
+        for generation in range(len(self)):
+            yield self[generation]
+    
+    def __getitem__(self, generation: int) -> dict:
+        record = {"generation": generation if generation >= 0 else len(self) + generation}
+        for column in self.COLUMNS:
+            record[column] = getattr(self, column)[generation]
+        return record
+    
+    def toDict(self) -> dict[str, list]:
+        """
+        Return the columns as lists, e.g. to serialize them as JSON.
+        """
+        
+        return {column: getattr(self, column).tolist() for column in self.COLUMNS}
+    
+    def __str__(self) -> str:
+        if len(self) == 0:
+            return "GATelemetry(generations=0)"
+        return f"GATelemetry(generations={len(self) - 1}, best_fitness={self.best_fitness[-1]}, " \
+               f"total_milisec={sum(self.generation_milisec)})"
 
 class Solution2d:
-    def __init__(self, path: list[Node2d], cost: float, runtime_milisec: float):
+    def __init__(self, path: list[Node2d], cost: float, runtime_milisec: float,
+                 dense_states: Optional[list[tuple[int, int]]] = None, dense_actions: Optional[list[int]] = None,
+                 telemetry: Optional[GATelemetry] = None):
         """
         A class to represent a solution to a 2D map problem.
         
@@ -9,10 +87,16 @@ class Solution2d:
         - path: List of nodes from start to end.
         - cost: Cost of the path.
         - runtime_milisec: Runtime of the algorithm in miliseconds.
+        - dense_states: Optional packed states of the dense unit-step path when `path` only holds waypoints.
+        - dense_actions: Optional packed action values (-1 for no action) matching `dense_states`.
+        - telemetry: Optional per-generation telemetry of the search, set by GASolver. None for other solvers.
         
         Methods:
         - __str__(): Returns a string representation of the solution.
         - showToConsole(): Prints the solution to the console.
+        - getDensePath(): Rebuilds the unit-step path behind a waypoint solution.
+        - iterWaypoints(): Yields the states of the path one by one, without building the nodes.
+        - fromParents(...): Builds a solution backed by the parent-index arrays of a search.
         
         Example:
         >>> solution = Solution2d([Node2d((0, 0), None, None), Node2d((0, 1), None, None)], 1.0)
@@ -23,9 +107,101 @@ class Solution2d:
         Cost: 1.0
         """
         
-        self.path = path
+        self.__path = path
         self.cost = cost
         self.runtime_milisec = runtime_milisec
+        self.__dense_states = dense_states
+        self.__dense_actions = dense_actions
+        self.telemetry = telemetry
+        
+        # Flat indices, action values and lattice shape of a solution built by fromParents(), until the nodes are built
+        self.__chain: Optional[tuple] = None
+    
+    @property
+    def path(self) -> list[Node2d]:
+        # A solution backed by parent-index arrays only builds its nodes when they are first asked for
+        if self.__path is None and self.__chain is not None:
+            self.__path = self.__buildPathFromChain()
+        return self.__path
+    
+    @path.setter
+    def path(self, path: list[Node2d]):
+        self.__path = path
+        self.__chain = None
+    
+    @staticmethod
+    def fromParents(parent: Sequence[int], action_of: Sequence[int], goal_index: int, shape: tuple[int, ...],
+                    cost: float, runtime_milisec: float) -> 'Solution2d':
+        """
+        Build a solution from the search state of a solver that identifies lattice points by flat index.
+        
+        Only the flat indices and action values of the points on the path are kept, 5 bytes per step, so the
+        search arrays can be released. iterWaypoints() streams the states without creating any node, and the
+        nodes of `path` are only built when it is first accessed.
+        
+        Args:
+        - parent: Flat index of the parent of every lattice point, -1 for the start
+        - action_of: Value of the action that led to every lattice point, -1 for the start
+        - goal_index: Flat index of the last point of the path
+        - shape: Shape of the lattice, (width + 1, height + 1) in 2D or (size_x, size_y, size_z) in 3D. The
+          nodes are Node3d holding Action3d for a 3D shape
+        - cost: Cost of the path
+        - runtime_milisec: Runtime of the algorithm in miliseconds
+        
+        Returns:
+        - Solution2d: The solution
+        """
+        
+        # Follow the parent indices back to the start
+        indices = array('i')
+        index = goal_index
+        while index != -1:
+            indices.append(index)
+            index = parent[index]
+        indices.reverse()
+        actions = array('b', [action_of[index] for index in indices])
+        
+        solution = Solution2d(None, cost, runtime_milisec)
+        solution.__chain = (indices, actions, tuple(shape))
+        return solution
+    
+    def __chainStates(self) -> Iterator[tuple[int, ...]]:
+        indices, _, shape = self.__chain
+        for index in indices:
+            state = []
+            for size in reversed(shape[1:]):
+                index, coordinate = divmod(index, size)
+                state.append(coordinate)
+            state.append(index)
+            yield tuple(reversed(state))
+    
+    def __buildPathFromChain(self) -> list[Node2d]:
+        _, actions, shape = self.__chain
+        node_type, action_type = (Node3d, Action3d) if len(shape) == 3 else (Node2d, Action2d)
+        path: list[Node2d] = []
+        node = None
+        for action, state in zip(actions, self.__chainStates()):
+            node = node_type(state, node, action_type(action) if action >= 0 else None)
+            path.append(node)
+        return path
+    
+    def iterWaypoints(self) -> Iterator[tuple[int, ...]]:
+        """
+        Yield the states of the path, from start to end, one by one.
+        
+        For a solution backed by parent-index arrays (see fromParents()), the states are read straight from the
+        arrays and no node is created. For a waypoint solution, the waypoints are yielded, not the dense path.
+        
+        Example:
+        >>> for x, y in solution.iterWaypoints():
+        ...     robot.moveTo(x, y)
+        """
+        
+        if self.__path is None and self.__chain is not None:
+            yield from self.__chainStates()
+            return
+        for node in self.__path:
+            yield node.getState()
     
     def __str__(self) -> str:
         return f"Solution2d(path={self.path}, cost={self.cost}, runtime={self.runtime_milisec})"
@@ -44,7 +220,36 @@ class Solution2d:
         print(f"Runtime: {self.runtime_milisec} miliseconds")
         
     def getTuplePath(self) -> list[tuple]:
-        return [node.getState() for node in self.path]
+        return list(self.iterWaypoints())
     
     def getPath(self) -> list[Node2d]:
-        return self.path
\ No newline at end of file
+        return self.path
+    
+    def isCompressed(self) -> bool:
+        """
+        Return True if `path` only holds waypoints and the dense path is kept in packed form.
+        """
+        
+        return self.__dense_states is not None
+    
+    def getDensePath(self) -> list[Node2d]:
+        """
+        Return the unit-step path of the solution.
+        
+        For a waypoint solution, the nodes are rebuilt from the packed states and actions on every call,
+        so the dense path only occupies memory while the caller holds on to it.
+        
+        Returns:
+        - list[Node2d]: Dense path from start to end
+        """
+        
+        if self.__dense_states is None:
+            return self.path
+        
+        path: list[Node2d] = []
+        parent = None
+        for state, action in zip(self.__dense_states, self.__dense_actions):
+            node = Node2d((int(state[0]), int(state[1])), parent, Action2d(int(action)) if action >= 0 else None)
+            path.append(node)
+            parent = node
+        return path
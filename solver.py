@@ -1,15 +1,19 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Dict
-from math import sqrt
+from typing import Callable, Iterator, Optional, Union
+from contextlib import contextmanager
+from collections import OrderedDict
+from math import inf, sqrt
+from array import array
+import heapq
+import os
 import time
-import random
 import numpy as np
 import threading
 
-from map_and_obstacles import Map2d, Node2d
-from solution import Solution2d
-from shapely import Polygon, Point
+from map_and_obstacles import Map2d, Map3d, Node2d
+from action import Action2d, Action3d, ACTIONS2D
+from solution import GATelemetry, Solution2d
 
 class Solver(ABC):
     """
@@ -17,8 +21,12 @@ class Solver(ABC):
     
     Methods:
     - solve(map2d: Map2d): Solves the 2D map problem and returns a Solution2d object.
+    - setDeadline(deadline: Optional[float]): Sets the wall-clock time after which solving is cancelled.
     - __str__(): Returns a string representation of the solver.
     """
+    
+    # Wall-clock deadline (as returned by time.time()) checked inside the search loops. None means no deadline.
+    _deadline: Optional[float] = None
         
     @abstractmethod
     def solve(self, map2d: Map2d):
@@ -32,7 +40,112 @@ class Solver(ABC):
         - Solution2d: The solution to the 2D map problem.
         """
         pass
+    
+    def setDeadline(self, deadline: Optional[float]):
+        """
+        Sets the wall-clock time after which solving is cancelled.
+        
+        The deadline is an absolute time.time() value, so it stays meaningful when the solver is sent to
+        another process. Once it has passed, the search loops raise TimeoutError.
+        
+        Parameters:
+        - deadline (Optional[float]): Absolute deadline in seconds since the epoch, or None for no deadline.
+        """
+        
+        self._deadline = deadline
+    
+    def _checkDeadline(self):
+        """
+        Raise TimeoutError if the deadline of the solver has passed.
+        """
+        
+        if self._deadline is not None and time.time() > self._deadline:
+            raise TimeoutError("Deadline exceeded.")
+        
+    def _checkConnected(self, map2d: Map2d, points: list[tuple[int, int]]):
+        """
+        Raise the "No solution found." exception before any search if the points cannot be joined.
+        
+        This looks up the connected components of the map (see Map2d.areConnected()), so a goal walled off from
+        the start is rejected at once instead of after expanding the whole area reachable from the start.
+        """
+        
+        if not map2d.areConnected(points):
+            raise Exception("No solution found.")
+        
+    def _searchLattice(self, map2d: Map2d, heuristic_scale: Optional[float] = None, relax: bool = True) -> Solution2d:
+        """
+        Best-first search from the start to the end of a 2D map, shared by the 2D graph searches.
+        
+        Lattice points are identified by their flat index x * (height + 1) + y. The cost from start, the parent
+        index and the action of every point live in flat typed arrays, and the open set is a binary heap of
+        (priority, index) pairs, as in DijkstraSolver3d. The solution is built from the parent indices (see
+        Solution2d.fromParents()), so no node is created during the search.
         
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+        - heuristic_scale (Optional[float]): Factor of the straight-line distance to the end added to the
+          priority of a point, or None to order the points by their cost from start only.
+        - relax (bool): Whether a cheaper way to a point in the open set replaces the first way found to it.
+        
+        Returns:
+        - Solution2d: The solution to the 2D map problem.
+        """
+        
+        start_time = time.perf_counter()
+        
+        start, goal = tuple(map2d.getStart()), tuple(map2d.getEnd())
+        size_x, size_y = map2d.getWidth() + 1, map2d.getHeight() + 1
+        move_costs = map2d.getMoveCosts()
+        
+        count = size_x * size_y
+        cost = array("d", [inf]) * count
+        parent = array("i", [-1]) * count
+        action_of = array("b", [-1]) * count
+        closed = bytearray(count)
+        
+        def priority(x: int, y: int, cost_from_start: float) -> float:
+            if heuristic_scale is None:
+                return cost_from_start
+            return cost_from_start + sqrt((x - goal[0]) ** 2 + (y - goal[1]) ** 2) * heuristic_scale
+        
+        start_index = start[0] * size_y + start[1]
+        goal_index = goal[0] * size_y + goal[1]
+        cost[start_index] = 0.0
+        heap = [(priority(start[0], start[1], 0.0), start_index)]
+        
+        while heap:
+            self._checkDeadline()
+            
+            _, index = heapq.heappop(heap)
+            if closed[index]:
+                continue
+            closed[index] = 1
+            
+            if index == goal_index:
+                # The nodes of the path are only created if the caller asks for them
+                runtime_milisec = (time.perf_counter() - start_time) * 10**3
+                return Solution2d.fromParents(parent, action_of, index, (size_x, size_y), cost[index], runtime_milisec)
+            
+            # The free neighbors for the obstacles configuration at this time, and the cost of the move to each
+            x, y = divmod(index, size_y)
+            states, valid = map2d.getNeighborStates((x, y))
+            step_costs = move_costs[:, x, y].tolist()
+            cost_start_to_node = cost[index]
+            for value in valid.nonzero()[0].tolist():
+                neighbor_x, neighbor_y = states[value].tolist()
+                neighbor = neighbor_x * size_y + neighbor_y
+                if closed[neighbor] or (not relax and cost[neighbor] < inf):
+                    continue
+                cost_start_to_neighbor = cost_start_to_node + step_costs[value]
+                if cost_start_to_neighbor < cost[neighbor]:
+                    cost[neighbor] = cost_start_to_neighbor
+                    parent[neighbor] = index
+                    action_of[neighbor] = value
+                    heapq.heappush(heap, (priority(neighbor_x, neighbor_y, cost_start_to_neighbor), neighbor))
+        
+        raise Exception("No solution found.")
+    
     def _constructPath(self, node: Node2d) -> list[Node2d]:
         """
         This method constructs the path by following the parent pointers.
@@ -55,10 +168,12 @@ class DijkstraSolver(Solver):
     """
     A class to solve a 2D map problem using Dijkstra's algorithm.
     
+    The search state lives in flat arrays indexed by lattice point (see Solver._searchLattice()), and the nodes
+    of the solution are built from the parent indices only when they are asked for.
+    
     Methods:
     - __init__(): Initializes the DijkstraSolver object.
     - solve(map2d: Map2d): Solves the 2D map problem and returns a Solution2d object.
-    - _constructPath(node: Node2d): Constructs a path from the start node to the end node.
     """
     
     def __init__(self):
@@ -81,68 +196,20 @@ class DijkstraSolver(Solver):
         
         if map2d.getPickUpPoints() != []:
             raise ValueError("DijkstraSolver is not designed to solve TSP problem. Please use another solver, such as GASolver.")
+        self._checkConnected(map2d, [map2d.getStart(), map2d.getEnd()])
         
-        # Start measuring runtime
-        start = time.perf_counter()
-        
-        # Dictionary of $node: distance from start$ pair
-        distance: Dict[Node2d, int] = {}
-        
-        # Initialize distance dictionary with start
-        distance[Node2d(map2d.getStart(), None, None)] = 0
-        
-        # Closed nodes
-        closed: list[Node2d] = []
-        
-        while len(distance) > 0:
-            # Get the node with the smallest cost from start
-            node, cost_start_to_node = min(distance.items(), key=lambda x: x[1])
-            
-            # Add this node to shortest path tree
-            closed.append(node)
-            
-            # If the node is the end node, return the path
-            if node.getState() == map2d.getEnd():
-                path = self._constructPath(node)
-                
-                # Measure runtime
-                end = time.perf_counter()
-                runtime_milisec = (end - start) * 10**3
-                
-                return Solution2d(path, cost_start_to_node, runtime_milisec)
-            
-            # Get the neighbors of the node
-            neighbors = map2d.getNeighbors(node)
-            
-            # For each neighbor in neighbors list, update their cost from start (if needed)
-            for neighbor in neighbors:
-                if neighbor is None:
-                    continue
-                if neighbor in closed:
-                    continue
-                cost_node_to_neighbor = neighbor.getAction().cost()
-                cost_start_to_neighbor = cost_start_to_node + cost_node_to_neighbor
-                if neighbor not in distance or distance[neighbor] > cost_start_to_neighbor:
-                    # If the neighbor is already in distance, delete it because its parent will be changed.
-                    if neighbor in distance:
-                        del distance[neighbor]
-                    # Update the cost from start of the neighbor
-                    distance[neighbor] = cost_start_to_neighbor
-                
-            # Delete this node from dictionary because it was in closed set.
-            del distance[node]
+        return self._searchLattice(map2d)
 
-        raise Exception("No solution found.")
-    
-    
 class A_asteriskSolver(Solver):
     """
     A class to solve a 2D map problem using A* algorithm.
     
+    The search state lives in flat arrays indexed by lattice point (see Solver._searchLattice()), and the nodes
+    of the solution are built from the parent indices only when they are asked for.
+    
     Methods:
     - __init__(): Initializes the A_asterickSolver object.
     - solve(map2d: Map2d): Solves the 2D map problem and returns a Solution2d object.
-    - _constructPath(node: Node2d): Constructs a path from the start node to the end node.
     """
     
     def __init__(self):
@@ -165,96 +232,23 @@ class A_asteriskSolver(Solver):
         
         if map2d.getPickUpPoints() != []:
             raise ValueError("A_asteriskSolver is not designed to solve TSP problem. Please use another solver, such as GASolver.")
+        self._checkConnected(map2d, [map2d.getStart(), map2d.getEnd()])
         
-        # Start measuring runtime in second. Time: t = t0
-        start = time.perf_counter()
-        
-        # Dictionary of $node: distance from start$ pair
-        true_cost: Dict[Node2d, int] = {}
-        
-        # Initialize distance dictionary with start
-        true_cost[Node2d(map2d.getStart(), None, None)] = 0
-        
-        # Define new distance dictionary
-        g: Dict[Node2d, int] = {}
-        
-        # Initialize g
-        g[Node2d(map2d.getStart(), None, None)] = self._distance(map2d.getStart(), map2d.getEnd())
-        
-        # Closed nodes
-        closed: list[Node2d] = []
-        
-        while len(true_cost) > 0:
-            # Get the node with the smallest cost from start
-            node, _ = min(g.items(), key=lambda x: x[1])
-            cost_start_to_node = true_cost[node]
-            
-            closed.append(node)
-            firstIteration = True
-            cost = 0
-            
-            # If the node is the end node, return the path
-            if node.getState() == map2d.getEnd():
-                path = self._constructPath(node)
-                
-                for node in path:
-                    curr_node = node.getState()
-                    if (firstIteration):
-                        firstIteration = False
-                        prev_node = node.getState()
-                        continue
-                    cost += self._distance(prev_node, curr_node)
-                    prev_node = node.getState()
-                    
-                # Measure runtime
-                end = time.perf_counter()
-                runtime_milisec = (end - start) * 10**3
-                    
-                return Solution2d(path, cost, runtime_milisec)
-            
-            # Get the neighbors of the node that are appropriate for the obstacles configuration at this time
-            neighbors = map2d.getNeighbors(node)
-            
-            # For each neighbor in neighbors list, update their cost from start (if needed)
-            for neighbor in neighbors:
-                if neighbor is None:
-                    continue
-                if neighbor in closed:
-                    continue
-                
-                cost_node_to_neighbor = neighbor.getAction().cost()
-                cost_neighbor_to_end = self._distance(neighbor.getState(), map2d.getEnd())
-                cost_start_to_neighbor = cost_start_to_node \
-                                        + cost_node_to_neighbor
-                
-                if neighbor not in true_cost or true_cost[neighbor] > cost_start_to_neighbor:
-                    # If the neighbor is already in distance, delete it because its parent will be changed.
-                    if neighbor in true_cost:
-                        del true_cost[neighbor]
-
-                    # Update the cost from start of the neighbor
-                    true_cost[neighbor] = cost_start_to_neighbor
+        # No move costs less than its length times the cheapest lattice point, so the straight-line
+        # distance scaled by that cost is an admissible heuristic
+        return self._searchLattice(map2d, heuristic_scale=map2d.getMinimumCellCost())
 
-                    if neighbor in g:
-                        del g[neighbor]
-
-                    # Update g dictionary
-                    g[neighbor] = cost_start_to_neighbor + cost_neighbor_to_end
-
-            # Delete this node from dictionary because it was in closed set.
-            del true_cost[node]
-            del g[node]
-
-        raise Exception("No solution found.")
 
 class GBFS_Solver(Solver):
     """
     A class to solve a 2D map problem using GBFS's algorithm.
     
+    The search state lives in flat arrays indexed by lattice point (see Solver._searchLattice()), and the nodes
+    of the solution are built from the parent indices only when they are asked for.
+    
     Methods:
     - __init__(): Initializes the GBFS Solver object.
     - solve(map2d: Map2d): Solves the 2D map problem and returns a Solution2d object.
-    - _constructPath(node: Node2d): Constructs a path from the start node to the end node.
     """
     
     def __init__(self):
@@ -277,65 +271,56 @@ class GBFS_Solver(Solver):
         
         if map2d.getPickUpPoints() != []:
             raise ValueError("GBFS_Solver is not designed to solve TSP problem. Please use another solver, such as GASolver.")
+        self._checkConnected(map2d, [map2d.getStart(), map2d.getEnd()])
         
-        # Start measuring runtime
-        start = time.perf_counter()
-        
-        # Dictionary of $node: distance from start$ pair
-        distance: Dict[Node2d, int] = {}
-        
-        # Initialize distance dictionary with start
-        start_node = map2d.getStart()
-        end_node = map2d.getEnd()
-        start_x, start_y = start_node
-        end_x, end_y = end_node
-        
-        start_node = Node2d((start_x, start_y), None , None)
-        end_node = Node2d((end_x, end_y), None , None)
-
-        distance[start_node] = 0
+        # The cost of a point is fixed by the first expanded point that reaches it
+        return self._searchLattice(map2d, relax=False)
 
-        # Closed nodes
-        closed: list[Node2d] = []
-                
-
-        while len(distance) > 0:
-            # Get the node with the smallest cost from start
-            node, cost_start_to_node = min(distance.items(), key=lambda x: x[1])
-            
-            # Add this node to shortest path tree
-            closed.append(node)
-            
-            # If the node is the end node, return the path
-            if node.getState() == map2d.getEnd():
-                path = self._constructPath(node)
-                
-                # Measure runtime
-                end = time.perf_counter()
-                runtime_milisec = (end - start) * 10**3
-                
-                return Solution2d(path, cost_start_to_node, runtime_milisec)
-            
-            # Get the neighbors of the node
-            neighbors = map2d.getNeighbors(node)
-            
-           # For each neighbor in neighbors list, update their distance
-            for neighbor in neighbors:
-                if neighbor is None or neighbor in closed:
-                    continue
-                if neighbor not in distance:
-                    cost_to_neighbor = neighbor.getAction().cost()
-                    
-                    neighbor_x, neighbor_y = neighbor.getState()
-                    distance[neighbor] = abs(neighbor_x - end_x) + abs(neighbor_y - end_y)
-                    
-                    distance[neighbor] = cost_start_to_node + cost_to_neighbor  # Accumulating cost
-            del distance[node]
 
-        raise Exception("No solution found.")
-    
 class GASolver(Solver):
-    def __init__(self, num_generations: int = 75, num_of_parents: int = 20, sol_per_pop: int = 200, mutation_probability: tuple[float, float] = (0.8, 0.2)):
+    def __init__(self, num_generations: int = 75, num_of_parents: int = 20, sol_per_pop: int = 200, mutation_probability: tuple[float, float] = (0.8, 0.2),
+                 obstacle_penalty: float = 0.0, time_budget_ms: Optional[float] = None, stall_generations: Optional[int] = 10,
+                 callback: Optional[Callable[[int, list[tuple[int, int]], float], None]] = None, fitness_cache_size: int = 10000,
+                 telemetry: bool = True, seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None,
+                 crossover: str = "ox1", mutation: str = "swap", elitism: int = 0, leg_workers: int = 1):
+        """
+        Initializes the GASolver object.
+        
+        Parameters:
+        - num_generations (int): Maximum number of generations.
+        - num_of_parents (int): Number of parents selected in each generation.
+        - sol_per_pop (int): Number of solutions per population.
+        - mutation_probability (tuple[float, float]): Mutation probabilities of below-average and above-average chromosomes.
+        - obstacle_penalty (float): Extra cost per unit length of every straight leg that crosses an obstacle,
+          since such a leg has to detour in the final path. 0 disables the obstacle check.
+        - time_budget_ms (Optional[float]): Wall-clock budget of the evolution in miliseconds. None means no time limit.
+        - stall_generations (Optional[int]): Stop when the best fitness has not improved for this many generations.
+          None disables stall detection.
+        - callback (Optional[Callable]): Called after each generation with the generation number,
+          the best-so-far order of pick-up points and its fitness.
+        - fitness_cache_size (int): Maximum number of chromosomes whose fitness is memoized. The least recently
+          used entries are evicted first. 0 disables the cache.
+        - telemetry (bool): Record per-generation telemetry (see GATelemetry), returned as Solution2d.telemetry.
+        - seed (Optional): Seed of the random generator of the evolution: an int, a numpy SeedSequence (e.g. one of the
+          independent streams spawned for a worker) or a Generator. A fresh generator is built from an int or a
+          SeedSequence at the start of every run, so runs with the same seed and parameters are identical. A Generator
+          is used as it is and keeps its state between runs. None seeds every run from the operating system.
+        - crossover (str): Crossover operator:
+          - "ox1": order crossover, which keeps a slice of one parent and the relative order of the other
+          - "pmx": partially mapped crossover, which keeps a slice of one parent and the positions of the other
+          - "erx": edge recombination, which builds the child from the adjacencies of both parents, preferring
+            the nearest pick-up point when several adjacencies are equally rare
+        - mutation (str): Mutation operator:
+          - "swap": swap two random pick-up points
+          - "inversion": reverse a random segment of the order
+          - "two_opt": apply the best 2-opt move (reversal of a segment) found on the distance matrix of the
+            pick-up points, which uses the same leg costs as the fitness, obstacle penalty included
+        - elitism (int): Number of the best parents copied unchanged into the next generation.
+        - leg_workers (int): Largest number of worker processes planning the legs of the route at the same time.
+          1 plans them one after the other in this process. Routes too small to pay for the pool, and machines
+          with a single CPU, are planned serially whatever the value (see benchmark_leg_workers.py).
+        """
+        
         self.__num_generations: int = num_generations
         
         # Check if the number of parents is larger than the number of solutions per population
@@ -345,23 +330,89 @@ class GASolver(Solver):
         self.__num_of_parents: int = num_of_parents
         self.__sol_per_pop: int = sol_per_pop
         self.__mutation_probability: tuple[float, float] = mutation_probability
+        self.__obstacle_penalty: float = obstacle_penalty
+        self.__time_budget_ms: Optional[float] = time_budget_ms
+        self.__stall_generations: Optional[int] = stall_generations
+        self.__callback = callback
+        self.__convergence_stats: dict = {}
+        self.__fitness_cache_size: int = fitness_cache_size
+        self.__fitness_cache: OrderedDict[tuple[int, ...], float] = OrderedDict()
+        self.__pickup_index: dict[tuple[int, int], int] = {}
+        self.__cache_hits: int = 0
+        self.__cache_misses: int = 0
+        self.__record_telemetry: bool = telemetry
+        self.__seed = seed
+        self.__rng: np.random.Generator = np.random.default_rng(seed)
+        self.__telemetry: Optional[GATelemetry] = None
         self.map: Map2d = None
         self.__tournament_size: int = int(self.__num_of_parents * 0.6)
+        
+        crossovers = {"ox1": self.__order1_crossover, "pmx": self.__pmx_crossover, "erx": self.__edge_recombination}
+        mutations = {"swap": self.__swap_genes, "inversion": self.__inversion, "two_opt": self.__two_opt}
+        if crossover not in crossovers:
+            raise ValueError(f"Unknown crossover '{crossover}'. Available crossovers: {', '.join(crossovers)}.")
+        if mutation not in mutations:
+            raise ValueError(f"Unknown mutation '{mutation}'. Available mutations: {', '.join(mutations)}.")
+        if not 0 <= elitism <= num_of_parents:
+            raise ValueError("The number of elites must be between 0 and the number of parents.")
+        self.__crossover = crossovers[crossover]
+        self.__mutate = mutations[mutation]
+        self.__elitism: int = elitism
+        self.__leg_workers: int = leg_workers
+        self.__distance: Optional[np.ndarray] = None
+    
+    def __population_fitness(self, population: list[list[tuple[int, int]]]) -> np.ndarray:
+        if self.__fitness_cache_size <= 0:
+            self.__cache_misses += len(population)
+            return self.__compute_fitness(population)
+        
+        # A chromosome is a permutation of the pick-up points, so the tuple of their indices identifies it
+        keys = [tuple(self.__pickup_index[gene] for gene in chromosome) for chromosome in population]
+        fitness = np.empty(len(population), dtype=float)
+        
+        misses: dict[tuple[int, ...], list[int]] = {}
+        for i, key in enumerate(keys):
+            cached = self.__fitness_cache.get(key)
+            if cached is not None:
+                self.__fitness_cache.move_to_end(key)
+                fitness[i] = cached
+                self.__cache_hits += 1
+            else:
+                misses.setdefault(key, []).append(i)
+        
+        # Score the unseen chromosomes in one batch and remember them
+        if misses:
+            first_positions = [positions[0] for positions in misses.values()]
+            computed = self.__compute_fitness([population[i] for i in first_positions])
+            for (key, positions), value in zip(misses.items(), computed.tolist()):
+                fitness[positions] = value
+                self.__fitness_cache[key] = value
+            self.__cache_misses += len(misses)
+            self.__cache_hits += sum(len(positions) - 1 for positions in misses.values())
+            
+            while len(self.__fitness_cache) > self.__fitness_cache_size:
+                self.__fitness_cache.popitem(last=False)
+        
+        return fitness
     
-    def __fitness_func(self, solution: list[tuple[int, int]]) -> float:
-        # # If there is a line connecting any two consecutive points in the solution crosses over any obstacles, this solution will have negative fitness.
-        # if not self.map.validatePickupSequence(solution):
-        #     return -1
+    def __compute_fitness(self, population: list[list[tuple[int, int]]]) -> np.ndarray:
+        # Lay out the straight route of every chromosome as one (P, n + 2, 2) array: start, pick-up points, end
+        pickups = np.asarray(population, dtype=float).reshape(len(population), -1, 2)
+        routes = np.empty((len(population), pickups.shape[1] + 2, 2), dtype=float)
+        routes[:, 0] = self.map.getStart()
+        routes[:, 1:-1] = pickups
+        routes[:, -1] = self.map.getEnd()
+        
+        legs_length = np.linalg.norm(np.diff(routes, axis=1), axis=2)
         
-        # If the solution is valid, calculate the cost of the solution.
-        cost = 0
+        # Legs that cross an obstacle are penalized in proportion to their length. All legs of the whole
+        # population are tested against the obstacles in a single batch.
+        if self.__obstacle_penalty > 0:
+            legs = np.stack([routes[:, :-1], routes[:, 1:]], axis=2).reshape(-1, 2, 2)
+            collide = self.map.segmentsCollide(legs).reshape(legs_length.shape)
+            legs_length = legs_length * (1 + self.__obstacle_penalty * collide)
         
-        first_segment_cost = sqrt((solution[0][0] - self.map.getStart()[0])**2 + (solution[0][1] - self.map.getStart()[1])**2)
-        cost += first_segment_cost
-        for i in range(1, len(solution)):
-            cost += sqrt((solution[i][0] - solution[i - 1][0])**2 + (solution[i][1] - solution[i - 1][1])**2)
-        last_segment_cost = sqrt((solution[-1][0] - self.map.getEnd()[0])**2 + (solution[-1][1] - self.map.getEnd()[1])**2)
-        cost += last_segment_cost
+        cost = legs_length.sum(axis=1)
         
         # Smaller the cost, better the fitness
         return 1 / (cost + 0.0000001) # Add a small number to avoid division by zero
@@ -369,12 +420,12 @@ class GASolver(Solver):
     def __init_population(self) -> list[list[tuple[int, int]]]:
         initial_population = []
         for _ in range(self.__sol_per_pop):
-            initial_population.append(self.map.getRandomPickUpSequence())
+            initial_population.append(self.map.getRandomPickUpSequence(self.__rng))
         return initial_population
     
     def __tournament(self, competitors: list[list[tuple[int, int]]]) -> tuple[list[tuple[int, int]], float]:
         # Evaluate each competitor's fitness and store them in a list of tuples
-        competitors_fitness = [(competitor, self.__fitness_func(competitor)) for competitor in competitors]
+        competitors_fitness = list(zip(competitors, self.__population_fitness(competitors).tolist()))
             
         # Sort the competitors by their fitness from high to low
         competitors_fitness.sort(key=lambda x: x[1], reverse=True)
@@ -388,7 +439,7 @@ class GASolver(Solver):
         winners = []
         for _ in range(num_of_parents):
             # Select random competitors from the population
-            competitors = random.sample(population, tournament_size)
+            competitors = [population[i] for i in self.__rng.choice(len(population), size=tournament_size, replace=False)]
             winner_tuple = self.__tournament(competitors)
             winners.append(winner_tuple)
          
@@ -407,8 +458,8 @@ class GASolver(Solver):
         child1 = [None] * l
         child2 = [None] * l
         while start >= end:
-            start = random.randint(0, l - 1)
-            end = random.randint(start, l - 1)
+            start = int(self.__rng.integers(0, l))
+            end = int(self.__rng.integers(start, l))
         
         # Copy part of the parent to the children
         child1[start:end+1] = parent1[start:end+1]
@@ -438,22 +489,24 @@ class GASolver(Solver):
     def __generate_new_population(self, parents_list_of_tuple: 
         list[tuple[list[tuple[int, int]], float]]) -> list[list[tuple[int, int]]]:
         
-        count_children = 0
-        new_population: list[list[tuple[int, int]]] = []
+        # The elites go to the next generation unchanged. They are copied, since the parents may be selected again.
+        elites = sorted(parents_list_of_tuple, key=lambda x: x[1], reverse=True)[:self.__elitism]
+        new_population: list[list[tuple[int, int]]] = [list(elite) for elite, _ in elites]
+        count_children = len(new_population)
         while count_children < self.__sol_per_pop:
             # Select randomly parents
             parent1_idx: int = 0
             parent2_idx: int = 0
             while parent1_idx == parent2_idx:
-                parent1_idx = random.randint(0, len(parents_list_of_tuple) - 1)
-                parent2_idx = random.randint(0, len(parents_list_of_tuple) - 1)
+                parent1_idx = int(self.__rng.integers(0, len(parents_list_of_tuple)))
+                parent2_idx = int(self.__rng.integers(0, len(parents_list_of_tuple)))
                 
             # Take those randomly chosen parents out of the list of tuple and assign into different variables
             parent1: list[tuple[int, int]] = parents_list_of_tuple[parent1_idx][0]
             parent2: list[tuple[int, int]] = parents_list_of_tuple[parent2_idx][0]
             
-            # Perform OX_1 crossover
-            children: list[list[tuple[int, int]]] = self.__order1_crossover(parent1, parent2)
+            # Perform the crossover
+            children: list[list[tuple[int, int]]] = self.__crossover(parent1, parent2)
             
             # Add the recently born children to the new population
             new_population += children
@@ -467,198 +520,666 @@ class GASolver(Solver):
             
         return new_population
     
-    def __swap_mutation(self, new_population: list[list[tuple[int, int]]]) -> list[list[tuple[int, int]]]:
+    def __pmx_crossover(self, parent1: list[tuple[int, int]],
+                        parent2: list[tuple[int, int]]) -> list[list[tuple[int, int]]]:
+        if len(parent1) != len(parent2):
+            raise ValueError("The size of the parent chromosomes are different")
+        l = len(parent1)
+        
+        start = int(self.__rng.integers(0, l))
+        end = int(self.__rng.integers(start, l))
+        return [self.__pmx_child(parent1, parent2, start, end), self.__pmx_child(parent2, parent1, start, end)]
+    
+    def __pmx_child(self, donor: list[tuple[int, int]], other: list[tuple[int, int]], start: int, end: int) -> list[tuple[int, int]]:
+        # The slice of the donor is kept. A gene of the other parent that the slice displaced is placed where its
+        # mapping through the slice leads out of the slice, and the other genes keep their position.
+        child = [None] * len(donor)
+        child[start:end + 1] = donor[start:end + 1]
+        in_slice = set(donor[start:end + 1])
+        position_in_other = {gene: i for i, gene in enumerate(other)}
+        
+        for i in range(start, end + 1):
+            gene = other[i]
+            if gene in in_slice:
+                continue
+            position = i
+            while start <= position <= end:
+                position = position_in_other[donor[position]]
+            child[position] = gene
+        
+        for i, gene in enumerate(other):
+            if child[i] is None:
+                child[i] = gene
+        return child
+    
+    def __edge_recombination(self, parent1: list[tuple[int, int]],
+                             parent2: list[tuple[int, int]]) -> list[list[tuple[int, int]]]:
+        if len(parent1) != len(parent2):
+            raise ValueError("The size of the parent chromosomes are different")
+        return [self.__erx_child(parent1, parent2, parent1[0]), self.__erx_child(parent1, parent2, parent2[0])]
+    
+    def __erx_child(self, parent1: list[tuple[int, int]], parent2: list[tuple[int, int]],
+                    first: tuple[int, int]) -> list[tuple[int, int]]:
+        # Adjacencies of every pick-up point in either parent. The order is an open path between start and end,
+        # so the first and the last point are not adjacent.
+        neighbors: dict[tuple[int, int], set] = {gene: set() for gene in parent1}
+        for parent in (parent1, parent2):
+            for a, b in zip(parent[:-1], parent[1:]):
+                neighbors[a].add(b)
+                neighbors[b].add(a)
+        
+        distance = self.__distance_matrix()
+        index = self.__pickup_index
+        child = []
+        current = first
+        while True:
+            child.append(current)
+            adjacent = neighbors.pop(current)
+            for gene in adjacent:
+                neighbors[gene].discard(current)
+            if not neighbors:
+                return child
+            
+            # Go to the adjacent point with the fewest remaining adjacencies, the nearest one on ties. Without
+            # any adjacency left, go to the nearest unvisited point.
+            row = distance[index[current] + 1]
+            if adjacent:
+                current = min(adjacent, key=lambda gene: (len(neighbors[gene]), row[index[gene] + 1]))
+            else:
+                current = min(neighbors, key=lambda gene: row[index[gene] + 1])
+    
+    def __mutation(self, new_population: list[list[tuple[int, int]]]) -> list[list[tuple[int, int]]]:
         
         # Calculate average fitness of the population
-        population_fitness_list: list[float] = [self.__fitness_func(chromosome) for chromosome in new_population]
+        population_fitness_list: list[float] = self.__population_fitness(new_population).tolist()
         average_fitness = np.average(population_fitness_list)
         
-        # Iterate through new_population with enum
-        for i, chromosome in enumerate(new_population):
-            need_to_mutate = False
-            if population_fitness_list[i] < average_fitness:
-                p = random.randint(0,1) # Probability that this chromosome will be mutated
-                if p < self.__mutation_probability[0]:
-                    need_to_mutate = True
-            else:
-                p = random.randint(0,1) # Probability that this chromosome will be mutated
-                if p < self.__mutation_probability[1]:
-                    need_to_mutate = True
-            
-            # If the chromosome needs to be mutated, swap two random genes
-            if need_to_mutate:
-                idx1 = random.randint(0, len(chromosome) - 1)
-                while True:
-                    idx2 = random.randint(0, len(chromosome) - 1)
-                    if idx1 != idx2:
-                        break
-                chromosome[idx1], chromosome[idx2] = chromosome[idx2], chromosome[idx1]
-                new_population[i] = chromosome
+        # One uniform draw per chromosome: below-average chromosomes are mutated with the first probability,
+        # the others with the second one. The elites at the front of the population are not mutated.
+        draws = self.__rng.random(len(new_population))
+        for i in range(self.__elitism, len(new_population)):
+            if len(new_population[i]) < 2:
+                break
+            probability = self.__mutation_probability[0 if population_fitness_list[i] < average_fitness else 1]
+            if draws[i] < probability:
+                new_population[i] = self.__mutate(new_population[i])
         
         return new_population
     
-    def solve(self, map: Map2d) -> Solution2d:
+    def __swap_genes(self, chromosome: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        # Swap two random genes
+        idx1, idx2 = self.__rng.choice(len(chromosome), size=2, replace=False).tolist()
+        chromosome[idx1], chromosome[idx2] = chromosome[idx2], chromosome[idx1]
+        return chromosome
+    
+    def __inversion(self, chromosome: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        # Reverse the genes between two random positions
+        idx1, idx2 = sorted(self.__rng.choice(len(chromosome), size=2, replace=False).tolist())
+        chromosome[idx1:idx2 + 1] = chromosome[idx1:idx2 + 1][::-1]
+        return chromosome
+    
+    def __two_opt(self, chromosome: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        # Key points of the route: 0 is the start, 1..n the pick-up points and n + 1 the end
+        n = len(chromosome)
+        nodes = np.empty(n + 2, dtype=np.int64)
+        nodes[0], nodes[-1] = 0, n + 1
+        nodes[1:-1] = [self.__pickup_index[gene] + 1 for gene in chromosome]
+        
+        # Cost change of reversing the genes between positions i and j, for all pairs at once
+        i, j = np.triu_indices(n, k=1)
+        i, j = i + 1, j + 1
+        d = self.__distance_matrix()
+        delta = d[nodes[i - 1], nodes[j]] + d[nodes[i], nodes[j + 1]] - d[nodes[i - 1], nodes[i]] - d[nodes[j], nodes[j + 1]]
+        
+        best = int(np.argmin(delta))
+        if delta[best] < -1e-9:
+            a, b = int(i[best]) - 1, int(j[best]) - 1
+            chromosome[a:b + 1] = chromosome[a:b + 1][::-1]
+            return chromosome
+        
+        # A locally optimal order gets a random inversion instead, so that the mutation still diversifies
+        return self.__inversion(chromosome)
+    
+    def __distance_matrix(self) -> np.ndarray:
+        # Cost of the straight leg between every pair of key points (start, pick-up points, end), computed as
+        # in the fitness: length, increased by the obstacle penalty for a leg that crosses an obstacle
+        if self.__distance is None:
+            points = np.array([self.map.getStart()] + list(self.map.getPickUpPoints()) + [self.map.getEnd()], dtype=float)
+            distance = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+            if self.__obstacle_penalty > 0:
+                legs = np.stack(np.broadcast_arrays(points[:, None], points[None, :]), axis=2).reshape(-1, 2, 2)
+                collide = self.map.segmentsCollide(legs).reshape(distance.shape)
+                distance = distance * (1 + self.__obstacle_penalty * collide)
+            self.__distance = distance
+        return self.__distance
+    
+    def iterSolve(self, map: Map2d) -> Iterator[tuple[list[tuple[int, int]], float]]:
         """
-        This method is used to solve the given map using the Genetic Algorithm.
+        Run the Genetic Algorithm as an anytime search and yield the best-so-far order of pick-up points
+        and its fitness after each generation.
+        
+        The evolution stops when the generation budget, the time budget or the stall criterion is reached,
+        or as soon as the caller stops iterating. Any yielded order can be turned into a route with
+        constructPath(), so a caller can dispatch a usable route early and keep refining it.
         
         Parameters:
         map (Map2d): The map to be solved.
         
         Returns:
-        Solution2d: The solution to the map.
+        Iterator[tuple[list[tuple[int, int]], float]]: Best-so-far order and its fitness, once per generation.
         
         Example:
-        >>> from map_file_reader import MapFileReader
-        >>> from solver import GASolver
-        >>> reader = MapFileReader("input_tsp/tsp_static_obstacles_3.txt")
-        >>> map2d = reader.readMap2d()
-        >>> solver = GASolver(num_generations=250, num_of_parents=100, sol_per_pop=1500, mutation_probability=(0.8,0.2))
-        >>> solution = map2d.solvedBy(solver=solver)
-        >>> solution.showToConsole()
+        >>> solver = GASolver(time_budget_ms=50)
+        >>> for order, fitness in solver.iterSolve(map2d):
+        ...     route = solver.constructPath(map2d, order)
         """
         
-        solution = None
+        # Check if this is the TSP problem
+        if map.getPickUpPoints() == []:
+            raise ValueError("GASolver is designed to solve only TSP problem. Please use another solver.")
+        
+        # A pick-up point cut off from the start makes every order infeasible
+        self._checkConnected(map, [map.getStart()] + list(map.getPickUpPoints()) + [map.getEnd()])
+        
+        self.map = map
+        if not isinstance(self.__seed, np.random.Generator):
+            self.__rng = np.random.default_rng(self.__seed)
+        
+        # Start measuring time
+        start = time.perf_counter()
+        self.__convergence_stats = {"generations": 0, "elapsed_milisec": 0.0, "best_fitness": None, "stop_reason": None,
+                                    "cache_hits": 0, "cache_misses": 0, "cache_hit_rate": 0.0}
+        
+        # Cached fitness values are only valid for this map
+        self.__fitness_cache.clear()
+        self.__pickup_index = {point: i for i, point in enumerate(map.getPickUpPoints())}
+        self.__distance = None
+        self.__cache_hits = 0
+        self.__cache_misses = 0
+        self.__telemetry = GATelemetry() if self.__record_telemetry else None
+        self.__recorded_hits = 0
+        self.__recorded_misses = 0
+        generation_start = start
+        
         # If there is only one pick-up points, it is obviously the first and the only point will be visited.
         if len(map.getPickUpPoints()) == 1:
-            solution = map.getPickUpPoints()
-        # But if there is many pick-up points also
-        else:
-            # Check if this is the TSP problem
-            if map.getPickUpPoints() == []:
-                raise ValueError("GASolver is designed to solve only TSP problem. Please use another solver.")
-            
-            self.map = map
-            
-            try:
-                # Lock the obstacles configuration to solve the map at this instant moment
-                self.map.obstacles_lock.acquire()
-            except AttributeError:
-                pass
-            
-            # Start measuring time
-            start = time.perf_counter()
-            
-            # Population initialization
+            order = list(map.getPickUpPoints())
+            fitness = float(self.__population_fitness([order])[0])
+            self.__record_generation([(order, fitness)], generation_start)
+            self.__convergence_stats.update(best_fitness=fitness, stop_reason="trivial", **self.__cache_stats())
+            yield order, fitness
+            return
+        
+        # Population initialization and selection of the parents, on the obstacles configuration at this instant moment
+        with self.__obstacles_locked():
             initial_population = self.__init_population()
-            
-            # Select parents
             parents_list_of_tuple = self.__tournament_selection(initial_population, 
                                                                 self.__num_of_parents, 
                                                                 self.__tournament_size)
+        
+        # Keep the best chromosome ever seen, since the parents of a generation may lose it
+        curr_generation = 0
+        best_order, best_fitness = max(parents_list_of_tuple, key=lambda x: x[1])
+        best_order = list(best_order)
+        stalled_generations = 0
+        
+        generation_start = self.__record_generation(parents_list_of_tuple, generation_start)
+        
+        while True:
+            self._checkDeadline()
             
-            # Calculate the average of the 4 most recent set of parents from the 4 most recent generation
-            curr_generation = 0
-            x = 0
-            y = 0
-            z = 0
-            t = np.average([parents_list_of_tuple[i][1] 
-                            for i in range(len(parents_list_of_tuple))]) # Calculate the average fitness of the current parents
+            elapsed_milisec = (time.perf_counter() - start) * 10**3
+            self.__convergence_stats.update(generations=curr_generation, elapsed_milisec=elapsed_milisec, best_fitness=best_fitness,
+                                            **self.__cache_stats())
             
-            # Testing performance of algorithm
-            generations_averages = []
-            generations_averages.append(t)
-            generations_bests = []
-            generations_bests.append(max(parents_list_of_tuple, key=lambda x: x[1])[1])
+            if self.__callback is not None:
+                self.__callback(curr_generation, best_order, best_fitness)
+            # The lock is never held here: the caller may construct a path and the obstacles keep moving
+            yield best_order, best_fitness
             
-            convergence = (t - x < 0.00001) or (curr_generation > self.__num_generations)
-            while not convergence:
+            # Stopping rules
+            stop_reason = None
+            if curr_generation >= self.__num_generations:
+                stop_reason = "generations"
+            elif self.__time_budget_ms is not None and (time.perf_counter() - start) * 10**3 >= self.__time_budget_ms:
+                stop_reason = "time_budget"
+            elif self.__stall_generations is not None and stalled_generations >= self.__stall_generations:
+                stop_reason = "stalled"
+            if stop_reason is not None:
+                self.__convergence_stats["stop_reason"] = stop_reason
+                break
+            
+            with self.__obstacles_locked():
                 new_population: list[list[tuple[int, int]]] = self.__generate_new_population(parents_list_of_tuple)
-                new_population = self.__swap_mutation(new_population)
+                new_population = self.__mutation(new_population)
                 parents_list_of_tuple = self.__tournament_selection(new_population, 
                                                                     self.__num_of_parents, 
                                                                     self.__tournament_size)
-                x = y
-                y = z
-                z = t
-                t = np.average([parents_list_of_tuple[i][1] 
-                                for i in range(len(parents_list_of_tuple))])
-                
-                # Testing performance of algorithm
-                generations_averages.append(t)
-                generations_bests.append(max(parents_list_of_tuple, key=lambda x: x[1])[1])
-                
-                convergence = (t - x < 0.00001) or (curr_generation > self.__num_generations)
-                
-            # If it is converged, return the best solution
-            solution: tuple[list[tuple[int, int]], float] = max(parents_list_of_tuple, key=lambda x: x[1])
-            solution = solution[0]
+            curr_generation += 1
+            
+            generation_best, generation_best_fitness = max(parents_list_of_tuple, key=lambda x: x[1])
+            
+            generation_start = self.__record_generation(parents_list_of_tuple, generation_start)
+            
+            if generation_best_fitness > best_fitness:
+                best_order, best_fitness = list(generation_best), generation_best_fitness
+                stalled_generations = 0
+            else:
+                stalled_generations += 1
+    
+    @contextmanager
+    def __obstacles_locked(self) -> Iterator[None]:
+        # Hold the obstacles of a map with moving obstacles still for one step of the evolution
+        lock = getattr(self.map, "obstacles_lock", None)
+        if lock is None:
+            yield
+            return
+        with lock:
+            yield
+    
+    def __record_generation(self, parents: list[tuple[list[tuple[int, int]], float]], generation_start: float) -> float:
+        # Append the telemetry of the generation that started at generation_start and return the start of the next one
+        now = time.perf_counter()
+        if self.__telemetry is not None:
+            fitness = np.fromiter((parent[1] for parent in parents), dtype=float, count=len(parents))
+            self.__telemetry.record(float(fitness.max()), float(fitness.mean()), float(fitness.std()),
+                                    (now - generation_start) * 10**3, self.__cache_hits - self.__recorded_hits,
+                                    self.__cache_misses - self.__recorded_misses)
+            self.__recorded_hits, self.__recorded_misses = self.__cache_hits, self.__cache_misses
+        return now
+    
+    def __cache_stats(self) -> dict:
+        lookups = self.__cache_hits + self.__cache_misses
+        return {"cache_hits": self.__cache_hits, "cache_misses": self.__cache_misses,
+                "cache_hit_rate": self.__cache_hits / lookups if lookups > 0 else 0.0}
+    
+    def getConvergenceStats(self) -> dict:
+        """
+        Return statistics of the latest run: number of generations, elapsed miliseconds of the evolution,
+        best fitness, the reason the evolution stopped ("generations", "time_budget", "stalled" or "trivial")
+        and the hits, misses and hit rate of the fitness cache.
+        """
+        
+        return dict(self.__convergence_stats)
+    
+    def getTelemetry(self) -> Optional[GATelemetry]:
+        """
+        Return the per-generation telemetry of the latest run, or None if telemetry is disabled. During
+        iterSolve() the object grows by one record per generation, so it can be read while the run goes on.
+        """
         
-        # Use the best solution to construct the path between start and end points.
-        # Now we need to find shortest path between start and first pickup point, and between each pair of consecutive pickup points
-        # and between last pickup point and end point.
+        return self.__telemetry
+    
+    def solve(self, map: Map2d) -> Solution2d:
+        """
+        This method is used to solve the given map using the Genetic Algorithm.
         
-        # Construct the shortest path from start to first pickup point using A* algorithm
-        # Create the only map to use in below steps
+        Parameters:
+        map (Map2d): The map to be solved.
         
-        map2d = Map2d(map.getStart(), solution[0], 
-                    map.getObstacles(), map.getObstaclesSpeed(), 
-                    map.getWidth(), map.getHeight(), [])
+        Returns:
+        Solution2d: The solution to the map.
         
-        # To avoid extending on the end point, add the end point to obstacle list
-        # If a sub-problem doesn't have any solution, so does the main problem.
-        map2d.addObstacle(Point(map.getEnd()))
+        Example:
+        >>> from map_file_reader import MapFileReader
+        >>> from solver import GASolver
+        >>> reader = MapFileReader("input_tsp/tsp_static_obstacles_3.txt")
+        >>> map2d = reader.readMap2d()
+        >>> solver = GASolver(num_generations=250, num_of_parents=100, sol_per_pop=1500, mutation_probability=(0.8,0.2))
+        >>> solution = map2d.solvedBy(solver=solver)
+        >>> solution.showToConsole()
+        """
         
-        start_to_first_pickup = None
-        while True:
-            start_to_first_pickup = A_asteriskSolver().solve(map2d)
-            if start_to_first_pickup is not None:
-                break
-            else:
-                raise Exception("No solution found.")
+        # Start measuring time
+        start = time.perf_counter()
         
-        # If there are more than 1 obstacles
-        if len(map.getObstacles()) > 1:
-            # Construct the shortest path between each pair of consecutive pickup points using A* algorithm
-            pickup_to_pickup = []
-            for i in range(len(solution) - 1):
-                map2d.setStart(solution[i])
-                map2d.setEnd(solution[i + 1])
-                
-                while True:
-                    sub_solution = A_asteriskSolver().solve(map2d)
-                
-                    if sub_solution is not None:
-                        pickup_to_pickup.append(sub_solution)
-                        break
-                    else:
-                        raise Exception("No solution found.")
-                        
+        # Run the evolution until one of the stopping rules is reached
+        solution = None
+        for solution, _ in self.iterSolve(map):
+            pass
         
-        # Remove end point out of list of obstacles
-        map2d.removeLastObstacle(Point(map.getEnd()))
+        result = self.constructPath(map, solution)
         
-        # Construct the shortest path from last pickup point to end using A* algorithm
-        map2d.setStart(solution[-1])
-        map2d.setEnd(map.getEnd())
+        end = time.perf_counter()
+        result.runtime_milisec = (end - start) * 10**3
+        result.telemetry = self.__telemetry
+        return result
+    
+    def iterLegs(self, map: Map2d, solution: Optional[list[tuple[int, int]]] = None) -> Iterator[Solution2d]:
+        """
+        Plan the route leg by leg with A* and yield every leg, in the order of the route.
         
-        while True:
-            last_pickup_to_end = A_asteriskSolver().solve(map2d)
-            
-            if last_pickup_to_end is not None:
-                break
-            else:
-                raise Exception("No solution found.")
+        The legs go from start to the first pick-up point, between consecutive pick-up points and from the last
+        pick-up point to end. Every leg is planned on its own static view of the map (see Map2d.getLegView()),
+        which shares the occupancy grid and never changes the map, so moving obstacles are frozen where they
+        are when planning starts and no leg waits for another. The legs before the last one must not cross the
+        end point, so it is blocked in their view: if a leg has no solution, neither has the route.
+        
+        With one leg worker, a leg is only planned when the caller asks for the next one, so a robot can start
+        on the first leg while the later legs are still to be planned. With more, all the legs are planned at
+        once in a process pool that reads the map from shared memory (see SharedMap), and each leg is yielded
+        as soon as it and the legs before it are done. The pool is only used when the route is large enough
+        for the legs to outweigh its start-up, and never with more workers than free CPUs or legs.
+        
+        Parameters:
+        map (Map2d): The map to be solved.
+        solution (Optional[list[tuple[int, int]]]): Order in which the pick-up points are visited. If None, the
+        order is found first by running the evolution to the end (see iterSolve()).
+        
+        Returns:
+        Iterator[Solution2d]: One solution per leg, in the order of the route.
+        
+        Example:
+        >>> for leg in GASolver().iterLegs(map2d):
+        ...     robot.follow(leg.iterWaypoints())
+        """
+        
+        if solution is None:
+            for solution, _ in self.iterSolve(map):
+                pass
+        stops = [tuple(map.getStart())] + [tuple(stop) for stop in solution] + [tuple(map.getEnd())]
+        
+        workers = _legWorkers(map, len(stops) - 1, self.__leg_workers)
+        if workers <= 1:
+            # One snapshot of the map, a template view per kind of leg and a cheap view sharing its arrays per leg
+            last = map.getLegView(stops[0], stops[-1])
+            through = last.getLegView(stops[0], stops[-1], blocked_points=[stops[-1]])
+            for i in range(len(stops) - 1):
+                # Legs are planned under the same deadline as the whole route
+                leg_solver = A_asteriskSolver()
+                leg_solver.setDeadline(self._deadline)
+                template = last if i == len(stops) - 2 else through
+                yield leg_solver.solve(template.getLegView(stops[i], stops[i + 1]))
+            return
+        
+        from concurrent.futures import ProcessPoolExecutor
+        from shared_map import SharedMap
+        
+        with SharedMap(map) as shared, \
+                ProcessPoolExecutor(max_workers=workers) as pool:
+            handle = shared.getHandle()
+            futures = [pool.submit(_planLeg, handle, stops[i], stops[i + 1],
+                                   [] if i == len(stops) - 2 else [stops[-1]], self._deadline)
+                       for i in range(len(stops) - 1)]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                # The caller stopped early or a leg failed: the legs not started yet are not needed
+                for future in futures:
+                    future.cancel()
+    
+    def constructPath(self, map: Map2d, solution: list[tuple[int, int]]) -> Solution2d:
+        """
+        Construct the route that visits the pick-up points in the given order, using A* for each leg.
+        
+        Parameters:
+        map (Map2d): The map to be solved.
+        solution (list[tuple[int, int]]): Order in which the pick-up points are visited.
+        
+        Returns:
+        Solution2d: The route from start, through the pick-up points, to end.
+        """
+        
+        start = time.perf_counter()
+        
+        legs = list(self.iterLegs(map, solution))
         
-        # Concatenate the paths to construct the final path
-        path = start_to_first_pickup.getPath()
-        for p in pickup_to_pickup:
-            # Remove the first node of the path as it is the same as the last node of the previous path
-            path += p.getPath()[1:]
-        path += last_pickup_to_end.getPath()[1:]
+        # Concatenate the paths to construct the final path. The first node of every leg is the same as
+        # the last node of the previous leg.
+        path = list(legs[0].getPath())
+        for leg in legs[1:]:
+            path += leg.getPath()[1:]
         
-        cost = start_to_first_pickup.cost + sum([p.cost for p in pickup_to_pickup]) + last_pickup_to_end.cost
+        cost = sum(leg.cost for leg in legs)
         
         end = time.perf_counter()
         
         runtime_milisec = (end - start) * 10**3
         
-        # Release the lock
-        try:
-            self.map.obstacles_lock.release()
-        except AttributeError:
-            pass
-        
         return Solution2d(path, cost, runtime_milisec)
+
+# Smallest work, in legs times free lattice points, for which planning the legs in a process pool is faster than
+# planning them serially: starting the pool and publishing the map take a few hundred milliseconds, about what
+# A* spends on this many points (see benchmark_leg_workers.py)
+_POOLED_LEGS_MIN_WORK = 200_000
+
+def _legWorkers(map2d: Map2d, legs: int, leg_workers: int) -> int:
+    # Number of processes to plan the legs with, 1 to plan them serially in this process
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    workers = min(leg_workers, legs, cpus)
+    if workers <= 1 or legs * int((~map2d.getOccupancyGrid()).sum()) < _POOLED_LEGS_MIN_WORK:
+        return 1
+    return workers
+
+# Leg templates of the maps attached by this worker process, keyed by shared map name and blocked points
+_LEG_TEMPLATES: dict[tuple, Map2d] = {}
+
+def _planLeg(handle, start: tuple[int, int], end: tuple[int, int], blocked_points: list[tuple[int, int]],
+             deadline: Optional[float]) -> Solution2d:
+    # Runs in a worker process: plan one leg with A* on a view of the map published by GASolver.iterLegs()
+    from shared_map import attachMap
     
-        # Comment the line above and use this line when evaluate performance of the genetic algorithm using evaluate_genetic_algorithm.py file
-        # return Solution2d(path, cost, runtime_milisec), generations_averages, generations_bests
\ No newline at end of file
+    key = (handle.name, tuple(blocked_points))
+    if key not in _LEG_TEMPLATES:
+        _LEG_TEMPLATES[key] = attachMap(handle).getLegView(handle.start, handle.end, blocked_points)
+    leg_solver = A_asteriskSolver()
+    leg_solver.setDeadline(deadline)
+    return leg_solver.solve(_LEG_TEMPLATES[key].getLegView(start, end))
+
+class WavefrontSolver(Solver):
+    """
+    A class to solve a 2D map problem from a distance field computed by a bulk wavefront.
+    
+    The distance field to the end point is computed for the whole map at once (see Map2d.getDistanceField()),
+    expanding whole cost buckets of the frontier with array operations instead of one node at a time. The path
+    then follows the field downhill from the start: at every step, the move whose cost plus the distance left
+    equals the distance of the current point. The field is cached by the map, so further queries towards the
+    same end point only pay for the descent. On a map with moving obstacles, the field and the descent both use
+    a snapshot of the obstacles taken when the descent starts (see Map2d.getLegView()).
+    
+    Methods:
+    - solve(map2d: Map2d): Solves the 2D map problem and returns a Solution2d object.
+    - iterPath(map2d: Map2d): Yields the states of the path as the descent reaches them.
+    """
+    
+    def __init__(self):
+        """
+        Initializes the WavefrontSolver object.
+        """
+        
+        super().__init__()
+        
+    def solve(self, map2d: Map2d) -> Solution2d:
+        """
+        Solves the 2D map problem with a wavefront distance field.
+        
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+        
+        Returns:
+        - Solution2d: The solution to the 2D map problem.
+        """
+        
+        start = time.perf_counter()
+        
+        path: list[Node2d] = []
+        node = None
+        for state, action in self.__descend(map2d):
+            node = Node2d(state, node, action)
+            path.append(node)
+        
+        runtime_milisec = (time.perf_counter() - start) * 10**3
+        return Solution2d(path, float(map2d.getDistanceField(map2d.getEnd())[path[0].getState()]), runtime_milisec)
+    
+    def iterPath(self, map2d: Map2d) -> Iterator[tuple[int, int]]:
+        """
+        Yield the states of the path from start to end as the descent reaches them.
+        
+        Once the distance field is known, every step of the descent only looks at the eight neighbors of the
+        current point, so a consumer gets the first states of a long route right away and never holds the
+        whole path.
+        
+        Parameters:
+        - map2d (Map2d): The 2D map to be solved.
+        
+        Returns:
+        - Iterator[tuple[int, int]]: The states of the path.
+        
+        Example:
+        >>> for x, y in WavefrontSolver().iterPath(map2d):
+        ...     robot.moveTo(x, y)
+        """
+        
+        for state, _ in self.__descend(map2d):
+            yield state
+    
+    def __descend(self, map2d: Map2d) -> Iterator[tuple[tuple[int, int], Optional[Action2d]]]:
+        if map2d.getPickUpPoints() != []:
+            raise ValueError("WavefrontSolver is not designed to solve TSP problem. Please use another solver, such as GASolver.")
+        
+        self._checkDeadline()
+        if map2d.getObstaclesSpeed() > 0:
+            # The distance field and the neighbor checks must see the same obstacles, so descend on a snapshot
+            map2d = map2d.getLegView(map2d.getStart(), map2d.getEnd())
+        self._checkConnected(map2d, [map2d.getStart(), map2d.getEnd()])
+        
+        distance = map2d.getDistanceField(map2d.getEnd())
+        state = tuple(map2d.getStart())
+        if not (0 <= state[0] < distance.shape[0] and 0 <= state[1] < distance.shape[1]) or np.isinf(distance[state]):
+            raise Exception("No solution found.")
+        
+        move_costs = map2d.getMoveCosts()
+        yield state, None
+        while state != tuple(map2d.getEnd()):
+            self._checkDeadline()
+            
+            # Take the free neighbor that lies on a shortest path: its move cost plus its distance is the smallest
+            states, valid = map2d.getNeighborStates(state)
+            remaining = np.full(len(states), np.inf)
+            remaining[valid] = move_costs[valid.nonzero()[0], state[0], state[1]] + distance[states[valid, 0], states[valid, 1]]
+            best = int(np.argmin(remaining))
+            if np.isinf(remaining[best]):
+                raise Exception("No solution found.")
+            state = tuple(states[best].tolist())
+            yield state, ACTIONS2D[best]
+
+# Costs of the diagonal moves, used by the 3D heuristic
+_SQRT2 = sqrt(2)
+_SQRT3 = sqrt(3)
+
+class DijkstraSolver3d(Solver):
+    """
+    A class to solve a 3D map problem using Dijkstra's algorithm.
+    
+    A 3D map has many more states than a 2D one, so the search state is not kept in dictionaries of nodes.
+    Lattice points are identified by their flat index (see Map3d.getShape()); the cost from start, the parent
+    index and the action of every point live in flat typed arrays, and the open set is a binary heap of
+    (priority, index) pairs. The returned solution is built from the parent indices, and Node3d objects are only
+    created for the nodes of its path when they are asked for.
+    
+    Methods:
+    - solve(map3d: Map3d): Solves the 3D map problem and returns a Solution2d object holding Node3d nodes.
+    """
+    
+    def __init__(self):
+        """
+        Initializes the DijkstraSolver3d object.
+        """
+        
+        super().__init__()
+    
+    def _heuristic(self, state: tuple[int, int, int], goal: tuple[int, int, int]) -> float:
+        """
+        Estimate of the cost from a state to the goal. Dijkstra's algorithm uses none.
+        """
+        
+        return 0.0
+    
+    def solve(self, map3d: Map3d) -> Solution2d:
+        """
+        Solves the 3D map problem.
+        
+        Parameters:
+        - map3d (Map3d): The 3D map to be solved.
+        
+        Returns:
+        - Solution2d: The solution to the 3D map problem.
+        """
+        
+        start_time = time.perf_counter()
+        
+        start, goal = map3d.getStart(), map3d.getEnd()
+        if map3d.isBlocked(start) or map3d.isBlocked(goal):
+            raise Exception("No solution found.")
+        
+        size_x, size_y, size_z = map3d.getShape()
+        stride_x, stride_y = size_y * size_z, size_z
+        packed = map3d.getPackedOccupancy()
+        
+        # Flat index offset and cost of every action. The frame of the map is blocked, so the neighbors of a
+        # free point are always inside the arrays and need no bounds check.
+        moves = [(dx * stride_x + dy * stride_y + dz, action.cost(), action.value)
+                 for action in Action3d for dx, dy, dz in (action.delta(),)]
+        
+        count = size_x * size_y * size_z
+        cost = array("d", [inf]) * count
+        parent = array("i", [-1]) * count
+        action_of = array("b", [-1]) * count
+        closed = bytearray(count)
+        
+        start_index = (start[0] * stride_x + start[1] * stride_y) + start[2]
+        goal_index = (goal[0] * stride_x + goal[1] * stride_y) + goal[2]
+        cost[start_index] = 0.0
+        heap = [(self._heuristic(start, goal), start_index)]
+        
+        expanded = 0
+        while heap:
+            _, index = heapq.heappop(heap)
+            if closed[index]:
+                continue
+            closed[index] = 1
+            
+            expanded += 1
+            if expanded % 1024 == 0:
+                self._checkDeadline()
+            
+            if index == goal_index:
+                # The nodes of the path are only created if the caller asks for them, see Solution2d.fromParents()
+                runtime_milisec = (time.perf_counter() - start_time) * 10**3
+                return Solution2d.fromParents(parent, action_of, index, (size_x, size_y, size_z), cost[index], runtime_milisec)
+            
+            cost_start_to_node = cost[index]
+            for offset, move_cost, value in moves:
+                neighbor = index + offset
+                if closed[neighbor] or (packed[neighbor >> 3] >> (7 - (neighbor & 7))) & 1:
+                    continue
+                cost_start_to_neighbor = cost_start_to_node + move_cost
+                if cost_start_to_neighbor < cost[neighbor]:
+                    cost[neighbor] = cost_start_to_neighbor
+                    parent[neighbor] = index
+                    action_of[neighbor] = value
+                    state = (neighbor // stride_x, (neighbor // stride_y) % size_y, neighbor % size_z)
+                    heapq.heappush(heap, (cost_start_to_neighbor + self._heuristic(state, goal), neighbor))
+        
+        raise Exception("No solution found.")
+
+class A_asteriskSolver3d(DijkstraSolver3d):
+    """
+    A class to solve a 3D map problem using A* algorithm, on the array-backed search state of DijkstraSolver3d.
+    
+    The heuristic is the cost of the shortest 26-connected path ignoring obstacles: with the absolute
+    displacements sorted as a >= b >= c, it is √3·c + √2·(b - c) + (a - b). It never overestimates and is
+    consistent, so every point is expanded at most once and the returned path is optimal.
+    """
+    
+    def _heuristic(self, state: tuple[int, int, int], goal: tuple[int, int, int]) -> float:
+        c, b, a = sorted((abs(state[0] - goal[0]), abs(state[1] - goal[1]), abs(state[2] - goal[2])))
+        return _SQRT3 * c + _SQRT2 * (b - c) + (a - b)
+
+# The registry of solvers by name lives in solver_registry, which resolves the classes lazily. It is
+# re-exported here for the callers that import it from this module.
+from solver_registry import SOLVERS, getSolver
@@ -0,0 +1,74 @@
+from importlib import import_module
+
+# Solvers that can be selected by name, e.g. by the planning service. Entries are "module:Class" strings,
+# so that the solver modules (and what they import) are only loaded when a solver is first requested.
+SOLVERS: dict[str, str] = {
+    "dijkstra": "solver:DijkstraSolver",
+    "a_asterisk": "solver:A_asteriskSolver",
+    "gbfs": "solver:GBFS_Solver",
+    "wavefront": "solver:WavefrontSolver",
+    "ga": "solver:GASolver",
+    "visibility_graph": "auto_planner:VisibilityGraphSolver",
+    "held_karp": "auto_planner:HeldKarpSolver",
+    "auto": "auto_planner:AutoSolver",
+}
+
+# Classes already resolved in this process, keyed by registered name
+_RESOLVED: dict[str, type] = {}
+
+def getSolverClass(name: str) -> type:
+    """
+    Return the solver class registered under a name, importing its module on first use.
+
+    Parameters:
+    - name (str): Name of the solver in SOLVERS.
+
+    Returns:
+    - type: The solver class.
+
+    Example:
+    >>> getSolverClass("a_asterisk")
+    <class 'solver.A_asteriskSolver'>
+    """
+
+    if name not in _RESOLVED:
+        try:
+            module_name, class_name = SOLVERS[name].split(":")
+        except KeyError:
+            raise ValueError(f"Unknown solver '{name}'. Available solvers: {', '.join(SOLVERS)}.")
+        _RESOLVED[name] = getattr(import_module(module_name), class_name)
+    return _RESOLVED[name]
+
+def getSolver(name: str, **params):
+    """
+    Create a solver from its registered name.
+
+    Parameters:
+    - name (str): Name of the solver in SOLVERS.
+    - params: Keyword arguments passed to the solver constructor.
+
+    Returns:
+    - Solver: A new solver instance.
+
+    Example:
+    >>> solver = getSolver("ga", num_generations=100)
+    """
+
+    return getSolverClass(name)(**params)
+
+def registerSolver(name: str, target: str):
+    """
+    Register a solver under a name.
+
+    Parameters:
+    - name (str): Name the solver is selected by.
+    - target (str): "module:Class" of the solver. The module is not imported until the solver is requested.
+
+    Example:
+    >>> registerSolver("smoothed_a_asterisk", "path_smoother:SmoothedSolver")
+    """
+
+    if ":" not in target:
+        raise ValueError("The target of a solver must be written as 'module:Class'.")
+    SOLVERS[name] = target
+    _RESOLVED.pop(name, None)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from shapely.geometry import Polygon
+
+from map_and_obstacles import Map2d, _componentLabels, _updateComponentLabels
+
+def _assertSamePartition(labels: np.ndarray, expected: np.ndarray):
+    # Labels may name a component by a different point, so compare the partitions of the free points
+    assert np.array_equal(labels == -1, expected == -1)
+    free = expected != -1
+    pairs = np.unique(np.stack([labels[free], expected[free]]), axis=1)
+    assert pairs.shape[1] == len(np.unique(labels[free])) == len(np.unique(expected[free]))
+    # Every label is the flat index of a point of its own component
+    names = np.unique(labels[free])
+    assert np.array_equal(labels.ravel()[names], names)
+
+def _wall(x: float, low: float, high: float) -> Polygon:
+    return Polygon([(x, low), (x + 0.5, low), (x + 0.5, high), (x, high)])
+
+def test_obstacle_edits_match_full_relabel():
+    map2d = Map2d((1, 1), (18, 18), [_wall(5, 0, 12)], 0, 20, 20, [])
+    map2d.getComponentLabels()
+    walls = [_wall(10, 8, 20),      # Narrows the map without splitting it
+             _wall(14, 0, 20),      # Splits it in two
+             _wall(3, 3, 4),        # A small obstacle inside one side
+             _wall(7, 0, 20)]       # Splits it in three
+    edits = [(map2d.addObstacle, wall) for wall in walls] + \
+            [(map2d.removeLastObstacle, wall) for wall in reversed(walls)]
+    for edit, wall in edits:
+        edit(wall)
+        _assertSamePartition(map2d.getComponentLabels(), _componentLabels(map2d.getOccupancyGrid()))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_grid_edits_match_full_relabel(seed: int):
+    rng = np.random.default_rng(seed)
+    blocked = rng.random((30, 25)) < 0.35
+    labels = _componentLabels(blocked)
+    for _ in range(60):
+        edited = blocked.copy()
+        x, y = rng.integers(0, 28), rng.integers(0, 23)
+        if rng.random() < 0.5:
+            # A single point toggled, which takes the shortcuts of the update
+            edited[x, y] = not edited[x, y]
+        else:
+            edited[x:x + rng.integers(1, 4), y:y + rng.integers(1, 4)] = rng.random() < 0.6
+        labels = _updateComponentLabels(blocked, labels, edited)
+        blocked = edited
+        _assertSamePartition(labels, _componentLabels(blocked))
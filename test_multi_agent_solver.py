@@ -0,0 +1,59 @@
+import itertools
+import pytest
+from shapely.geometry import Polygon
+
+from map_and_obstacles import Map2d
+from multi_agent_solver import CBSSolver, MultiAgentSolver, PrioritizedPlanningSolver
+from solver import A_asteriskSolver
+
+def _corridorMap() -> Map2d:
+    # A corridor along y = 3 from x = 1 to x = 11, with a passing bay at x = 6 where agents can step aside
+    obstacles = [Polygon([(1, 1), (11, 1), (11, 2), (1, 2)]),
+                 Polygon([(1, 4), (5.5, 4), (5.5, 5), (1, 5)]),
+                 Polygon([(6.5, 4), (11, 4), (11, 5), (6.5, 5)])]
+    return Map2d((1, 3), (11, 3), obstacles, 0, 12, 6, [])
+
+AGENTS = [[((1, 3), (11, 3)), ((11, 3), (1, 3))],
+          [((1, 3), (11, 3)), ((11, 3), (1, 3)), ((10, 3), (2, 3))]]
+
+def _positions(solution) -> list[tuple[int, int]]:
+    return [node.getState() for node in solution.getPath()]
+
+def _assertConflictFree(paths: list[list[tuple[int, int]]]):
+    horizon = max(len(path) for path in paths)
+    # Agents wait at their goal after arriving
+    padded = [path + [path[-1]] * (horizon - len(path)) for path in paths]
+    for a, b in itertools.combinations(padded, 2):
+        for t in range(horizon):
+            assert a[t] != b[t], f"vertex conflict at {a[t]}, t={t}"
+        for t in range(horizon - 1):
+            assert (a[t], a[t + 1]) != (b[t + 1], b[t]), f"swap of {a[t]} and {b[t]} at t={t}"
+            # Crossing diagonal moves meet at the same midpoint without swapping places
+            if a[t] != a[t + 1] and b[t] != b[t + 1]:
+                midpoint_a = (a[t][0] + a[t + 1][0], a[t][1] + a[t + 1][1])
+                midpoint_b = (b[t][0] + b[t + 1][0], b[t][1] + b[t + 1][1])
+                assert midpoint_a != midpoint_b, f"crossing moves at t={t}"
+
+@pytest.mark.parametrize("agents", AGENTS)
+def test_independent_paths_conflict_in_the_corridor(agents):
+    map2d = _corridorMap()
+    paths = [_positions(map2d.getLegView(start, end).solvedBy(A_asteriskSolver()))
+             for start, end in agents]
+    assert MultiAgentSolver._findConflict(paths) is not None
+
+@pytest.mark.parametrize("solver_class", [CBSSolver, PrioritizedPlanningSolver])
+@pytest.mark.parametrize("agents", AGENTS)
+def test_joint_plan_is_conflict_free(solver_class, agents):
+    map2d = _corridorMap()
+    solutions = solver_class().solve(map2d, agents)
+    paths = [_positions(solution) for solution in solutions]
+
+    assert len(paths) == len(agents)
+    occupancy = map2d.getOccupancyGrid()
+    for path, (start, end) in zip(paths, agents):
+        assert path[0] == start and path[-1] == end
+        assert not any(occupancy[x, y] for x, y in path)
+        # Every step is a wait or one of the eight moves
+        assert all(max(abs(b[0] - a[0]), abs(b[1] - a[1])) <= 1 for a, b in zip(path, path[1:]))
+    assert MultiAgentSolver._findConflict(paths) is None
+    _assertConflictFree(paths)
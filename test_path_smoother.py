@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from map_file_reader import MapFileReader
+from path_smoother import PathSmoother, _segmentCosts
+from solver import A_asteriskSolver
+
+MAPS = ["input_basic/ordinary_path.txt", "input_basic/long_path.txt", "input_basic/weighted_path.txt"]
+
+def _solve(filename: str):
+    map2d = MapFileReader(filename).readMap2d()
+    return map2d, map2d.solvedBy(A_asteriskSolver())
+
+def _weightedCost(map2d, states: np.ndarray) -> float:
+    segments = np.stack([states[:-1], states[1:]], axis=1).astype(float)
+    if map2d.getCostRaster() is not None:
+        return float(_segmentCosts(map2d.getCostRaster(), segments).sum())
+    return float(np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1).sum())
+
+@pytest.mark.parametrize("filename", MAPS)
+def test_smoothed_path_is_collision_free_and_no_dearer(filename):
+    map2d, solution = _solve(filename)
+    smoothed = PathSmoother().smooth(map2d, solution)
+
+    waypoints = np.array(smoothed.getTuplePath(), dtype=float)
+    assert len(waypoints) < len(solution.getPath())
+    assert tuple(waypoints[0]) == map2d.getStart() and tuple(waypoints[-1]) == map2d.getEnd()
+    assert not map2d.segmentsCollide(np.stack([waypoints[:-1], waypoints[1:]], axis=1)).any()
+    assert smoothed.cost <= solution.cost + 1e-9
+    assert smoothed.cost == pytest.approx(_weightedCost(map2d, waypoints))
+
+@pytest.mark.parametrize("filename", MAPS)
+def test_dense_path_expands_to_valid_grid_moves(filename):
+    map2d, solution = _solve(filename)
+    smoothed = PathSmoother().smooth(map2d, solution)
+
+    dense = smoothed.getDensePath()
+    assert [node.getState() for node in dense] == solution.getTuplePath()
+    occupancy = map2d.getOccupancyGrid()
+    for previous, node in zip(dense, dense[1:]):
+        dx, dy = node.getState()[0] - previous.getState()[0], node.getState()[1] - previous.getState()[1]
+        assert node.getAction() is not None and node.getAction().delta() == (dx, dy)
+        assert not occupancy[node.getState()]
+
+@pytest.mark.parametrize("filename", MAPS)
+def test_collinear_compression_keeps_only_turns(filename):
+    map2d, solution = _solve(filename)
+    compressed = PathSmoother(string_pulling=False).smooth(map2d, solution)
+
+    waypoints = np.array(compressed.getTuplePath())
+    steps = np.diff(waypoints, axis=0)
+    # Every segment follows one grid direction, and the direction changes at every interior waypoint
+    dx, dy = np.abs(steps[:, 0]), np.abs(steps[:, 1])
+    assert ((dx == 0) | (dy == 0) | (dx == dy)).all()
+    directions = steps // np.maximum(dx, dy)[:, None]
+    assert (directions[1:] != directions[:-1]).any(axis=1).all()
+    assert compressed.cost == pytest.approx(solution.cost)
+
+def test_string_pulling_does_not_shortcut_through_expensive_cells():
+    map2d, solution = _solve("input_basic/weighted_path.txt")
+    assert map2d.getCostRaster() is not None
+    smoothed = PathSmoother().smooth(map2d, solution)
+
+    # The straight shortcuts across the map are shorter but cross the expensive cells
+    assert smoothed.cost <= solution.cost + 1e-9
+    for start, end in zip(smoothed.getTuplePath(), smoothed.getTuplePath()[1:]):
+        dense = np.array(solution.getTuplePath())
+        i = int(np.flatnonzero((dense == start).all(axis=1))[0])
+        j = int(np.flatnonzero((dense == end).all(axis=1))[0])
+        assert _weightedCost(map2d, np.array([start, end])) <= _weightedCost(map2d, dense[i:j + 1]) + 1e-9
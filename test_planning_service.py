@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+
+from planning_service import PlanningQuery, PlanningService
+
+def _solveAll(queries: list[PlanningQuery]) -> tuple[list, dict]:
+    async def main():
+        service = PlanningService(max_workers=2)
+        service.registerMap("tsp", "input_tsp/tsp_static_obstacles_2.txt")
+        async with service:
+            results = await asyncio.gather(*(service.solve("tsp", query) for query in queries), return_exceptions=True)
+            return results, service.getStats()
+    return asyncio.run(main())
+
+def test_identical_queries_with_deadlines_share_one_computation():
+    queries = [PlanningQuery(solver="ga", solver_params={"num_generations": 20}, deadline_ms=5000) for _ in range(8)]
+    results, stats = _solveAll(queries)
+
+    assert all(not isinstance(result, Exception) for result in results)
+    assert stats["computations"] == 1
+    assert stats["deduplicated"] == 7
+    assert len({result.cost for result in results}) == 1
+
+def test_joined_query_extends_the_deadline_of_the_computation():
+    # The evolution runs for one second, well past the deadline of the first caller
+    params = {"num_generations": 10**6, "stall_generations": None, "time_budget_ms": 1000}
+    short = PlanningQuery(solver="ga", solver_params=params, deadline_ms=300)
+    unbounded = PlanningQuery(solver="ga", solver_params=params)
+    (first, second), stats = _solveAll([short, unbounded])
+
+    assert isinstance(first, TimeoutError)
+    assert second.runtime_milisec >= 1000
+    assert stats["computations"] == 1
@@ -0,0 +1,53 @@
+import glob
+import heapq
+import numpy as np
+import pytest
+
+from map_file_reader import MapFileReader
+from solver import DijkstraSolver, WavefrontSolver
+
+MAPS = sorted(glob.glob("input_basic/*_path.txt") + glob.glob("input_tsp/*.txt"))
+
+def _dijkstraDistances(map2d, source: tuple[int, int]) -> np.ndarray:
+    # Textbook Dijkstra over the lattice, one point at a time, with the moves and costs the solvers use
+    move_costs = map2d.getMoveCosts()
+    distance = np.full(move_costs.shape[1:], np.inf)
+    distance[source] = 0.0
+    open_set = [(0.0, tuple(source))]
+    while open_set:
+        cost, (x, y) = heapq.heappop(open_set)
+        if cost > distance[x, y]:
+            continue
+        states, valid = map2d.getNeighborStates((x, y))
+        for action in np.flatnonzero(valid):
+            nx, ny = int(states[action, 0]), int(states[action, 1])
+            new_cost = cost + move_costs[action, x, y]
+            if new_cost < distance[nx, ny]:
+                distance[nx, ny] = new_cost
+                heapq.heappush(open_set, (new_cost, (nx, ny)))
+    return distance
+
+@pytest.mark.parametrize("filename", MAPS)
+def test_distance_field_equals_dijkstra(filename: str):
+    map2d = MapFileReader(filename).readMap2d()
+    for source in [map2d.getStart(), map2d.getEnd()]:
+        field = map2d.getDistanceField(source)
+        expected = _dijkstraDistances(map2d, source)
+        assert np.array_equal(np.isinf(field), np.isinf(expected))
+        finite = np.isfinite(expected)
+        np.testing.assert_allclose(field[finite], expected[finite], rtol=1e-9, atol=1e-9)
+
+def test_weighted_map_uses_its_cost_raster():
+    map2d = MapFileReader("input_basic/weighted_path.txt").readMap2d()
+    assert map2d.getCostRaster() is not None
+    field = map2d.getDistanceField(map2d.getEnd())
+    assert not np.all(map2d.getMoveCosts()[:, np.isfinite(field)] <= np.sqrt(2))
+    assert field[map2d.getStart()] == pytest.approx(map2d.solvedBy(DijkstraSolver()).cost)
+
+@pytest.mark.parametrize("filename", ["input_basic/ordinary_path.txt", "input_basic/long_path.txt",
+                                      "input_basic/weighted_path.txt"])
+def test_wavefront_path_costs_the_dijkstra_distance(filename: str):
+    map2d = MapFileReader(filename).readMap2d()
+    solution = map2d.solvedBy(WavefrontSolver())
+    assert solution.cost == pytest.approx(map2d.solvedBy(DijkstraSolver()).cost)
+    assert solution.cost == pytest.approx(map2d.getDistanceField(map2d.getEnd())[map2d.getStart()])
@@ -1,61 +1,201 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.colors import to_rgba
-from matplotlib.animation import FuncAnimation
+import subprocess
+from typing import TYPE_CHECKING, Iterator
+import numpy as np
 
 from map_and_obstacles import Map2d
 from solution import Solution2d
 
+# matplotlib is only imported when something is drawn, so that importing this module stays cheap
+if TYPE_CHECKING:
+    from matplotlib.animation import FuncAnimation
+
+# Pillow holds every frame of a GIF until the file is written, so a long path is exported with fewer frames
+_GIF_MAX_FRAMES = 200
+
 class Visualizer2d:
-    def __init__(self, solution: Solution2d, map: Map2d, speed: int = 1000):
+    """
+    A class to animate a solution on its map.
+
+    Static layers (grid, pick-up points, start, end and, for static maps, the obstacles) are drawn once.
+    Each frame then only extends the path line and, for dynamic maps, moves the obstacle patches,
+    so that with blitting only those artists are redrawn.
+
+    Methods:
+    - visualize2d(): Show the animation in an interactive window
+    - export(filename: str, fps: float = None, dpi: int = 100): Write the animation to a GIF or MP4 file without a window
+
+    Example:
+    >>> visualizer = Visualizer2d(solution, map2d, speed=100)
+    >>> visualizer.visualize2d()
+    >>> visualizer.export("long_path.gif")
+    """
+
+    def __init__(self, solution: Solution2d, map: Map2d, speed: int = 1000, blit: bool = True):
         self.__solution = solution
         self.__map = map
         self.__speed = speed # Delay between frames in miliseconds
-        
-    def update(self, frame):
-        self.ax.clear()  # Clear previous frame
+        self.__blit = blit
+        self.__headless = False
+
+        path = np.array(self.__solution.getTuplePath(), dtype=float).reshape(-1, 2)
+        self.__path_x = path[:, 0]
+        self.__path_y = path[:, 1]
 
-        # Reset the plot (similarly to how you initially set it up)
+    def __setup(self, ax):
+        import matplotlib.patches as patches
+        from matplotlib.colors import to_rgba
+
+        self.ax = ax
         self.ax.set_xlim(0, self.__map.getWidth())
         self.ax.set_ylim(0, self.__map.getHeight())
         self.ax.set_facecolor(to_rgba('white', alpha=0.5))
         self.ax.grid(True, which='both', color='grey', linewidth=0.5, linestyle='-', alpha=0.3)
 
-        # Redraw obstacles, pickup points, start and end points
-        # (similar to how you initially drew them, but inside this function)
-        for obstacle in self.__map.getObstacles():
-            self.ax.add_patch(patches.Polygon(list(obstacle.exterior.coords), closed=True, color='black'))
-        
+        # Obstacles are only animated when they move
+        self.__dynamic = self.__map.getObstaclesSpeed() > 0
+        self.__original_obstacles = list(self.__map.getObstacles())
+        self.__obstacle_patches = []
+        for obstacle in self.__original_obstacles:
+            patch = patches.Polygon(list(obstacle.exterior.coords), closed=True, color='black', animated=self.__dynamic and self.__blit)
+            self.ax.add_patch(patch)
+            self.__obstacle_patches.append(patch)
+
         # Plot pickup-points
         for pickup in self.__map.getPickUpPoints():
             self.ax.add_patch(patches.Circle((pickup[0], pickup[1]), 0.3, color='green'))
-        
+
         # Plot start and end points
         start = self.__map.getStart()
         end = self.__map.getEnd()
         self.ax.add_patch(patches.Circle((start[0], start[1]), 0.3, color='red'))
         self.ax.add_patch(patches.Circle((end[0], end[1]), 0.3, color='blue'))
 
-        # For an animated path drawing, adjust to draw up to 'frame' index of your path
-        path = self.__solution.getTuplePath()
-        if frame > 0:
-            for i in range(frame):
-                if i < len(path) - 1:
-                    self.ax.plot([path[i][0], path[i+1][0]], [path[i][1], path[i+1][1]], color='blue')
+        # The path is a single line that grows with the frames
+        self.__line, = self.ax.plot([], [], color='blue', animated=self.__blit)
+
+    def __init_frame(self):
+        self.__line.set_data([], [])
+        return [self.__line] + (self.__obstacle_patches if self.__dynamic else [])
+
+    def update(self, frame):
+        # Draw the path up to the 'frame' index
+        self.__line.set_data(self.__path_x[:frame + 1], self.__path_y[:frame + 1])
+        artists = [self.__line]
+
+        if self.__dynamic:
+            obstacles = self.__obstaclesAt(frame) if self.__headless else self.__map.getObstacles()
+            for patch, obstacle in zip(self.__obstacle_patches, obstacles):
+                patch.set_xy(list(obstacle.exterior.coords))
+            artists += self.__obstacle_patches
+
+        return artists
+
+    def __obstaclesAt(self, frame: int) -> list:
+        # Without a live clock, replay the movement of the map: the obstacles alternate between their
+        # original position and a shift to the right, once per second of animation time
+        from shapely.affinity import translate
+
+        if int(frame * self.__speed / 1000) % 2 == 0:
+            return self.__original_obstacles
+        return [translate(obstacle, xoff=self.__map.getObstaclesSpeed()) for obstacle in self.__original_obstacles]
+
+    def __animation(self, fig) -> 'FuncAnimation':
+        from matplotlib.animation import FuncAnimation
+
+        return FuncAnimation(fig, self.update, frames=len(self.__path_x), init_func=self.__init_frame,
+                             interval=self.__speed, repeat=False, blit=self.__blit)
 
     def visualize2d(self):
-        fig, self.ax = plt.subplots(figsize=(8, 8))
-        
-        # Initial plot setup, if needed
-        self.ax.set_xlim(0, self.__map.getWidth())
-        self.ax.set_ylim(0, self.__map.getHeight())
-        self.ax.set_facecolor(to_rgba('white', alpha=0.5))
-        self.ax.grid(True, which='both', color='grey', linewidth=0.5, linestyle='-', alpha=0.3)
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=(8, 8))
+        self.__headless = False
+        self.__setup(ax)
 
         # Create an animation
-        anim = FuncAnimation(fig, self.update, frames=len(self.__solution.getTuplePath()), interval=self.__speed, repeat=False)
-        
+        anim = self.__animation(fig)
+
         if self.__map.getObstaclesSpeed() > 0:
             self.__map.restart()
-        
-        plt.show()
\ No newline at end of file
+
+        plt.show()
+
+    def export(self, filename: str, fps: float = None, dpi: int = 100):
+        """
+        Write the animation to a file without opening a window.
+
+        The figure is rendered by the Agg backend directly, so this works on machines without a display.
+        The static layers are rasterized once; every frame restores that background and only draws the
+        animated artists on top of it before the pixels are handed to the encoder.
+        The encoder is chosen by the file extension. ".mp4" streams the frames to ffmpeg as they are rendered,
+        so memory does not grow with the length of the path. ".gif" uses Pillow, which keeps the frames until
+        the file is written: they are stored with one palette index per pixel, and a path longer than
+        _GIF_MAX_FRAMES steps advances several steps per frame, at the same overall speed.
+
+        Args:
+        - filename: Output file, ending with ".gif" or ".mp4"
+        - fps: Frames per second. Defaults to the speed of the visualizer
+        - dpi: Resolution of the frames
+        """
+
+        fps = fps if fps is not None else 1000 / self.__speed
+        extension = filename.lower().rsplit(".", 1)[-1]
+        if extension not in ("gif", "mp4"):
+            raise ValueError("Only .gif and .mp4 files are supported.")
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(8, 8), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        self.__headless = True
+        blit = self.__blit
+        self.__blit = True # The animated artists must be left out of the background
+        try:
+            self.__setup(fig.add_subplot())
+            canvas.draw()
+            background = canvas.copy_from_bbox(fig.bbox)
+
+            def render(frame: int) -> np.ndarray:
+                canvas.restore_region(background)
+                for artist in self.update(frame):
+                    self.ax.draw_artist(artist)
+                return np.array(canvas.buffer_rgba())[:, :, :3]
+
+            count = len(self.__path_x)
+            if extension == "gif":
+                # The first and last frames are always shown, the ones in between are evenly thinned out
+                step = -(-count // _GIF_MAX_FRAMES)
+                frames = list(range(0, count - 1, step)) + [count - 1]
+                # The last frame holds every colour of the animation, so all frames share its palette
+                self.__writeGif(filename, render(count - 1), map(render, frames), fps / step)
+            else:
+                self.__writeMp4(filename, map(render, range(count)), fps)
+        finally:
+            self.__blit = blit
+
+    def __writeGif(self, filename: str, palette_frame: np.ndarray, frames: Iterator[np.ndarray], fps: float):
+        from PIL import Image
+
+        # Frames are quantized as Pillow pulls them, so only their palette indices are kept until the file is written
+        palette = Image.fromarray(palette_frame).quantize(colors=64)
+        images = (Image.fromarray(frame).quantize(palette=palette, dither=Image.Dither.NONE) for frame in frames)
+        first = next(images)
+        first.save(filename, save_all=True, append_images=images, duration=int(1000 / fps), loop=0)
+
+    def __writeMp4(self, filename: str, frames: Iterator[np.ndarray], fps: float):
+        import matplotlib
+
+        frames = iter(frames)
+        first = next(frames)
+        height, width, _ = first.shape
+        command = [matplotlib.rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                   "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", filename]
+        with subprocess.Popen(command, stdin=subprocess.PIPE) as ffmpeg:
+            ffmpeg.stdin.write(np.ascontiguousarray(first).tobytes())
+            for frame in frames:
+                ffmpeg.stdin.write(np.ascontiguousarray(frame).tobytes())
+            ffmpeg.stdin.close()
+        if ffmpeg.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {ffmpeg.returncode}.")